@@ -0,0 +1,132 @@
+"""OCR cache benchmark: Tesseract vs exact-hash hits vs crop lookups, with accuracy.
+
+Usage:
+    python benchmarks/bench_ocr_cache.py [--pairs 4] [--json out.json]
+
+Each case is a two-question "worksheet" screenshot built from the fixture
+questions. The whole page is OCR'd once (miss), then again (exact hit), then
+each question is cropped out of it, the way a user re-captures part of the
+screen. Crops are answered by locating them in the cached page and collecting
+its word boxes, and scored against the ground truth alongside a fresh Tesseract
+run on the crop. Finally crops of pages never cached are looked up (crop_miss),
+which is the cost the cache adds to every new screenshot. Needs the tesseract binary.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from fixtures import QUESTIONS, render_question  # noqa: E402
+from PIL import Image  # noqa: E402
+
+
+def accuracy(got, truth):
+    return difflib.SequenceMatcher(None, hintify.normalize_question_text(got), hintify.normalize_question_text(truth)).ratio()
+
+
+def worksheet(first, second, scale=2):
+    """Two questions stacked on one page, plus the box of each on it."""
+    top, bottom = render_question(first, scale), render_question(second, scale)
+    page = Image.new("RGB", (max(top.width, bottom.width), top.height + bottom.height), "white")
+    page.paste(top, (0, 0))
+    page.paste(bottom, (0, top.height))
+    margin = 100  # of render_question's 160 px padding keep 60, as a hand-made selection would
+    return page, [
+        (first, (margin, margin, top.width - margin, top.height - margin)),
+        (second, (margin, top.height + margin, bottom.width - margin, top.height + bottom.height - margin)),
+    ]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def run(pairs=4):
+    hintify.CONFIG_PATH = os.path.join(tempfile.mkdtemp(prefix="hintify-bench-"), "config.json")
+    hintify.OCR_CACHE_DIR = tempfile.mkdtemp(prefix="hintify-ocr-cache-")
+    hintify.save_config(dict(hintify.DEFAULT_CONFIG, ocr_engine="tesseract"))
+    engine = hintify.get_ocr_engine()
+    engine.recognize_words(render_question(QUESTIONS[0]))  # warm-up
+    times = {"miss": [], "exact": [], "crop": [], "crop_tesseract": [], "crop_miss": []}
+    scores = {"crop": [], "crop_tesseract": []}
+    try:
+        for i in range(pairs):
+            page, regions = worksheet(QUESTIONS[(2 * i) % len(QUESTIONS)], QUESTIONS[(2 * i + 1) % len(QUESTIONS)])
+            runs = engine.latency.count
+            _, elapsed = timed(hintify.recognize_image, page)
+            times["miss"].append(elapsed)
+            _, elapsed = timed(hintify.recognize_image, page)
+            times["exact"].append(elapsed)
+            for truth, box in regions:
+                crop = page.crop(box)
+                (text, _), elapsed = timed(hintify.recognize_image, crop)
+                times["crop"].append(elapsed)
+                scores["crop"].append(accuracy(text, truth))
+                words, elapsed = timed(engine.recognize_words, crop)
+                times["crop_tesseract"].append(elapsed)
+                scores["crop_tesseract"].append(accuracy(" ".join(w[0] for w in words), truth))
+            # one run for the page plus one per crop for the comparison; cache hits add none
+            assert engine.latency.count - runs == 1 + len(regions), "cache hit ran Tesseract"
+        cache = hintify.get_ocr_cache(hintify.load_config())
+        for t in threading.enumerate():
+            if t.name == "hintify-ocr-cache":
+                t.join()  # signatures are built in the background
+        for i in range(pairs):
+            # Same look, other words: no cached page holds these pixels
+            first, second = (" ".join(reversed(QUESTIONS[(2 * i + k) % len(QUESTIONS)].split())) for k in (0, 1))
+            page, regions = worksheet(first, second)
+            for _, box in regions:
+                crop = page.crop(box)
+                hit, elapsed = timed(cache.get, crop, hintify.clipboard_fingerprint(crop), engine.settings_key())
+                assert hit is None, "crop of an uncached page hit"
+                times["crop_miss"].append(elapsed)
+        summary = cache.summary()
+    finally:
+        shutil.rmtree(hintify.OCR_CACHE_DIR, ignore_errors=True)
+    results = []
+    for mode, samples in times.items():
+        samples.sort()
+        results.append({
+            "mode": mode,
+            "n": len(samples),
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "max_ms": samples[-1] * 1000,
+            "accuracy": statistics.mean(scores[mode]) if mode in scores else None,
+        })
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=4, help="Worksheet pages (two questions each)")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    args = parser.parse_args()
+    if not shutil.which("tesseract"):
+        sys.exit("tesseract not found; install it to run this benchmark")
+
+    results, summary = run(max(1, args.pairs))
+    print(f"{'mode':<16} {'n':>3} {'p50 ms':>9} {'max ms':>9} {'accuracy':>9}")
+    for r in results:
+        acc = f"{r['accuracy']:.3f}" if r["accuracy"] is not None else "-"
+        print(f"{r['mode']:<16} {r['n']:>3} {r['p50_ms']:>9.2f} {r['max_ms']:>9.2f} {acc:>9}")
+    print(f"cache: {summary}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""OCR preprocessing benchmark: latency vs. accuracy per preprocessing configuration.
+
+Usage:
+    python benchmarks/bench_ocr_preprocess.py [--repeat 3] [--json out.json]
+
+Every fixture screenshot is OCR'd once per configuration. Accuracy is the
+difflib similarity between the normalized OCR output and the ground truth.
+"""
+
+import argparse
+import difflib
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hintify  # noqa: E402
+from bench_pipeline import latency_stats  # noqa: E402
+from fixtures import load_fixtures  # noqa: E402
+
+ALL_OFF = {k: False for k in hintify.OCR_PREPROCESS_KEYS}
+BASE = dict(
+    ALL_OFF,
+    ocr_target_line_height=hintify.DEFAULT_CONFIG["ocr_target_line_height"],
+    ocr_max_pixels=None,
+)
+
+CONFIGS = [
+    ("raw", None),
+    ("grayscale", dict(BASE, ocr_grayscale=True)),
+    ("gray+crop", dict(BASE, ocr_grayscale=True, ocr_autocrop=True)),
+    ("gray+crop+downscale", dict(BASE, ocr_grayscale=True, ocr_autocrop=True, ocr_downscale=True)),
+    ("gray+crop+downscale+binarize", dict(BASE, ocr_grayscale=True, ocr_autocrop=True, ocr_downscale=True, ocr_binarize=True)),
+    ("enabled defaults", hintify.ocr_preprocess_options(dict(hintify.DEFAULT_CONFIG, ocr_preprocess=True))),
+]
+
+
+def accuracy(got, truth):
+    a = hintify.normalize_question_text(got)
+    b = hintify.normalize_question_text(truth)
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def run(repeat=1):
+    fixtures = load_fixtures()
+    results = []
+    for name, options in CONFIGS:
+        engine = hintify.TesseractCLIEngine(preprocess=options)
+        latencies, scores, pixels = [], [], []
+        for _, image, truth in fixtures:
+            if options:
+                pixels.append(hintify.preprocess_for_ocr(image, options).size)
+            else:
+                pixels.append(image.size)
+            for _ in range(repeat):
+                started = time.perf_counter()
+                text = engine.recognize(image)
+                latencies.append(time.perf_counter() - started)
+            scores.append(accuracy(text, truth))
+        results.append({
+            "config": name,
+            "images": len(fixtures),
+            "mean_ms": statistics.mean(latencies) * 1000,
+            "p95_ms": latency_stats(latencies).percentile(95) * 1000,
+            "mean_megapixels": statistics.mean(w * h for w, h in pixels) / 1e6,
+            "accuracy": statistics.mean(scores),
+            "min_accuracy": min(scores),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1, help="OCR runs per image and configuration")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if not hintify.ensure_tesseract_binary():
+        sys.exit(1)
+    results = run(repeat=max(1, args.repeat))
+
+    print(f"{'config':<30} {'mean ms':>9} {'p95 ms':>9} {'MPix':>6} {'acc':>6} {'min acc':>8}")
+    for r in results:
+        print(f"{r['config']:<30} {r['mean_ms']:>9.0f} {r['p95_ms']:>9.0f} {r['mean_megapixels']:>6.2f} {r['accuracy']:>6.3f} {r['min_accuracy']:>8.3f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
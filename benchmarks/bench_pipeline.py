@@ -0,0 +1,193 @@
+"""Per-stage benchmark of the clipboard → OCR → hints pipeline.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--iterations 200] [--stages a,b] [--json out.json]
+    python benchmarks/bench_pipeline.py --compare baseline.json [--threshold 0.15]
+
+Uses the fixture screenshots from fixtures.py, canned model responses from
+canned.py and a local mock Ollama/Gemini server (mock_llm.py), so numbers are
+reproducible and comparable across commits. Stages needing the tesseract binary
+are skipped when it is not installed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from canned import RESPONSES  # noqa: E402
+from fixtures import QUESTIONS, load_fixtures, png_bytes  # noqa: E402
+from mock_llm import MockLLMServer  # noqa: E402
+
+
+def latency_stats(samples):
+    """hintify.LatencyStats over all of samples, so benchmarks share the app's nearest-rank percentiles."""
+    stats = hintify.LatencyStats(window=max(1, len(samples)))
+    for seconds in samples:
+        stats.add(seconds)
+    return stats
+
+
+def measure(stage, fn, inputs, iterations, warmup=2):
+    """Call fn(input) `iterations` times cycling over inputs; return latency/throughput stats."""
+    for i in range(min(warmup, len(inputs))):
+        fn(inputs[i])
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        item = inputs[i % len(inputs)]
+        t0 = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+    stats = latency_stats(timings)
+    return {
+        "stage": stage,
+        "n": iterations,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": stats.percentile(50) * 1000,
+        "p95_ms": stats.percentile(95) * 1000,
+        "p99_ms": stats.percentile(99) * 1000,
+        "throughput_per_s": iterations / wall if wall else 0.0,
+    }
+
+
+def build_stages(mock):
+    """Return [(stage name, fn, inputs, iteration divisor)]; heavy stages run fewer iterations."""
+    fixtures = load_fixtures()
+    images = [image for _, image, _ in fixtures]
+    pngs = [png_bytes(image) for image in images]
+    prompts = [hintify.build_prompt(q, hintify.classify_question(q), hintify.detect_difficulty(q)) for q in QUESTIONS]
+    options = hintify.ocr_preprocess_options(dict(hintify.DEFAULT_CONFIG, ocr_preprocess=True))
+    model = mock.models[0]
+
+    def classify(text):
+        hintify.classify_question(text)
+        hintify.detect_difficulty(text)
+
+    def stream_ollama(prompt):
+        return hintify.stream_and_format_hints(hintify.stream_with_ollama(prompt, model), lambda line: None)
+
+    def stream_gemini(prompt):
+        return hintify.stream_and_format_hints(hintify.stream_with_gemini(prompt, "gemini-2.0-flash", "mock-key"), lambda line: None)
+
+    stages = [
+        ("clipboard.fingerprint", hintify.clipboard_fingerprint, images, 4),
+        ("clipboard.encode", hintify.encode_clipboard_image, images, 4),
+        ("ocr.preprocess", lambda im: hintify.preprocess_for_ocr(im, options), images, 4),
+        ("classify", classify, QUESTIONS, 1),
+        ("build_prompt", lambda q: hintify.build_prompt(q, "Descriptive", "Medium"), QUESTIONS, 1),
+        ("sanitize", hintify.sanitize_and_format_hints, RESPONSES, 1),
+        ("llm.ollama", lambda p: hintify.query_with_ollama(p, model), prompts, 10),
+        ("llm.ollama.stream", stream_ollama, prompts, 10),
+        ("llm.gemini", lambda p: hintify.query_with_gemini(p, "gemini-2.0-flash", "mock-key"), prompts, 10),
+        ("llm.gemini.stream", stream_gemini, prompts, 10),
+    ]
+    if shutil.which("tesseract"):
+        stages.insert(3, ("ocr", hintify.extract_text_from_image, pngs, 20))
+    else:
+        print("[bench] tesseract not found; skipping the 'ocr' stage", file=sys.stderr)
+    return stages
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def run(iterations, only=None, latency=0.0, chunk_delay=0.0):
+    # Isolate from the user's config, caches and real model servers
+    hintify.CONFIG_PATH = os.path.join(tempfile.mkdtemp(prefix="hintify-bench-"), "config.json")
+    # The 'ocr' stage measures Tesseract itself; bench_ocr_cache.py covers the OCR cache
+    hintify.save_config(dict(hintify.DEFAULT_CONFIG, ocr_cache=False))
+    with MockLLMServer(latency=latency, chunk_delay=chunk_delay) as mock:
+        os.environ["OLLAMA_HOST"] = mock.url
+        hintify._ollama_client = None
+        hintify.GEMINI_API_BASE = f"{mock.url}/v1beta"
+        results = []
+        for stage, fn, inputs, divisor in build_stages(mock):
+            if only and stage not in only:
+                continue
+            results.append(measure(stage, fn, inputs, max(5, iterations // divisor)))
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    base = {r["stage"]: r for r in (baseline or {}).get("results", [])}
+    header = f"{'stage':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}"
+    if base:
+        header += f" {'Δp50':>8} {'Δp95':>8}"
+    print(header)
+    for r in report["results"]:
+        line = f"{r['stage']:<24} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['throughput_per_s']:>10.1f}"
+        old = base.get(r["stage"])
+        if old:
+            line += f" {delta(old['p50_ms'], r['p50_ms']):>+7.0%} {delta(old['p95_ms'], r['p95_ms']):>+7.0%}"
+        print(line)
+
+
+def delta(old, new):
+    return (new - old) / old if old else 0.0
+
+
+def regressions(report, baseline, threshold):
+    base = {r["stage"]: r for r in baseline.get("results", [])}
+    found = []
+    for r in report["results"]:
+        old = base.get(r["stage"])
+        if old and delta(old["p95_ms"], r["p95_ms"]) > threshold:
+            found.append((r["stage"], old["p95_ms"], r["p95_ms"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200, help="Iterations for the cheap stages (heavy stages run fewer)")
+    parser.add_argument("--stages", help="Comma-separated stage names to run (default: all)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock LLM first-token latency in seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Mock LLM delay between streamed chunks")
+    parser.add_argument("--json", help="Write the report as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed p95 regression ratio with --compare")
+    args = parser.parse_args()
+
+    only = set(args.stages.split(",")) if args.stages else None
+    report = run(args.iterations, only=only, latency=args.latency, chunk_delay=args.chunk_delay)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if baseline:
+        found = regressions(report, baseline, args.threshold)
+        for stage, old, new in found:
+            print(f"[bench] REGRESSION {stage}: p95 {old:.3f}ms -> {new:.3f}ms")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Prompt-prefix reuse benchmark: prompt-eval tokens and time per request by prompt layout.
+
+Usage:
+    python benchmarks/bench_prompt_cache.py [--rounds 3] [--per-token 0.0005] [--json out.json]
+    python benchmarks/bench_prompt_cache.py --host 127.0.0.1:11434 --model llama3.2:3b
+
+Compares the pre-split single prompt (question text in the middle of the
+instructions, via /api/generate) with SYSTEM_PROMPT + per-question user message
+via /api/chat. Without --host a mock server simulating Ollama's prefix KV cache is
+used; with --host the counters come from a real Ollama server.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from bench_pipeline import latency_stats  # noqa: E402
+from fixtures import QUESTIONS  # noqa: E402
+from mock_llm import MockLLMServer  # noqa: E402
+
+
+def legacy_prompt(text, qtype, difficulty):
+    """build_prompt as it was before the system/user split (kept for comparison)."""
+    return f"""
+You are SnapAssist AI, a study buddy for students.
+
+The following text was extracted from a screenshot:
+{text}
+
+Classification:
+- Type: {qtype}
+- Difficulty: {difficulty}
+
+Your role:
+- Provide ONLY hints, NEVER the exact answer or final numeric/option.
+- Do NOT solve the question fully.
+- Do NOT mention which option is correct.
+- Do NOT provide the final numeric value, simplified expression, or boxed result.
+- Instead, give guiding clues that push the student to think.
+
+Response format:
+Always output between 3 to 5 hints in this style:
+Hint 1: ...
+Hint 2: ...
+Hint 3: ...
+(Hint 4 and Hint 5 only if needed)
+
+Guidelines for hints:
+- Focus on relevant formulae, rules, and methods.
+- Use progressive layers: concept → formula → setup → approach → final nudge.
+- Each hint should guide without completing the solution.
+- Keep hints concise for faster responses.
+
+End with an encouragement such as:
+“Now try completing the final step on your own.”
+or
+“Work carefully through the last step to see which option fits.”
+
+If the text is not a valid question, reply only:
+⚠️ This does not appear to be a question.
+"""
+
+
+def legacy_call(client, text, qtype, difficulty, model):
+    return client.generate(legacy_prompt(text, qtype, difficulty), model)
+
+
+def split_call(client, text, qtype, difficulty, model):
+    return client.generate(hintify.build_user_prompt(text, qtype, difficulty), model, system=hintify.SYSTEM_PROMPT)
+
+
+LAYOUTS = [("legacy (generate)", legacy_call), ("system+user (chat)", split_call)]
+
+
+def run_layout(name, call, host, model, rounds):
+    client = hintify.OllamaClient(host=host)
+    inputs = [(q, hintify.classify_question(q), hintify.detect_difficulty(q)) for q in QUESTIONS]
+    call(client, *inputs[-1], model)  # warm-up: load the model and prime the prefix cache
+    tokens, prompt_eval, totals = [], [], []
+    for _ in range(rounds):
+        for text, qtype, difficulty in inputs:
+            before_tokens, before_n = client.prompt_tokens, client.prompt_eval.count
+            started = time.perf_counter()
+            call(client, text, qtype, difficulty, model)
+            totals.append(time.perf_counter() - started)
+            tokens.append(client.prompt_tokens - before_tokens)
+            prompt_eval.append(list(client.prompt_eval.samples)[-1] if client.prompt_eval.count > before_n else 0.0)
+    totals = latency_stats(totals)
+    return {
+        "layout": name,
+        "n": len(tokens),
+        "mean_prompt_tokens": statistics.mean(tokens),
+        "p50_prompt_eval_ms": latency_stats(prompt_eval).percentile(50) * 1000,
+        "p50_total_ms": totals.percentile(50) * 1000,
+        "p95_total_ms": totals.percentile(95) * 1000,
+    }
+
+
+def run(host=None, model=None, rounds=3, per_token=0.0005):
+    results = []
+    for name, call in LAYOUTS:
+        if host:
+            results.append(run_layout(name, call, host, model, rounds))
+            continue
+        # A fresh mock per layout so neither starts with the other's cached prefix
+        with MockLLMServer(prompt_eval_per_token=per_token) as mock:
+            results.append(run_layout(name, call, mock.url, model or mock.models[0], rounds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="Real Ollama host to measure (default: simulating mock server)")
+    parser.add_argument("--model", help="Ollama model (required with --host)")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the fixture questions per layout")
+    parser.add_argument("--per-token", type=float, default=0.0005, help="Mock prompt-eval seconds per token")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    args = parser.parse_args()
+    if args.host and not args.model:
+        parser.error("--model is required with --host")
+
+    results = run(args.host, args.model, max(1, args.rounds), args.per_token)
+    print(f"{'layout':<22} {'n':>4} {'prompt tok':>11} {'p50 eval ms':>12} {'p50 total ms':>13} {'p95 total ms':>13}")
+    for r in results:
+        print(f"{r['layout']:<22} {r['n']:>4} {r['mean_prompt_tokens']:>11.1f} {r['p50_prompt_eval_ms']:>12.1f} "
+              f"{r['p50_total_ms']:>13.1f} {r['p95_total_ms']:>13.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""GUI render benchmark: redraws, lines written and queue-to-screen latency under rapid updates.
+
+Usage:
+    python benchmarks/bench_render.py [--responses 20] [--gap 0.002] [--json out.json]
+
+Compares the pre-diff FixedWindow rendering (clear and re-insert on every response,
+one widget update per streamed line) with HintRenderer, which coalesces updates
+into one redraw per frame and rewrites only the lines that changed. Scenarios:
+streamed responses arriving faster than the frame rate, the same response shown
+repeatedly (cache hits), and bursts of complete responses queued at once.
+
+A hidden tkinter Text widget is used when a display is available; otherwise a
+line-list stand-in replays the same widget calls, so redraw and line counts are
+exact but the timings leave out Tk's layout work.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from canned import RESPONSES  # noqa: E402
+
+
+class TextStandIn:
+    """Headless stand-in for tk.Text covering the calls the renderers make."""
+
+    def __init__(self):
+        self.lines = [""]
+        self.timers = []
+
+    def _line_index(self, index):
+        if index == hintify.tk.END or index == "end":
+            return len(self.lines) - 1
+        return int(str(index).split(".", 1)[0]) - 1
+
+    def insert(self, index, *chunks):
+        text = "".join(chunks[::2])
+        parts = text.split("\n")
+        self.lines[-1] += parts[0]
+        self.lines.extend(parts[1:])
+
+    def delete(self, start, end=None):
+        del self.lines[self._line_index(start):]
+        self.lines.append("")
+
+    def config(self, **kwargs):
+        pass
+
+    def see(self, index):
+        pass
+
+    def winfo_exists(self):
+        return True
+
+    def after(self, ms, callback):
+        self.timers.append((time.perf_counter() + ms / 1000.0, callback))
+        return len(self.timers)
+
+    def update(self):
+        now = time.perf_counter()
+        due = [t for t in self.timers if t[0] <= now]
+        self.timers = [t for t in self.timers if t[0] > now]
+        for _, callback in due:
+            callback()
+
+    def pending(self):
+        return bool(self.timers)
+
+
+def make_widget():
+    """(widget, update, pending, close) backed by real Tk when a display is available."""
+    try:
+        root = hintify.tk.Tk()
+    except Exception:
+        widget = TextStandIn()
+        return widget, widget.update, widget.pending, lambda: None, "stand-in"
+    root.withdraw()
+    widget = hintify.tk.Text(root)
+    widget.pack()
+    for tag in ("hint_label", "hint_text", "enc"):
+        widget.tag_configure(tag)
+
+    def pending():
+        return bool(root.tk.call("after", "info"))
+
+    return widget, root.update, pending, root.destroy, "tk"
+
+
+class LegacyRenderer:
+    """FixedWindow.show/handle_event as they were before HintRenderer (kept for comparison)."""
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.flushes = 0
+        self.lines_written = 0
+        self.flush_seconds = 0.0
+        self.streamed = 0
+
+    def _insert_line(self, line):
+        import re
+        tk = hintify.tk
+        m = re.match(r"^(Hint\s+\d+:)(\s*)(.*)$", line.strip())
+        if m:
+            label, spaces, rest = m.group(1), m.group(2), m.group(3)
+            self.widget.insert(tk.END, label, ("hint_label",))
+            self.widget.insert(tk.END, spaces or " ")
+            self.widget.insert(tk.END, rest + "\n", ("hint_text",))
+        elif line.strip().lower().startswith("now try") or line.strip().lower().startswith("work carefully"):
+            self.widget.insert(tk.END, line + "\n", ("enc",))
+        else:
+            self.widget.insert(tk.END, line + "\n", ("hint_text",))
+        self.lines_written += 1
+
+    def show(self, response, rendered=None):
+        self.widget.config(state="normal")
+        self.widget.delete("1.0", hintify.tk.END)
+        for line in (response or "").splitlines():
+            self._insert_line(line)
+        self.widget.config(state="disabled")
+        self.flushes += 1
+        if rendered is not None:
+            hintify.record_render(rendered)
+
+    def handle_event(self, event):
+        if event.kind == "start":
+            self.streamed = 0
+            self.show("")
+        elif event.kind == "line":
+            self.widget.config(state="normal")
+            self._insert_line(event.text)
+            self.widget.config(state="disabled")
+            self.widget.see(hintify.tk.END)
+            self.flushes += 1
+            self.streamed += 1
+        elif event.kind == "done":
+            if not self.streamed:
+                self.show(event.text)
+            hintify.record_render(event)
+
+
+class DiffRenderer:
+    """FixedWindow.show/handle_event on top of HintRenderer."""
+
+    def __init__(self, widget, frame_ms):
+        self.renderer = hintify.HintRenderer(widget, frame_ms)
+        self.flush_seconds = 0.0
+        flush = self.renderer.flush
+
+        def timed_flush():
+            started = time.perf_counter()
+            flush()
+            self.flush_seconds += time.perf_counter() - started
+
+        self.renderer.flush = timed_flush
+
+    @property
+    def flushes(self):
+        return self.renderer.flushes
+
+    @property
+    def lines_written(self):
+        return self.renderer.lines_written
+
+    show = hintify.FixedWindow.show
+    handle_event = hintify.FixedWindow.handle_event
+
+
+def responses():
+    return [r for r in (hintify.sanitize_and_format_hints(raw) for raw in RESPONSES) if r]
+
+
+def scenario_batches(name, count):
+    """[[item spec, ...] per queue delivery]; specs are turned into queue items when delivered."""
+    texts = responses()
+    batches = []
+    for i in range(count):
+        text = texts[i % len(texts)]
+        job = f"{name}-{i}"
+        if name == "stream":
+            batches.append([("start", "", job)])
+            batches.extend([("line", line, job)] for line in text.splitlines())
+            batches.append([("done", text, job)])
+        elif name == "repeat":
+            batches.append([(None, texts[0], job)])
+        elif name == "burst":
+            batches.append([(None, texts[(i + k) % len(texts)], f"{job}-{k}") for k in range(5)])
+    return batches
+
+
+def run_case(make_renderer, name, count, gap):
+    widget, update, pending, close, backend = make_widget()
+    renderer = make_renderer(widget)
+    hintify.tracer.stages.pop("render", None)
+    busy = 0.0
+    for specs in scenario_batches(name, count):
+        # Items are created (queued) here; the delay until they are on screen is the render span
+        batch = [hintify.HintEvent(kind, text, job_id=job) if kind else hintify.HintText(text, job) for kind, text, job in specs]
+        deadline = time.perf_counter() + gap
+        started = time.perf_counter()
+        for item in batch:
+            if isinstance(item, hintify.HintEvent):
+                renderer.handle_event(item)
+            else:
+                renderer.show(item, item)
+        busy += time.perf_counter() - started
+        while True:
+            update()
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(0.0005)
+    while pending():
+        update()
+        time.sleep(0.0005)
+    busy += renderer.flush_seconds
+    stats = hintify.tracer.stages.get("render") or hintify.LatencyStats()
+    close()
+    return {
+        "backend": backend,
+        "redraws": renderer.flushes,
+        "lines_written": renderer.lines_written,
+        "busy_ms": busy * 1000,  # time spent in the renderer on the Tk thread
+        "render_p50_ms": stats.percentile(50) * 1000,
+        "render_p95_ms": stats.percentile(95) * 1000,
+    }
+
+
+def run(count=20, gap=0.002, frame_ms=16):
+    results = []
+    for scenario in ("stream", "repeat", "burst"):
+        for label, factory in (("legacy", LegacyRenderer), ("diff", lambda w: DiffRenderer(w, frame_ms))):
+            result = run_case(factory, scenario, count, gap)
+            results.append(dict(result, scenario=scenario, renderer=label))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=20, help="Responses per scenario")
+    parser.add_argument("--gap", type=float, default=0.002, help="Seconds between queue deliveries")
+    parser.add_argument("--frame-ms", type=int, default=16, help="HintRenderer frame interval")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(max(1, args.responses), args.gap, args.frame_ms)
+    print(f"backend: {results[0]['backend']}")
+    print(f"{'scenario':<8} {'renderer':<8} {'redraws':>8} {'lines':>7} {'busy ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{r['scenario']:<8} {r['renderer']:<8} {r['redraws']:>8} {r['lines_written']:>7} {r['busy_ms']:>9.2f} "
+              f"{r['render_p50_ms']:>8.2f} {r['render_p95_ms']:>8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
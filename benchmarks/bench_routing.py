@@ -0,0 +1,93 @@
+"""Routing benchmark: end-to-end hint latency per difficulty tier with routing off vs on.
+
+Usage:
+    python benchmarks/bench_routing.py [--rounds 3] [--per-token 0.0005] [--chunk-delay 0.005] [--json out.json]
+
+Runs generate_hints over the fixture questions plus a few non-question captures,
+once with the pre-routing behaviour (one model, full prompt, no output cap, every
+capture sent to the LLM), with the default routing policy, and with the trimmed
+prompt template for Easy questions on the same model. The mock server
+charges prompt-eval time per token and truncates output at num_predict; it cannot
+model a smaller/faster model per tier, so ollama_model_* routing is not measured here.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from fixtures import QUESTIONS  # noqa: E402
+from mock_llm import MockLLMServer  # noqa: E402
+
+NON_QUESTIONS = [
+    "Chapter 4 Linear Equations",
+    "Page 12 of 48",
+    "Figure 2.1 The water cycle",
+    "Table of contents",
+]
+
+MODES = [
+    ("off", {"routing": False, "skip_non_questions": False}),
+    ("on", {}),
+    ("on+short", {"prompt_template_easy": "short"}),
+]
+
+
+def run_mode(overrides, mock, rounds):
+    hintify.save_config(dict(hintify.DEFAULT_CONFIG, hint_cache=False, **overrides))
+    hintify.route_latency.clear()
+    args = types.SimpleNamespace(ollama_model=mock.models[0], provider_strategy=None)
+    calls_before = len(mock.requests)
+    totals = []
+    for _ in range(rounds):
+        for text in QUESTIONS + NON_QUESTIONS:
+            started = time.perf_counter()
+            hintify.generate_hints(text, hintify.classify_question(text), hintify.detect_difficulty(text), args)
+            totals.append(time.perf_counter() - started)
+    calls = sum(1 for method, path, _ in mock.requests[calls_before:] if path in ("/api/generate", "/api/chat"))
+    tiers = {tier: {"n": s.count, "p50_ms": s.percentile(50) * 1000, "mean_ms": s.total / s.count * 1000}
+             for tier, s in sorted(hintify.route_latency.items())}
+    return {"n": len(totals), "llm_calls": calls, "mean_ms": statistics.mean(totals) * 1000, "tiers": tiers}
+
+
+def run(rounds=3, per_token=0.0005, chunk_delay=0.005):
+    hintify.CONFIG_PATH = os.path.join(tempfile.mkdtemp(prefix="hintify-bench-"), "config.json")
+    results = {}
+    for name, overrides in MODES:
+        # A fresh mock per mode so neither starts with the other's cached prompt prefix
+        with MockLLMServer(prompt_eval_per_token=per_token, chunk_delay=chunk_delay) as mock:
+            os.environ["OLLAMA_HOST"] = mock.url
+            hintify._ollama_client = None
+            results[name] = run_mode(overrides, mock, rounds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the corpus per mode")
+    parser.add_argument("--per-token", type=float, default=0.0005, help="Mock prompt-eval seconds per token")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="Mock delay between streamed chunks")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(max(1, args.rounds), args.per_token, args.chunk_delay)
+    print(f"{'routing':<8} {'tier':<8} {'n':>4} {'p50 ms':>9} {'mean ms':>9}")
+    for name, r in results.items():
+        for tier, t in r["tiers"].items():
+            print(f"{name:<8} {tier:<8} {t['n']:>4} {t['p50_ms']:>9.1f} {t['mean_ms']:>9.1f}")
+        print(f"{name:<8} {'all':<8} {r['n']:>4} {'':>9} {r['mean_ms']:>9.1f}   llm calls: {r['llm_calls']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
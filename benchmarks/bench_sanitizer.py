@@ -0,0 +1,161 @@
+"""Golden-file check and microbenchmark for the hint sanitizer.
+
+Usage:
+    python benchmarks/bench_sanitizer.py [--iterations 2000]
+    python benchmarks/bench_sanitizer.py --update-golden
+
+Checks that sanitize_and_format_hints, the generator form (format_hint_lines)
+and the streaming formatter produce byte-identical output to the golden corpus
+in benchmarks/golden/sanitizer.json. It also fuzzes them against the original
+multi-regex implementation (kept below as legacy_sanitize) and times both.
+Exits 1 on any mismatch.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from canned import EDGE_CASES, RESPONSES  # noqa: E402
+
+GOLDEN_PATH = os.path.join(BENCH_DIR, "golden", "sanitizer.json")
+
+
+def legacy_sanitize(raw_text):
+    """The sanitizer as it was before it was precompiled; the reference behaviour."""
+    if not raw_text:
+        return "[LLM Error] Empty response"
+    text = raw_text.strip()
+    lines = [l.strip() for l in re.split(r"[\n\r]+", text) if l.strip()]
+    hint_lines = []
+    for line in lines:
+        lowered = line.lower()
+        if re.search(r"\b(answer|final|equals|=)\b", lowered):
+            continue
+        if re.search(r"\boption\s*[abcd]\b", lowered):
+            continue
+        if re.search(r"\([A-D]\)\s*\S+", line):
+            continue
+        if re.match(r"^(hint|step)\s*\d*\s*[:\-]", lowered):
+            hint_lines.append(line)
+        elif re.match(r"^[\-\*•]", line):
+            hint_lines.append(re.sub(r"^[\-\*•]\s*", "", line))
+        else:
+            if 3 <= len(line.split()) <= 30:
+                hint_lines.append(line)
+    seen = set()
+    filtered = []
+    for h in hint_lines:
+        k = h.lower()
+        if k not in seen:
+            seen.add(k)
+            filtered.append(h)
+    while len(filtered) < 3:
+        filtered.append("Focus on identifying knowns, selecting a method, then setting up steps.")
+    filtered = filtered[:5]
+    numbered = []
+    for i, h in enumerate(filtered, 1):
+        h = re.sub(r"^(hint|step)\s*\d*\s*[:\-]\s*", "", h, flags=re.IGNORECASE)
+        numbered.append(f"Hint {i}: {h}")
+    return "\n".join(numbered + ["Now try completing the final step on your own."])
+
+
+def corpus():
+    return RESPONSES + EDGE_CASES
+
+
+def streamed(raw_text, rng):
+    """Feed raw_text through the streaming formatter in random-sized chunks."""
+    chunks, i = [], 0
+    while i < len(raw_text):
+        n = rng.randint(1, 12)
+        chunks.append(raw_text[i:i + n])
+        i += n
+    return hintify.stream_and_format_hints(iter(chunks), lambda line: None)
+
+
+def generator_form(raw_text):
+    if not raw_text:
+        return "[LLM Error] Empty response"
+    return "\n".join(hintify.format_hint_lines(re.split(r"[\n\r]", raw_text)))
+
+
+def fuzz_inputs(n, rng):
+    """Random recombinations of corpus lines with mixed separators."""
+    lines = [l for text in corpus() for l in re.split(r"[\n\r]+", text) if l]
+    for _ in range(n):
+        picked = [rng.choice(lines) for _ in range(rng.randint(0, 12))]
+        yield "".join(line + rng.choice(["\n", "\r\n", "\n\n", "\r", " \n"]) for line in picked)
+
+
+def check(fuzz=2000, seed=7):
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    rng = random.Random(seed)
+    failures = []
+    for case in golden:
+        raw, expected = case["input"], case["output"]
+        for name, got in (
+            ("sanitize", hintify.sanitize_and_format_hints(raw)),
+            ("generator", generator_form(raw)),
+            ("stream", streamed(raw, rng)),
+        ):
+            if got != expected:
+                failures.append((name, raw, expected, got))
+    for raw in fuzz_inputs(fuzz, rng):
+        expected = legacy_sanitize(raw)
+        for name, got in (("sanitize", hintify.sanitize_and_format_hints(raw)), ("stream", streamed(raw, rng))):
+            if got != expected:
+                failures.append((f"fuzz-{name}", raw, expected, got))
+    return len(golden), failures
+
+
+def bench(fn, inputs, iterations):
+    for text in inputs:
+        fn(text)
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(inputs[i % len(inputs)])
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000, help="Calls per implementation in the microbenchmark")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random inputs compared against the legacy implementation")
+    parser.add_argument("--update-golden", action="store_true", help="Regenerate the golden file from legacy_sanitize")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump([{"input": raw, "output": legacy_sanitize(raw)} for raw in corpus()], f, indent=1, ensure_ascii=False)
+            f.write("\n")
+        print(f"[bench] wrote {len(corpus())} golden cases to {GOLDEN_PATH}")
+        return
+
+    cases, failures = check(fuzz=args.fuzz)
+    for name, raw, expected, got in failures[:5]:
+        print(f"[bench] MISMATCH ({name}) for {raw!r}:\n  expected {expected!r}\n  got      {got!r}")
+    print(f"[bench] golden cases: {cases}, fuzzed inputs: {args.fuzz}, mismatches: {len(failures)}")
+
+    inputs = RESPONSES
+    old = bench(legacy_sanitize, inputs, args.iterations)
+    new = bench(hintify.sanitize_and_format_hints, inputs, args.iterations)
+    print(f"{'implementation':<16} {'us/call':>9}")
+    print(f"{'legacy':<16} {old * 1e6:>9.2f}")
+    print(f"{'single-pass':<16} {new * 1e6:>9.2f}")
+    print(f"speedup: {old / new:.2f}x")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
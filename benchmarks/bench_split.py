@@ -0,0 +1,106 @@
+"""Worksheet benchmark: one prompt for the whole page vs one concurrent prompt per question.
+
+Usage:
+    python benchmarks/bench_split.py [--rounds 3] [--questions 3] [--chunk-delay 0.01] [--json out.json]
+
+Each round submits a numbered worksheet of fixture questions through HintPipeline,
+with split_questions off (the whole text in one generation, as before) and on
+(one generation per question, run concurrently). Reports the time to the
+first hints on screen (first streamed line unsplit, first finished question split)
+and to the complete response.
+
+The mock answers every prompt with one canned response of 3-5 hints, whatever
+it asks for, so the unsplit mode is charged for one question's worth of output
+rather than hints for all of them: the totals here show the overhead of the
+extra concurrent requests, not the per-question gain. A real Ollama server
+only overlaps requests up to OLLAMA_NUM_PARALLEL and queues the rest.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import hintify  # noqa: E402
+from bench_pipeline import latency_stats  # noqa: E402
+from fixtures import QUESTIONS  # noqa: E402
+from mock_llm import MockLLMServer  # noqa: E402
+
+
+def worksheet(start, count):
+    questions = [QUESTIONS[(start + i) % len(QUESTIONS)].replace("\n", " ") for i in range(count)]
+    return "\n".join(f"{i + 1}. {q}" for i, q in enumerate(questions))
+
+
+def run_mode(split, mock, rounds, count):
+    hintify.save_config(dict(hintify.DEFAULT_CONFIG, hint_cache=False, ollama_prewarm=False, split_questions=split,
+                             recent_requests_ttl=0))
+    args = types.SimpleNamespace(ollama_model=mock.models[0], provider_strategy=None, stream=True, server=None)
+    pipeline = hintify.HintPipeline(args).start()
+    first, total, parts = [], [], []
+    try:
+        for r in range(rounds):
+            started = time.perf_counter()
+            job = pipeline.submit_text(worksheet(r * count, count))
+            seen = None
+            while True:
+                event = pipeline.results.get(timeout=30)
+                if event.job_id != job.job_id:
+                    continue
+                if event.kind in ("line", "part") and seen is None:
+                    seen = time.perf_counter() - started
+                if event.kind == "done":
+                    total.append(time.perf_counter() - started)
+                    first.append(seen if seen is not None else total[-1])
+                    break
+            parts.append(len(job.parts or [job.text]))
+    finally:
+        pipeline.loop.call_soon_threadsafe(pipeline.loop.stop)
+    return {
+        "split": split,
+        "n": len(total),
+        "questions": sum(parts) / len(parts),
+        "p50_first_ms": latency_stats(first).percentile(50) * 1000,
+        "p50_total_ms": latency_stats(total).percentile(50) * 1000,
+        "max_total_ms": max(total) * 1000,
+    }
+
+
+def run(rounds=3, count=3, latency=0.2, chunk_delay=0.01):
+    hintify.CONFIG_PATH = os.path.join(tempfile.mkdtemp(prefix="hintify-bench-"), "config.json")
+    results = []
+    for split in (False, True):
+        with MockLLMServer(latency=latency, chunk_delay=chunk_delay) as mock:
+            os.environ["OLLAMA_HOST"] = mock.url
+            hintify._ollama_client = None
+            results.append(run_mode(split, mock, rounds, count))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3, help="Worksheets per mode")
+    parser.add_argument("--questions", type=int, default=3, help="Questions per worksheet")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Mock delay between streamed chunks")
+    parser.add_argument("--json", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(max(1, args.rounds), max(1, args.questions), args.latency, args.chunk_delay)
+    print(f"{'split':<6} {'n':>3} {'questions':>9} {'p50 first ms':>13} {'p50 total ms':>13} {'max total ms':>13}")
+    for r in results:
+        print(f"{str(r['split']):<6} {r['n']:>3} {r['questions']:>9.1f} {r['p50_first_ms']:>13.1f} "
+              f"{r['p50_total_ms']:>13.1f} {r['max_total_ms']:>13.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
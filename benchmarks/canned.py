@@ -0,0 +1,77 @@
+"""Canned raw model responses used by the mock LLM server and the sanitizer benchmarks.
+
+They mimic what small local models actually return: numbered hints, bullets,
+leaked answers, option letters, preambles and trailing chatter. EDGE_CASES are
+sanitizer-only inputs for the golden corpus (benchmarks/golden/).
+"""
+
+RESPONSES = [
+    # Well-formed
+    "Hint 1: Move the constant term to the other side of the equation.\n"
+    "Hint 2: Think about which operation undoes multiplication by 3.\n"
+    "Hint 3: Check your value by substituting it back into the original equation.\n"
+    "Now try completing the final step on your own.",
+    # Leaks the answer and an option
+    "Sure! Here are some hints:\n"
+    "Hint 1: Recall the definition of a prime number.\n"
+    "Hint 2: Test each option for divisibility by 3.\n"
+    "Hint 3: Eliminate the options that have more than two factors.\n"
+    "The answer is (C) 29.\n"
+    "Option C is correct.",
+    # Bullets and steps
+    "- Identify the total distance and the total time.\n"
+    "* Average speed relates distance and time directly.\n"
+    "• Make sure the units match what the question asks for.\n"
+    "Step 4: Divide carefully and keep the decimal.\n"
+    "Final: 72 km/h",
+    # Too few hints
+    "Use the power rule.",
+    # Too many hints, some duplicates
+    "Hint 1: Write the two equations one under the other.\n"
+    "Hint 2: Choose a variable to eliminate.\n"
+    "Hint 2: Choose a variable to eliminate.\n"
+    "Hint 3: Multiply the second equation so the coefficients match.\n"
+    "Hint 4: Add or subtract the equations.\n"
+    "Hint 5: Solve for the remaining variable.\n"
+    "Hint 6: Substitute back to find the other variable.\n"
+    "x = 3, y = 2",
+    # Windows line endings and blank lines
+    "Hint 1: Count the total number of balls first.\r\n\r\n"
+    "Hint 2: The second draw depends on the first one.\r\n"
+    "Hint 3: Multiply the probabilities of the two draws.\r\n",
+    # Long preamble, markdown-ish
+    "Great question! Let's think about this step by step without giving it away.\n\n"
+    "**Hint 1:** pH is defined using a logarithm of the hydrogen ion concentration.\n"
+    "**Hint 2:** Look at the exponent in the concentration.\n"
+    "**Hint 3:** Remember the minus sign in the definition.\n"
+    "(B) 4 is the one.\n"
+    "Work carefully through the last step to see which option fits.",
+    # Not a question
+    "⚠️ This does not appear to be a question.",
+    # Long single line (over 30 words) followed by short ones
+    "To approach this proof you should begin by drawing a triangle and a line through one vertex that is "
+    "parallel to the opposite side and then consider the pairs of alternate interior angles that are formed "
+    "by this construction.\n"
+    "Hint: Alternate interior angles are equal.\n"
+    "Hint: Angles on a straight line add up to a known value.",
+    # Empty-ish
+    "   \n\n  ",
+]
+
+EDGE_CASES = [
+    "",
+    "\n",
+    "Hint 1: Same text twice.\nHint 2: Same text twice.\nhint 3: same TEXT twice.",
+    "- Same bullet\n* same bullet\n• Same Bullet\n-Hint 4: bullet with a prefix",
+    "x=3 is tempting\nx = 3 is spaced\nThe value equals four\nfinally we are done here\nOption   b fits\n(A)\n(a) lower option value",
+    "Step 1 - isolate the variable first\nSTEP2: divide both sides\nHint:no space after colon here\nhint - dash separated prefix",
+    "\r\r\rOnly carriage returns here\rSecond line with words\r\rThird line also here\r",
+    "\t  Indented line with tabs  \t\n\u00a0Non-breaking space leading line\u00a0\n\u3000Ideographic space line here",
+    "Hint ١: Arabic-Indic digit prefix line\nHint 2\u2028with a line separator inside\nThird\x0bvertical\x0ctab form feed",
+    "ſtep: long s prefix line here\nHİNT 1: dotted capital I line\nKelvin K sign Kline here",
+    "one two\nthree words here\n" + " ".join(["word"] * 30) + "\n" + " ".join(["word"] * 31),
+    "Hint 1: a\nHint 2: b\nHint 3: c\nHint 4: d\nHint 5: e\nHint 6: f\nHint 7: g",
+    "No newline at all but enough words to be a hint",
+    "Hint 1: Überlege, welche Größe gesucht ist.\nHint 2: 用已知条件列出方程。\nHint 3: Vérifie l'unité du résultat.",
+    "**Hint 1:** bold markdown prefix\n1. Numbered list item with words\n> quoted line with several words",
+]
@@ -0,0 +1,95 @@
+"""Fixture question screenshots for the Hintify benchmarks.
+
+Screenshots are rendered on the fly from known question text so every machine
+gets the same pixels and OCR accuracy can be scored against ground truth. Real
+screenshots can be added to benchmarks/fixtures/ as NAME.png + NAME.txt pairs.
+"""
+
+import os
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+QUESTIONS = [
+    "Find the value of x if 3x + 7 = 22.",
+    "A train travels 180 km in 2.5 hours. What is its average speed in km per hour?",
+    "Which of the following is a prime number? (A) 21 (B) 27 (C) 29 (D) 33",
+    "Prove that the sum of the interior angles of a triangle is 180 degrees.",
+    "Calculate the derivative of f(x) = x^3 - 4x^2 + 6x - 2 and evaluate it at x = 2.",
+    "A box contains 4 red and 6 blue balls. Two balls are drawn without replacement. "
+    "Find the probability that both balls are blue.",
+    "Solve the system of equations: 2x + 3y = 12 and x - y = 1.",
+    "What is the pH of a solution with hydrogen ion concentration 1 x 10^-4 mol/L? "
+    "(A) 2 (B) 4 (C) 10 (D) 12",
+]
+
+# (name, scale, theme, margin) variants approximating common capture setups
+VARIANTS = [
+    ("light-1x", 1, "light", 40),
+    ("light-2x-retina", 2, "light", 160),
+    ("dark-2x-retina", 2, "dark", 160),
+    ("light-3x-zoomed", 3, "light", 240),
+]
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has no scalable default font
+        for path in ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/Library/Fonts/Arial.ttf", "C:\\Windows\\Fonts\\arial.ttf"):
+            if os.path.exists(path):
+                return ImageFont.truetype(path, size)
+        return ImageFont.load_default()
+
+
+def _wrap(text, width_chars=48):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width_chars:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def render_question(text, scale=2, theme="light", margin=160):
+    """Render question text like a screenshot: wrapped 15px-at-1x text, padded with empty margin."""
+    font = _font(15 * scale)
+    lines = _wrap(text)
+    line_height = 22 * scale
+    width = 520 * scale + 2 * margin
+    height = line_height * len(lines) + 2 * margin
+    bg, fg = ("white", "black") if theme == "light" else ("#0f172a", "#e5e7eb")
+    image = Image.new("RGB", (width, height), bg)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((margin, margin + i * line_height), line, fill=fg, font=font)
+    return image
+
+
+def png_bytes(image):
+    buf = BytesIO()
+    image.convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def load_fixtures(variants=None):
+    """Return [(name, PIL image, ground-truth text)], rendered fixtures plus any on-disk ones."""
+    fixtures = []
+    for vname, scale, theme, margin in variants or VARIANTS:
+        for i, text in enumerate(QUESTIONS):
+            fixtures.append((f"q{i}-{vname}", render_question(text, scale, theme, margin), text))
+    if os.path.isdir(FIXTURE_DIR):
+        for name in sorted(os.listdir(FIXTURE_DIR)):
+            stem, ext = os.path.splitext(name)
+            truth = os.path.join(FIXTURE_DIR, stem + ".txt")
+            if ext.lower() == ".png" and os.path.exists(truth):
+                with open(truth, "r", encoding="utf-8") as f:
+                    fixtures.append((stem, Image.open(os.path.join(FIXTURE_DIR, name)).convert("RGB"), f.read().strip()))
+    return fixtures
@@ -0,0 +1,251 @@
+"""Local mock of the Ollama and Gemini HTTP APIs for benchmarks and manual testing.
+
+Serves canned responses round-robin with configurable first-token latency and
+per-chunk delay, so LLM-bound stages can be measured without a model:
+
+    python benchmarks/mock_llm.py --port 11434 --latency 0.05
+    OLLAMA_HOST=127.0.0.1:11434 HINTIFY_GEMINI_API_BASE=http://127.0.0.1:11434/v1beta hintify
+
+Ollama:  GET /api/version, GET /api/tags, POST /api/pull, /api/generate, /api/chat
+Gemini:  POST /v1beta/models/<model>:generateContent, :streamGenerateContent?alt=sse
+
+`fail_statuses` makes the next Gemini requests answer with those HTTP statuses
+(e.g. [429, 503]) and models in `missing_models` answer 404, to exercise retries
+and model fallback.
+
+Like a real Ollama runner, the mock keeps the last prompt per model and only
+"evaluates" the tokens after the prefix it shares with the previous request
+(about 4 characters per token); `prompt_eval_per_token` adds that much delay per
+evaluated token so prompt layouts can be compared on prompt_eval count and time.
+Ollama's options.num_predict truncates the response at about 4 characters per token
+and reports done_reason "length", as Ollama does when it hits the cap.
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from canned import RESPONSES
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled or cancelled connections is expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class MockLLMServer:
+    def __init__(self, responses=None, latency=0.0, chunk_delay=0.0, chunk_size=8, models=None, host="127.0.0.1", port=0,
+                 fail_statuses=None, missing_models=None, prompt_eval_per_token=0.0):
+        self.responses = list(responses or RESPONSES)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.models = list(models or ["granite3.2-vision:2b", "llama3.2:3b"])
+        self.requests = []
+        self.connections = set()  # client (host, port) pairs seen; one per pooled keep-alive connection
+        self.fail_statuses = list(fail_statuses or [])
+        self.missing_models = set(missing_models or [])
+        self.prompt_eval_per_token = prompt_eval_per_token
+        self._kv_prefix = {}  # model -> last rendered prompt
+        self._cycle = itertools.cycle(self.responses)
+        self._lock = threading.Lock()
+        self._server = _QuietServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def next_response(self):
+        with self._lock:
+            return next(self._cycle)
+
+    def next_failure(self, path):
+        """HTTP status to fail a Gemini request with, or None to answer normally."""
+        model = path.split("/models/", 1)[-1].split(":", 1)[0]
+        if model in self.missing_models:
+            return 404
+        with self._lock:
+            return self.fail_statuses.pop(0) if self.fail_statuses else None
+
+    def prompt_eval(self, model, prompt):
+        """Tokens to evaluate for `prompt`, reusing the prefix cached from the model's last request."""
+        with self._lock:
+            previous = self._kv_prefix.get(model, "")
+            self._kv_prefix[model] = prompt
+        shared = 0
+        for a, b in zip(previous, prompt):
+            if a != b:
+                break
+            shared += 1
+        return max(1, (len(prompt) - shared) // 4)
+
+    def chunks(self, text):
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, obj, status=200):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _start_chunked(self, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def _chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _end_chunked(self):
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                mock.connections.add(self.client_address)
+                mock.requests.append(("GET", self.path, None))
+                if self.path == "/api/version":
+                    self._json({"version": "0.0.0-mock"})
+                elif self.path == "/api/tags":
+                    self._json({"models": [{"name": m, "model": m} for m in mock.models]})
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                mock.connections.add(self.client_address)
+                mock.requests.append(("POST", self.path, body))
+                try:
+                    if self.path == "/api/pull":
+                        if body.get("model") and body["model"] not in mock.models:
+                            mock.models.append(body["model"])
+                        self._json({"status": "success"})
+                    elif self.path in ("/api/generate", "/api/chat"):
+                        self._ollama(body, chat=self.path == "/api/chat")
+                    elif ":generateContent" in self.path or ":streamGenerateContent" in self.path:
+                        status = mock.next_failure(self.path)
+                        if status:
+                            self._json({"error": {"code": status, "message": "mock failure"}}, status)
+                        elif ":streamGenerateContent" in self.path:
+                            self._gemini_stream()
+                        else:
+                            time.sleep(mock.latency)
+                            self._json(self._gemini_payload(mock.next_response()))
+                    else:
+                        self._json({"error": "not found"}, 404)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client cancelled mid-stream
+
+            def _ollama_stats(self, text, evaluated, eval_seconds, truncated=False):
+                return {
+                    "done": True,
+                    "done_reason": "length" if truncated else "stop",
+                    "prompt_eval_count": evaluated,
+                    "prompt_eval_duration": int(eval_seconds * 1e9),
+                    "eval_count": max(1, len(text) // 4),
+                    "eval_duration": int(mock.chunk_delay * len(mock.chunks(text)) * 1e9),
+                }
+
+            def _ollama(self, body, chat):
+                text = mock.next_response()
+                num_predict = (body.get("options") or {}).get("num_predict")
+                truncated = bool(num_predict) and len(text) > num_predict * 4
+                if truncated:
+                    text = text[:num_predict * 4]
+                key = "message" if chat else "response"
+
+                def piece(t):
+                    return {"role": "assistant", "content": t} if chat else t
+
+                # Chat messages are rendered into one sequence the way a chat template would
+                prompt = body.get("prompt") or "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in body.get("messages") or [])
+                evaluated = mock.prompt_eval(body.get("model"), prompt)
+                eval_seconds = mock.latency + evaluated * mock.prompt_eval_per_token
+                time.sleep(eval_seconds)
+                if body.get("stream", True) is False:
+                    self._json(dict(self._ollama_stats(text, evaluated, eval_seconds, truncated), **{key: piece(text), "model": body.get("model")}))
+                    return
+                self._start_chunked("application/x-ndjson")
+                for part in mock.chunks(text):
+                    self._chunk((json.dumps({key: piece(part), "done": False}) + "\n").encode("utf-8"))
+                    time.sleep(mock.chunk_delay)
+                final = dict(self._ollama_stats(text, evaluated, eval_seconds, truncated), **{key: piece("")})
+                self._chunk((json.dumps(final) + "\n").encode("utf-8"))
+                self._end_chunked()
+
+            @staticmethod
+            def _gemini_payload(text):
+                return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+            def _gemini_stream(self):
+                text = mock.next_response()
+                time.sleep(mock.latency)
+                self._start_chunked("text/event-stream")
+                for part in mock.chunks(text):
+                    self._chunk(f"data: {json.dumps(self._gemini_payload(part))}\r\n\r\n".encode("utf-8"))
+                    time.sleep(mock.chunk_delay)
+                self._end_chunked()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama/Gemini HTTP server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--prompt-eval-per-token", type=float, default=0.0, help="Seconds per evaluated prompt token")
+    args = parser.parse_args()
+    server = MockLLMServer(latency=args.latency, chunk_delay=args.chunk_delay, port=args.port,
+                           prompt_eval_per_token=args.prompt_eval_per_token)
+    print(f"Mock LLM server on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,37 @@
 import os
 import sys
 import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import re
+import importlib
+import importlib.util
 import subprocess
 import hashlib
+import math
 import platform
 import shutil
 import argparse
 import webbrowser
 from io import BytesIO
 import json
+import csv
+import glob
 from threading import Thread
 import queue
 import site
+import atexit
+import threading
+import abc
+import base64
+import zlib
+import unicodedata
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from pathlib import Path
 
-response_queue = queue.Queue()
-
 # -------------------------------
 # 0. Setup & Dependency Helpers
 # -------------------------------
@@ -41,6 +56,41 @@ def colored_print(text, color=None):
     else:
         print(text)
 
+class LatencyStats:
+    """Rolling window of durations (seconds) with percentile summaries."""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, pct):
+        with self._lock:
+            data = sorted(self.samples)
+        if not data:
+            return 0.0
+        # nearest rank: the smallest sample with at least pct% of the window at or below it
+        rank = math.ceil(round(pct / 100.0 * len(data), 9))
+        return data[min(len(data) - 1, max(0, rank - 1))]
+
+    def summary(self):
+        if not self.count:
+            return "n=0"
+        with self._lock:
+            peak = max(self.samples)
+        return (
+            f"n={self.count} p50={self.percentile(50) * 1000:.0f}ms p95={self.percentile(95) * 1000:.0f}ms "
+            f"max={peak * 1000:.0f}ms"
+        )
+
+
 def ensure_package(package, import_name=None, extra_args=None):
     import_name = import_name or package
     try:
@@ -61,22 +111,322 @@ def ensure_package(package, import_name=None, extra_args=None):
             colored_print(f"[Setup] Failed to install '{package}': {e.stderr or e}", Colors.FAIL)
             return False
 
-# Core deps
-ensure_package("pillow", "PIL")
-ensure_package("pytesseract")
-ensure_package("keyring")
-ensure_package("requests")
+class StartupTimer:
+    """Records how long each startup phase takes (printed with --startup-report)."""
+
+    def __init__(self, started):
+        self.started = started
+        self._last = started
+        self.phases = []
+        self.imports = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def note_import(self, name, seconds):
+        self.imports.append((name, seconds))
+
+    def report(self):
+        lines = ["[Startup] phase timings:"]
+        for phase, seconds in self.phases:
+            lines.append(f"  {phase:<28} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'total (since module import)':<28} {(self._last - self.started) * 1000:8.1f} ms")
+        if self.imports:
+            lines.append("[Startup] lazy imports so far:")
+            for name, seconds in self.imports:
+                lines.append(f"  {name:<28} {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer(_IMPORT_STARTED)
+
+
+# ---------------------------------
+# Tracing (per-job stage spans)
+# ---------------------------------
+
+TRACE_LOG_PATH = os.path.expanduser("~/.hintify_trace.jsonl")
+TRACE_LOG_MAX_BYTES = 5 * 1024 * 1024  # rotated to .1 beyond this
+TRACE_STAGES = (
+    "capture", "hash", "encode", "ocr", "remote", "split", "classify", "prompt", "resolve", "ensure_model", "prewarm",
+    "llm.first_token", "llm", "sanitize", "render",
+)
+
+_current_trace = contextvars.ContextVar("hintify_trace", default=None)
+
+
+class Trace:
+    """Stage spans of one job, buffered until finish() so they all carry its job id.
+
+    Spans added after finish() (e.g. the GUI render) are emitted right away.
+    """
+
+    def __init__(self, tracer, job_id=None):
+        self.tracer = tracer
+        self.job_id = job_id
+        self.trace_id = os.urandom(16).hex()
+        self.started = time.time()
+        self._perf_started = time.perf_counter()
+        self.spans = []
+        self.status = None
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, start=None, **attrs):
+        span = (name, start if start is not None else time.time() - seconds, seconds, attrs)
+        with self._lock:
+            if self.status is None:
+                self.spans.append(span)
+                return
+        self.tracer.emit(self, [span])
+
+    def finish(self, status="ok"):
+        with self._lock:
+            if self.status is not None:
+                return
+            self.status = status
+            spans, self.spans = self.spans, []
+        if status != "discarded":
+            self.tracer.emit(self, spans, status=status, total=time.perf_counter() - self._perf_started)
+
+    def discard(self):
+        """Drop the buffered spans (e.g. a clipboard tick that found nothing new)."""
+        self.finish("discarded")
+
+
+@contextmanager
+def use_trace(trace):
+    """Make `trace` the current job's trace for this thread / task."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def record_span(name, seconds, **attrs):
+    """Record an already-timed stage under the current trace (or only in the stage stats)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds, **attrs)
+    else:
+        tracer.observe(name, seconds)
+
+
+@contextmanager
+def trace_span(name, **attrs):
+    """Time the enclosed block as stage `name`."""
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(name, time.perf_counter() - started, **attrs)
+
+
+class Tracer:
+    """Collects finished spans: rolling per-stage latency plus the configured exporters.
+
+    Exporters: JSON lines (`trace_log`, "-" for stderr), a Prometheus text file
+    (`metrics_file`, for node_exporter's textfile collector) and OpenTelemetry spans
+    (`trace_otel`, sent to whatever OTel SDK/exporter the process has configured).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.jobs = {}
+        self.log_path = None
+        self.metrics_path = None
+        self._otel = None
+        self._recent = OrderedDict()  # job_id -> finished Trace, for late spans
+        self._lock = threading.Lock()
+
+    def configure(self, log_path=None, metrics_path=None, otel=False):
+        self.log_path = log_path or None
+        self.metrics_path = metrics_path or None
+        self._otel = None
+        if otel:
+            try:
+                from opentelemetry import trace as otel_trace
+                self._otel = otel_trace.get_tracer("hintify")
+            except ImportError:
+                colored_print("[Trace] opentelemetry-api is not installed; OpenTelemetry export disabled.", Colors.WARNING)
+        return self
+
+    def start(self, job_id=None):
+        return Trace(self, job_id)
+
+    def observe(self, name, seconds):
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, LatencyStats())
+        stats.add(seconds)
+
+    def emit(self, trace, spans, status=None, total=None):
+        for name, _, seconds, _ in spans:
+            self.observe(name, seconds)
+        if status is not None:
+            stats = self.jobs.get(status)
+            if stats is None:
+                with self._lock:
+                    stats = self.jobs.setdefault(status, LatencyStats())
+            stats.add(total)
+            if trace.job_id is not None:
+                with self._lock:
+                    self._recent[trace.job_id] = trace
+                    while len(self._recent) > 64:
+                        self._recent.popitem(last=False)
+        if self.log_path:
+            self._write_log(trace, spans, status, total)
+        if self._otel is not None:
+            self._export_otel(trace, spans, status, total)
+        if self.metrics_path and status is not None:
+            self._write_metrics()
+        if DEBUG and status is not None:
+            stages = " ".join(f"{name}={seconds * 1000:.0f}ms" for name, _, seconds, _ in spans)
+            print(f"[Trace] job {trace.job_id} {status} in {total * 1000:.0f}ms: {stages}")
+
+    def record_job_span(self, job_id, name, seconds, **attrs):
+        """Add a span to an already finished job (falls back to the stage stats only)."""
+        with self._lock:
+            trace = self._recent.get(job_id)
+        if trace is None:
+            self.observe(name, seconds)
+        else:
+            trace.add(name, seconds, **attrs)
+
+    def _write_log(self, trace, spans, status, total):
+        records = [
+            dict(attrs, ts=round(start, 6), trace_id=trace.trace_id, job_id=trace.job_id, span=name, ms=round(seconds * 1000, 3))
+            for name, start, seconds, attrs in spans
+        ]
+        if status is not None:
+            records.append({"ts": round(trace.started, 6), "trace_id": trace.trace_id, "job_id": trace.job_id,
+                            "event": "job", "status": status, "ms": round(total * 1000, 3)})
+        text = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        try:
+            if self.log_path == "-":
+                sys.stderr.write(text)
+                return
+            with self._lock:
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > TRACE_LOG_MAX_BYTES:
+                    os.replace(self.log_path, self.log_path + ".1")
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(text)
+        except OSError as e:
+            colored_print(f"[Trace] Cannot write trace log {self.log_path}: {e}", Colors.WARNING)
+            self.log_path = None
+
+    def _export_otel(self, trace, spans, status, total):
+        from opentelemetry import trace as otel_trace
+
+        attrs = {"hintify.job_id": str(trace.job_id)}
+        if status is None:
+            parent = None
+        else:
+            parent = self._otel.start_span("hintify.job", start_time=int(trace.started * 1e9), attributes=dict(attrs, status=status))
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        for name, start, seconds, span_attrs in spans:
+            span = self._otel.start_span(name, context=context, start_time=int(start * 1e9),
+                                         attributes=dict(attrs, **{k: str(v) for k, v in span_attrs.items()}))
+            span.end(end_time=int((start + seconds) * 1e9))
+        if parent is not None:
+            parent.end(end_time=int((trace.started + total) * 1e9))
+
+    def _write_metrics(self):
+        tmp = f"{self.metrics_path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("\n".join(self.prometheus_lines()) + "\n")
+            os.replace(tmp, self.metrics_path)
+        except OSError as e:
+            colored_print(f"[Trace] Cannot write metrics file {self.metrics_path}: {e}", Colors.WARNING)
+            self.metrics_path = None
+
+    def prometheus_lines(self):
+        """Prometheus text exposition of the per-stage and per-job latency summaries."""
+        lines = []
+        with self._lock:
+            # observe() adds stages from pipeline threads; iterate over copies
+            stages, jobs = dict(self.stages), dict(self.jobs)
+        for metric, label, groups, help_text in (
+            ("stage_seconds", "stage", stages, "Latency of each pipeline stage."),
+            ("job_seconds", "status", jobs, "End-to-end job latency by outcome."),
+        ):
+            lines.append(f"# HELP hintify_{metric} {help_text}")
+            lines.append(f"# TYPE hintify_{metric} summary")
+            for key, stats in sorted(groups.items()):
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'hintify_{metric}{{{label}="{key}",quantile="{q}"}} {stats.percentile(q * 100):.6f}')
+                lines.append(f'hintify_{metric}_sum{{{label}="{key}"}} {stats.total:.6f}')
+                lines.append(f'hintify_{metric}_count{{{label}="{key}"}} {stats.count}')
+        return lines
+
+    def summary(self):
+        order = {name: i for i, name in enumerate(TRACE_STAGES)}
+        with self._lock:
+            stages = dict(self.stages)
+        names = sorted(stages, key=lambda n: (order.get(n, len(order)), n))
+        return " ".join(f"{name}[p50={stages[name].percentile(50) * 1000:.0f}ms p95={stages[name].percentile(95) * 1000:.0f}ms]"
+                        for name in names if stages[name].count)
+
+
+tracer = Tracer()
+
+
+class _LazyModule:
+    """Module proxy that imports the real module on first attribute access.
+
+    Heavy third-party modules (PIL, requests, keyring, tkinter...) are only
+    imported when a code path needs them, keeping `hintify --no-gui` startup fast.
+    """
 
-from PIL import Image, ImageGrab  # type: ignore
-import pytesseract  # type: ignore
-import keyring  # type: ignore
-import requests  # type: ignore
+    def __init__(self, name, package=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_package"] = name.split(".")[0] if package is None else package
+        self.__dict__["_module"] = None
 
-# Optional GUI
-try:
-    import tkinter as tk
-except Exception:
-    tk = None  # type: ignore
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            started = time.perf_counter()
+            try:
+                module = importlib.import_module(self._name)
+            except ImportError:
+                if self._package:
+                    colored_print(f"[Setup] Python package '{self._package}' is missing. Run 'hintify --doctor' to install it.", Colors.FAIL)
+                raise
+            self.__dict__["_module"] = module
+            startup_timer.note_import(self._name, time.perf_counter() - started)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+Image = _LazyModule("PIL.Image", "pillow")
+ImageChops = _LazyModule("PIL.ImageChops", "pillow")
+ImageFilter = _LazyModule("PIL.ImageFilter", "pillow")
+ImageGrab = _LazyModule("PIL.ImageGrab", "pillow")
+ImageOps = _LazyModule("PIL.ImageOps", "pillow")
+pytesseract = _LazyModule("pytesseract")
+keyring = _LazyModule("keyring")
+requests = _LazyModule("requests")
+# Standard library, but slow to import; only the pipeline's LLM stage needs it
+asyncio = _LazyModule("asyncio", package="")
+# Optional GUI (not pip-installable, so no install hint)
+tk = _LazyModule("tkinter", package="")
+
+# (pip package, import name) pairs checked by `hintify --doctor` and first-launch setup
+PYTHON_DEPENDENCIES = [
+    ("pillow", "PIL"),
+    ("pytesseract", "pytesseract"),
+    ("keyring", "keyring"),
+    ("requests", "requests"),
+    ("google-generativeai", "google.generativeai"),
+    ("pynput", "pynput"),
+]
 
 # Ensure Tesseract binary present (print guidance if missing)
 def ensure_tesseract_binary():
@@ -96,6 +446,136 @@ def ensure_tesseract_binary():
 # Sanitization & Formatting of Hints
 # ---------------------------------
 
+HINT_FILLER = "Focus on identifying knowns, selecting a method, then setting up steps."
+HINT_ENCOURAGEMENT = "Now try completing the final step on your own."
+
+
+# Compiled once; every pattern below is applied at most once per model-output line
+_LINE_RE = re.compile(r"[^\n\r]+")
+_ANSWER_LEAK_RE = re.compile(r"\b(?:answer|final|equals|=)\b|\boption\s*[abcd]\b")  # on the lowered line
+_ANSWER_LEAK_WORDS = ("answer", "final", "equals", "=", "option")
+_OPTION_VALUE_RE = re.compile(r"\([A-D]\)\s*\S+")
+_HINT_PREFIX_RE = re.compile(r"(?:hint|step)\s*\d*\s*[:\-]")  # on the lowered line
+_HINT_PREFIX_STRIP_RE = re.compile(r"(?:hint|step)\s*\d*\s*[:\-]\s*", re.IGNORECASE)
+_BULLET_RE = re.compile(r"[\-\*•]\s*")
+MAX_HINTS = 5
+MIN_HINTS = 3
+
+
+def _hint_candidate(line):
+    """Classify one stripped model-output line in a single pass.
+
+    Returns (dedup key, hint text without any 'Hint N:'/'Step N:' prefix), or None
+    if the line is dropped (final answers, revealed options, chatter).
+    """
+    lowered = line.lower()
+    # Skip obvious final answers (substring pre-checks avoid most regex calls)
+    if any(word in lowered for word in _ANSWER_LEAK_WORDS) and _ANSWER_LEAK_RE.search(lowered):
+        return None
+    if "(" in line and _OPTION_VALUE_RE.search(line):
+        return None
+    # Lines starting with Hint/Step: the prefix match doubles as the numbering strip
+    # (the prefix is ASCII, so offsets in the lowered line are valid in the original)
+    match = _HINT_PREFIX_RE.match(lowered)
+    if match:
+        return lowered, line[match.end():].lstrip()
+    # Bullets, or short hinty sentences
+    match = _BULLET_RE.match(line)
+    if match:
+        candidate = line[match.end():]
+    elif 3 <= len(line.split()) <= 30:
+        candidate = line
+    else:
+        return None
+    match = _HINT_PREFIX_STRIP_RE.match(candidate)
+    return candidate.lower(), candidate[match.end():] if match else candidate
+
+
+class HintStreamFormatter:
+    """Single-pass filter/formatter turning raw model output into 3-5 'Hint N: ...' lines.
+
+    Lines can be pushed one at a time (add_line) or as raw streamed chunks (feed);
+    each accepted hint is returned as soon as it is complete. Once five hints are
+    accepted the formatter is `full` and callers can stop reading the model.
+    finish() returns the trailing lines (padding + encouragement).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._seen = set()
+        self._received = False
+        self.lines = []
+
+    @property
+    def full(self):
+        return len(self._seen) >= MAX_HINTS
+
+    @property
+    def accepted(self):
+        """Number of hint lines taken from the model output (padding excluded)."""
+        return len(self._seen)
+
+    def add_line(self, line):
+        """Consider one raw line; returns the formatted hint line or None."""
+        line = line.strip()
+        if not line or len(self._seen) >= MAX_HINTS:
+            return None
+        hint = _hint_candidate(line)
+        if hint is None or hint[0] in self._seen:
+            return None
+        self._seen.add(hint[0])
+        out = f"Hint {len(self._seen)}: {hint[1]}"
+        self.lines.append(out)
+        return out
+
+    def feed(self, chunk):
+        if not chunk:
+            return []
+        self._received = True
+        if self.full:
+            return []
+        self._buffer += chunk
+        cut = max(self._buffer.rfind("\n"), self._buffer.rfind("\r"))
+        if cut < 0:
+            return []
+        complete, self._buffer = self._buffer[:cut], self._buffer[cut + 1:]
+        return [out for out in (self.add_line(m.group()) for m in _LINE_RE.finditer(complete)) if out]
+
+    def pad(self):
+        """Append filler hints up to the minimum and the encouragement line; returns them."""
+        start = len(self.lines)
+        while len(self.lines) < MIN_HINTS:
+            self.lines.append(f"Hint {len(self.lines) + 1}: {HINT_FILLER}")
+        self.lines.append(HINT_ENCOURAGEMENT)
+        return self.lines[start:]
+
+    def finish(self):
+        if not self._received:
+            self.lines = ["[LLM Error] Empty response"]
+            return list(self.lines)
+        last = self.add_line(self._buffer)
+        self._buffer = ""
+        return ([last] if last else []) + self.pad()
+
+    def text(self):
+        return "\n".join(self.lines)
+
+
+def format_hint_lines(lines):
+    """Generator form of the formatter: consume raw lines lazily, yield formatted lines.
+
+    Stops reading `lines` once five hints are accepted.
+    """
+    formatter = HintStreamFormatter()
+    for line in lines:
+        out = formatter.add_line(line)
+        if out:
+            yield out
+        if formatter.full:
+            break
+    yield from formatter.pad()
+
+
 def sanitize_and_format_hints(raw_text):
     """
     Normalize model output into 3-5 'Hint N: ...' lines, stripping any final answers.
@@ -105,56 +585,56 @@ def sanitize_and_format_hints(raw_text):
     """
     if not raw_text:
         return "[LLM Error] Empty response"
+    return "\n".join(format_hint_lines(m.group() for m in _LINE_RE.finditer(raw_text)))
+
 
-    text = raw_text.strip()
-    # Split into candidate lines
-    lines = [l.strip() for l in re.split(r"[\n\r]+", text) if l.strip()]
+def stream_and_format_hints(chunks, on_line):
+    """Run chunks through HintStreamFormatter, calling on_line(line) per finished line."""
+    formatter = HintStreamFormatter()
+    spent = 0.0
+    try:
+        for chunk in chunks:
+            started = time.perf_counter()
+            lines = formatter.feed(chunk)
+            spent += time.perf_counter() - started
+            for line in lines:
+                on_line(line)
+            if formatter.full:
+                break  # later output can't change the hints; stop the model early
+    finally:
+        # If on_line aborts (e.g. a superseded job), close the stream so the provider stops generating
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    started = time.perf_counter()
+    lines = formatter.finish()
+    record_span("sanitize", spent + time.perf_counter() - started)
+    for line in lines:
+        on_line(line)
+    return formatter.text()
 
-    # Extract hint-like lines or bullet points
-    hint_lines = []
+
+async def astream_and_format_hints(chunks, on_line, formatter=None):
+    """stream_and_format_hints over an async generator of chunks."""
+    formatter = formatter or HintStreamFormatter()
+    spent = 0.0
+    try:
+        async for chunk in chunks:
+            started = time.perf_counter()
+            lines = formatter.feed(chunk)
+            spent += time.perf_counter() - started
+            for line in lines:
+                on_line(line)
+            if formatter.full:
+                break
+    finally:
+        await chunks.aclose()
+    started = time.perf_counter()
+    lines = formatter.finish()
+    record_span("sanitize", spent + time.perf_counter() - started)
     for line in lines:
-        lowered = line.lower()
-        # Skip obvious final answers
-        if re.search(r"\b(answer|final|equals|=)\b", lowered):
-            continue
-        if re.search(r"\boption\s*[abcd]\b", lowered):
-            continue
-        if re.search(r"\([A-D]\)\s*\S+", line):
-            continue
-        # Collect bullets or lines starting with Hint/Step
-        if re.match(r"^(hint|step)\s*\d*\s*[:\-]", lowered):
-            hint_lines.append(line)
-        elif re.match(r"^[\-\*•]", line):
-            hint_lines.append(re.sub(r"^[\-\*•]\s*", "", line))
-        else:
-            # Short, hinty sentences
-            if 3 <= len(line.split()) <= 30:
-                hint_lines.append(line)
-
-    # Deduplicate preserving order
-    seen = set()
-    filtered = []
-    for h in hint_lines:
-        k = h.lower()
-        if k not in seen:
-            seen.add(k)
-            filtered.append(h)
-
-    # Take 3 to 5
-    if len(filtered) < 3:
-        base = "Focus on identifying knowns, selecting a method, then setting up steps."
-        while len(filtered) < 3:
-            filtered.append(base)
-    filtered = filtered[:5]
-
-    # Number and label consistently
-    numbered = []
-    for i, h in enumerate(filtered, 1):
-        h = re.sub(r"^(hint|step)\s*\d*\s*[:\-]\s*", "", h, flags=re.IGNORECASE)
-        numbered.append(f"Hint {i}: {h}")
-
-    encouragement = "Now try completing the final step on your own."
-    return "\n".join(numbered + [encouragement])
+        on_line(line)
+    return formatter.text()
 
 # ---------------------------------
 # Config (persisted settings)
@@ -166,46 +646,209 @@ DEFAULT_CONFIG = {
     "ollama_model": "granite3.2-vision:2b",
     "gemini_model": "gemini-2.0-flash",
     "theme": "dark",  # "dark" | "light" | "glass"
+    "render_frame_ms": 16,  # GUI updates arriving within this window are drawn in one redraw
+    "ollama_keep_alive": "30m",  # how long the Ollama server keeps the model loaded
+    "ollama_prewarm": True,  # load the model (and prompt prefix) at startup
+    "ollama_models_ttl": 300,  # seconds the local model inventory is trusted before a background refresh
+    "provider_strategy": "single",  # "single" | "race" (both providers at once) | "hedge"
+    "hedge_delay": None,  # seconds before hedging to the other provider (None = its p95)
+    "coalesce_grace": 2.0,  # seconds a superseded generation keeps running so a re-capture of the same question can adopt it
+    "recent_requests_ttl": 300,  # seconds a finished screenshot's hints are reused when it is copied again (0 = off)
+    "skip_non_questions": True,  # answer text with no question, instruction or math in it locally, without an LLM call
+    "split_questions": True,  # hint each question of a worksheet screenshot separately, concurrently
+    "max_questions": 6,  # questions hinted separately per screenshot; the rest share the last one's hints
+    "routing": True,  # pick model, output budget and prompt per difficulty tier (below)
+    "route_hard_chars": 400,  # OCR text at least this long is routed as Hard
+    "ollama_model_easy": None,  # None = ollama_model
+    "ollama_model_medium": None,
+    "ollama_model_hard": None,
+    "num_predict_easy": 160,  # max output tokens (None = model default)
+    "num_predict_medium": 256,
+    "num_predict_hard": 384,
+    "prompt_template_easy": "full",  # "full" | "short" (pays off with a dedicated tier model)
+    "prompt_template_medium": "full",
+    "prompt_template_hard": "full",
+    "trace_log": None,  # JSON-lines stage trace file ("-" = stderr); see `hintify stats`
+    "trace_otel": False,  # also export spans via OpenTelemetry (needs opentelemetry-api + an SDK)
+    "metrics_file": None,  # write Prometheus text stage metrics here after each job
+    "hint_cache": True,  # reuse hints for questions already answered
+    "hint_cache_size": 256,  # max cached questions (LRU eviction)
+    "hint_cache_ttl_hours": 168,  # entries older than this are ignored and evicted
+    "ocr_engine": "auto",  # "auto" | "tesserocr" | "tesseract"; without hintify[ocr], auto runs one tesseract process per image
+    "ocr_lang": "eng",
+    "ocr_psm": None,  # Tesseract page segmentation mode (None = Tesseract default)
+    "ocr_oem": None,  # Tesseract OCR engine mode (None = Tesseract default)
+    "ocr_preprocess": False,  # master switch for the steps below; off until bench_ocr_preprocess accuracy is collected
+    "ocr_grayscale": True,
+    "ocr_binarize": False,  # adaptive (local-mean) thresholding
+    "ocr_autocrop": True,  # crop to the text bounding box
+    "ocr_downscale": True,  # shrink oversized text to ocr_target_line_height
+    "ocr_target_line_height": 40,  # px of ink per text line Tesseract reads well
+    "ocr_max_pixels": 4_000_000,  # hard cap after cropping
+    "ocr_cache": True,  # reuse OCR results for screenshots seen before, and for crops of them
+    "ocr_cache_mb": 64,  # disk budget of the OCR cache (least recently used entries go first)
+    "ocr_cache_images": False,  # also keep a grayscale copy of each screenshot on disk, so crops hit after a restart
 }
 
 
-def load_config():
-    try:
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                cfg = json.loads(f.read() or "{}")
-            # Merge with defaults
+class ConfigStore:
+    """Process-wide, in-memory view of the config file and keyring credentials.
+
+    get() serves the cached merged config, so per-question code never touches disk.
+    A background thread stats the file every `poll_seconds` and reloads it when
+    it is edited externally. save() writes atomically (temp file + rename).
+    Subscribers are called as callback(new_cfg, old_cfg) after every change.
+    Credentials are read from the keyring once and cached until set/deleted here.
+    """
+
+    KEYRING_SERVICE = "hintify"
+
+    def __init__(self, path=None, poll_seconds=2.0):
+        self._explicit_path = path
+        self.poll_seconds = poll_seconds
+        self._cfg = None
+        self._loaded_path = None
+        self._signature = None
+        self._subscribers = []
+        self._secrets = {}
+        self._lock = threading.RLock()
+        self._watcher = None
+
+    def _path(self):
+        return self._explicit_path or CONFIG_PATH
+
+    @staticmethod
+    def _stat_signature(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _read(self, path):
+        try:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    cfg = json.loads(f.read() or "{}")
+                # Merge with defaults
+                merged = DEFAULT_CONFIG.copy()
+                merged.update(cfg or {})
+                return merged
+        except Exception:
+            pass
+        return DEFAULT_CONFIG.copy()
+
+    def get(self):
+        with self._lock:
+            path = self._path()
+            if self._cfg is None or path != self._loaded_path:
+                self._signature = self._stat_signature(path)
+                self._cfg = self._read(path)
+                self._loaded_path = path
+                self._start_watching()
+            return dict(self._cfg)
+
+    def reload_if_changed(self):
+        """Re-read the file if its mtime/size changed; returns True when the config changed."""
+        with self._lock:
+            if self._cfg is None:
+                return False
+            signature = self._stat_signature(self._loaded_path)
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            old, self._cfg = self._cfg, self._read(self._loaded_path)
+            new = dict(self._cfg)
+        if new != old:
+            self._notify(new, old)
+            return True
+        return False
+
+    def save(self, cfg):
+        path = self._path()
+        try:
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(cfg, indent=2))
+            os.replace(tmp, path)
+        except Exception as e:
+            colored_print(f"[Config] Failed to save config: {e}", Colors.FAIL)
+            return False
+        with self._lock:
+            old = dict(self._cfg) if self._cfg is not None else DEFAULT_CONFIG.copy()
             merged = DEFAULT_CONFIG.copy()
             merged.update(cfg or {})
-            return merged
-    except Exception:
-        pass
-    return DEFAULT_CONFIG.copy()
+            self._cfg = merged
+            self._loaded_path = path
+            self._signature = self._stat_signature(path)
+        if merged != old:
+            self._notify(dict(merged), old)
+        return True
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _notify(self, new, old):
+        for callback in list(self._subscribers):
+            try:
+                callback(new, old)
+            except Exception as e:
+                colored_print(f"[Config] Subscriber failed: {e}", Colors.WARNING)
+
+    def _start_watching(self):
+        if self._watcher is None and self.poll_seconds:
+            self._watcher = Thread(target=self._watch, name="hintify-config-watch", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            self.reload_if_changed()
+
+    # ---- credentials ----
+
+    def get_secret(self, name):
+        with self._lock:
+            if name not in self._secrets:
+                try:
+                    self._secrets[name] = keyring.get_password(self.KEYRING_SERVICE, name) or None
+                except Exception as e:
+                    if DEBUG:
+                        print(f"[Config] Keyring unavailable: {e}")
+                    self._secrets[name] = None
+            return self._secrets[name]
+
+    def set_secret(self, name, value):
+        keyring.set_password(self.KEYRING_SERVICE, name, value)
+        with self._lock:
+            self._secrets[name] = value
+
+    def delete_secret(self, name):
+        with self._lock:
+            self._secrets[name] = None
+        keyring.delete_password(self.KEYRING_SERVICE, name)
+
+
+config_store = ConfigStore()
+
+
+def load_config():
+    return config_store.get()
 
 
 def save_config(cfg):
-    try:
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            f.write(json.dumps(cfg, indent=2))
-        return True
-    except Exception as e:
-        colored_print(f"[Config] Failed to save config: {e}", Colors.FAIL)
-        return False
+    return config_store.save(cfg)
+
+
+def get_gemini_api_key():
+    """GEMINI_API_KEY from the environment, else the (cached) keychain entry."""
+    return os.getenv("GEMINI_API_KEY") or config_store.get_secret("gemini_api_key")
+
 
 def get_available_ollama_models():
     """Get list of available Ollama models"""
-    try:
-        result = subprocess.run(["ollama", "list"], capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split('\n')[1:]  # Skip header
-        models = []
-        for line in lines:
-            if line.strip():
-                model_name = line.split()[0]
-                if model_name and model_name != "NAME":
-                    models.append(model_name)
-        return models
-    except Exception:
-        return ["granite3.2-vision:2b", "llama3.2:3b", "qwen2.5:7b"]
+    return model_registry.models() or ["granite3.2-vision:2b", "llama3.2:3b", "qwen2.5:7b"]
 
 def get_gemini_models():
     """Get list of common Gemini models"""
@@ -313,8 +956,8 @@ def ensure_provider_on_first_launch(args):
     colored_print("[Setup] Running first-time setup...", Colors.HEADER)
 
     # Ensure Python deps (usually installed via pip, but double-check)
-    for pkg, imp in [("pillow", "PIL"), ("pytesseract", None), ("keyring", None), ("requests", None), ("google-generativeai", "google.generativeai"), ("pynput", None)]:
-        ensure_package(pkg, imp or pkg)
+    for pkg, imp in PYTHON_DEPENDENCIES:
+        ensure_package(pkg, imp)
 
     # Provider selection
     colored_print("Select AI provider:", Colors.OKBLUE)
@@ -333,7 +976,7 @@ def ensure_provider_on_first_launch(args):
         key = prompt_input("Paste your Gemini API key here (or press Enter to skip): ", "")
         if key:
             try:
-                keyring.set_password("hintify", "gemini_api_key", key)
+                config_store.set_secret("gemini_api_key", key)
                 os.environ["GEMINI_API_KEY"] = key
                 colored_print("[Setup] Gemini API key saved to keychain.", Colors.OKGREEN)
             except Exception as e:
@@ -362,15 +1005,61 @@ def ensure_provider_on_first_launch(args):
     save_config(cfg)
     return cfg
 
-# Global hotkey (macOS/Windows) via pynput
-if platform.system() in ("Darwin", "Windows"):
-    ensure_package("pynput")
-    try:
-        from pynput import keyboard  # type: ignore
-    except Exception:
-        keyboard = None  # type: ignore
-else:
-    keyboard = None  # type: ignore
+def run_doctor(args):
+    """Explicit dependency check (`hintify --doctor`), kept off the normal startup path.
+
+    Installs missing Python packages (like first-launch setup) and reports on
+    external tools. Returns True when everything required is available.
+    """
+    ok = True
+
+    def report(label, good, detail="", required=True):
+        nonlocal ok
+        if good:
+            colored_print(f"  ✔ {label} {detail}".rstrip(), Colors.OKGREEN)
+        else:
+            colored_print(f"  {'✘' if required else '!'} {label} {detail}".rstrip(), Colors.FAIL if required else Colors.WARNING)
+            ok = ok and not required
+
+    colored_print("[Doctor] Python packages", Colors.HEADER)
+    hotkey_platform = platform.system() in ("Darwin", "Windows")
+    for pkg, imp in PYTHON_DEPENDENCIES:
+        if pkg == "pynput" and not hotkey_platform:
+            continue
+        report(pkg, ensure_package(pkg, imp), required=pkg not in ("google-generativeai", "pynput"))
+    report("tkinter", importlib.util.find_spec("tkinter") is not None, "(GUI; headless mode works without it)", required=False)
+
+    colored_print("[Doctor] External tools", Colors.HEADER)
+    report("tesseract", ensure_tesseract_binary(), shutil.which("tesseract") or "")
+    warm_ocr = importlib.util.find_spec("tesserocr") is not None
+    report("tesserocr", warm_ocr, "(warm OCR workers)" if warm_ocr else "(one tesseract process per image; pip install 'hintify[ocr]')",
+           required=False)
+
+    cfg = load_config()
+    provider = (cfg.get("provider") or "ollama").lower()
+    colored_print(f"[Doctor] LLM provider: {provider}", Colors.HEADER)
+    client = get_ollama_client()
+    server_up = client.is_available()
+    report("ollama CLI", shutil.which("ollama") is not None, required=False)
+    report("ollama server", server_up, client.host, required=provider == "ollama")
+    if server_up:
+        model = cfg.get("ollama_model") or args.ollama_model
+        model_registry.refresh()
+        present = model_registry.has(model)
+        report(f"ollama model '{model}'", present, "" if present else "(will be pulled on first use)", required=False)
+    has_key = bool(get_gemini_api_key())
+    report("Gemini API key", has_key, required=provider == "gemini")
+
+    colored_print("[Doctor] Stored on disk", Colors.HEADER)
+    if cfg.get("ocr_cache", True):
+        kept = ("OCR text and a grayscale copy of every screenshot" if cfg.get("ocr_cache_images", False)
+                else "OCR text only; recent screenshots stay in memory")
+        colored_print(f"  OCR cache: {OCR_CACHE_DIR} ({kept})", Colors.OKCYAN)
+    else:
+        colored_print("  OCR cache: off", Colors.OKCYAN)
+
+    colored_print("[Doctor] All required dependencies are available." if ok else "[Doctor] Some required dependencies are missing.", Colors.OKGREEN if ok else Colors.FAIL)
+    return ok
 
 # -------------------------------
 # macOS/Windows Hotkey Daemon
@@ -381,7 +1070,9 @@ def run_hotkey_daemon():
     This runs in a separate process so any crash won't bring down the main app.
     """
     sysname = platform.system()
-    if keyboard is None:
+    try:
+        from pynput import keyboard  # type: ignore
+    except Exception:
         print("[Hotkey] Pynput unavailable; daemon exiting.")
         return
 
@@ -421,7 +1112,9 @@ def run_hotkey_daemon():
 
 
 def start_hotkey_daemon_subprocess():
-    """Spawn the hotkey daemon subprocess; ignore failure."""
+    """Spawn the hotkey daemon subprocess (macOS/Windows only); ignore failure."""
+    if platform.system() not in ("Darwin", "Windows"):
+        return
     try:
         subprocess.Popen([sys.executable, __file__, "--hotkey-daemon"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         print("[Hotkey] Global hotkey daemon started (use Cmd+Shift+H on macOS, Ctrl+Shift+H on Windows).")
@@ -432,16 +1125,63 @@ def start_hotkey_daemon_subprocess():
 # 1. Screenshot Detection & OCR
 # -------------------------------
 
-def get_clipboard_image_bytes():
+class ClipboardStats:
+    """Counters for clipboard polling ticks, to show how much encoding work is skipped."""
+
+    def __init__(self):
+        self.ticks = 0
+        self.empty = 0
+        self.skipped = 0
+        self.processed = 0
+        self.failed = 0
+        self.fingerprint_seconds = 0.0
+        self.encode_seconds = 0.0
+
+    def summary(self):
+        avg_encode = self.encode_seconds / self.processed if self.processed else 0.0
+        avg_fp = self.fingerprint_seconds / max(1, self.skipped + self.processed)
+        saved = self.skipped * max(0.0, avg_encode - avg_fp)
+        return (
+            f"ticks={self.ticks} empty={self.empty} skipped={self.skipped} processed={self.processed} failed={self.failed} "
+            f"avg_fingerprint={avg_fp * 1000:.1f}ms avg_encode={avg_encode * 1000:.1f}ms est_saved={saved:.2f}s"
+        )
+
+
+clipboard_stats = ClipboardStats()
+
+
+def grab_clipboard():
+    """Return the raw clipboard grab (PIL image or list of file paths), or None."""
     try:
-        grabbed = ImageGrab.grabclipboard()
+        return ImageGrab.grabclipboard()
     except Exception as e:
         print(f"[Clipboard] Failed to access clipboard: {e}")
         return None
 
-    if grabbed is None:
-        return None
 
+def clipboard_fingerprint(grabbed):
+    """Cheap change-detection key for a clipboard grab, computed without PNG encoding.
+
+    Images are hashed over their raw pixel buffer (exact, so a single changed digit is
+    still detected); file lists are keyed by path, size and mtime without opening them.
+    """
+    if isinstance(grabbed, Image.Image):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{grabbed.mode}:{grabbed.size}".encode("utf-8"))
+        h.update(grabbed.tobytes())
+        return h.hexdigest()
+    if isinstance(grabbed, list) and grabbed:
+        first = grabbed[0]
+        try:
+            st = os.stat(first)
+        except OSError:
+            return None
+        return f"file:{first}:{st.st_size}:{st.st_mtime_ns}"
+    return None
+
+
+def encode_clipboard_image(grabbed):
+    """PNG-encode a clipboard grab as RGB bytes."""
     # If it's already an Image instance
     if isinstance(grabbed, Image.Image):
         buf = BytesIO()
@@ -465,247 +1205,3356 @@ def get_clipboard_image_bytes():
     return None
 
 
-def extract_text_from_image(image_bytes):
-    try:
-        image = Image.open(BytesIO(image_bytes))
-        text = pytesseract.image_to_string(image)
-        return re.sub(r"\s+", " ", text).strip()
-    except Exception as e:
-        return f"[OCR Error] {str(e)}"
+def get_clipboard_image_bytes():
+    grabbed = grab_clipboard()
+    if grabbed is None:
+        return None
+    return encode_clipboard_image(grabbed)
 
 
-# -------------------------------
-# 2. Question Classification
-# -------------------------------
+def poll_clipboard_change(last_fingerprint, stats=clipboard_stats):
+    """One polling tick: returns (fingerprint, image_bytes).
 
-MCQ_PATTERN = re.compile(r"\(A\)|\(B\)|\(C\)|\(D\)|\b\d\)\b")
+    image_bytes is only produced (PNG-encoded) when the fingerprint differs from
+    last_fingerprint; unchanged or empty clipboards return None without encoding.
+    A grab that fails to encode keeps last_fingerprint, so the next tick retries it.
+    """
+    stats.ticks += 1
+    grabbed = grab_clipboard()
+    if grabbed is None:
+        stats.empty += 1
+        return last_fingerprint, None
+
+    started = time.perf_counter()
+    fingerprint = clipboard_fingerprint(grabbed)
+    elapsed = time.perf_counter() - started
+    stats.fingerprint_seconds += elapsed
+    record_span("hash", elapsed)
+    if fingerprint is None:
+        stats.empty += 1
+        return last_fingerprint, None
+    if fingerprint == last_fingerprint:
+        stats.skipped += 1
+        return last_fingerprint, None
+
+    started = time.perf_counter()
+    image_bytes = encode_clipboard_image(grabbed)
+    elapsed = time.perf_counter() - started
+    record_span("encode", elapsed)
+    if image_bytes is None:
+        stats.failed += 1
+        return last_fingerprint, None
+    stats.encode_seconds += elapsed
+    stats.processed += 1
+    return fingerprint, image_bytes
+
+
+class ClipboardWatcher(abc.ABC):
+    """Tells the capture stage when to look at the clipboard.
+
+    wait() blocks until the clipboard probably changed (or the timeout passes);
+    feedback() reports whether the following check found a new image. Event-driven
+    subclasses wake within milliseconds of a copy and cost nothing while idle.
+    """
 
+    name = "base"
+    alive = True
 
-def classify_question(text):
-    if MCQ_PATTERN.search(text):
-        return "MCQ"
-    if "?" in text or re.search(r"(solve|find|calculate|prove|evaluate)", text, re.IGNORECASE):
-        return "Descriptive"
-    return "Not a Question"
+    @abc.abstractmethod
+    def wait(self, timeout):
+        """Block until the clipboard probably changed or `timeout` seconds pass; True if it fired."""
 
+    def feedback(self, changed):
+        pass
 
-# -------------------------------
-# 3. Difficulty Detection
-# -------------------------------
+    def close(self):
+        pass
+
+
+class AdaptivePoller(ClipboardWatcher):
+    """Fallback polling: tight interval right after activity, backing off while idle."""
+
+    name = "adaptive-poll"
+
+    def __init__(self, base_interval=1.5, min_interval=None, max_interval=None, backoff=1.5):
+        self.min_interval = min_interval or max(0.1, base_interval / 5.0)
+        self.max_interval = max_interval or base_interval * 4.0
+        self.backoff = backoff
+        self.interval = base_interval
+
+    def wait(self, timeout=None):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        return True
+
+    def feedback(self, changed):
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+
+class _EventWatcher(ClipboardWatcher):
+    """Base for watchers fed by a background thread that calls _fire() on each change."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def _fire(self):
+        self._event.set()
+
+    def _die(self):
+        self.alive = False
+        self._event.set()
+
+    def wait(self, timeout=30.0):
+        fired = self._event.wait(timeout)
+        self._event.clear()
+        return fired
+
+
+class WlPasteWatcher(_EventWatcher):
+    """Wayland: `wl-paste --watch` runs a command on every selection change."""
+
+    name = "wl-paste"
+
+    def __init__(self):
+        super().__init__()
+        self._proc = subprocess.Popen(["wl-paste", "--watch", "echo", "changed"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        Thread(target=self._read, name="hintify-wl-paste", daemon=True).start()
+
+    def _read(self):
+        for _ in iter(self._proc.stdout.readline, ""):
+            self._fire()
+        # Exits immediately on compositors without the data-control protocol
+        self._die()
+
+    def close(self):
+        self._proc.terminate()
+
+
+class XFixesWatcher(_EventWatcher):
+    """X11: XFixes selection-owner notifications for CLIPBOARD (needs python-xlib)."""
+
+    name = "xfixes"
+
+    def __init__(self):
+        super().__init__()
+        from Xlib import display as xdisplay  # type: ignore
+        from Xlib.ext import xfixes  # type: ignore
+
+        self._display = xdisplay.Display()
+        if not self._display.has_extension("XFIXES"):
+            raise RuntimeError("XFIXES extension not available")
+        self._display.xfixes_query_version()
+        root = self._display.screen().root
+        atom = self._display.intern_atom("CLIPBOARD")
+        self._display.xfixes_select_selection_input(root, atom, xfixes.XFixesSetSelectionOwnerNotifyMask)
+        Thread(target=self._read, name="hintify-xfixes", daemon=True).start()
+
+    def _read(self):
+        try:
+            while True:
+                self._display.next_event()
+                self._fire()
+        except Exception:
+            self._die()
+
+
+class ClipnotifyWatcher(_EventWatcher):
+    """X11 without python-xlib: the `clipnotify` helper exits on each CLIPBOARD change."""
+
+    name = "clipnotify"
+
+    def __init__(self):
+        super().__init__()
+        Thread(target=self._run, name="hintify-clipnotify", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                res = subprocess.run(["clipnotify", "-s", "clipboard"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except Exception:
+                res = None
+            if res is None or res.returncode != 0:
+                self._die()
+                return
+            self._fire()
+
+
+class ChangeCountWatcher(ClipboardWatcher):
+    """macOS/Windows: poll the OS clipboard change counter, which is nearly free to read."""
+
+    def __init__(self, name, counter, interval=0.05):
+        self.name = name
+        self._counter = counter
+        self._interval = interval
+        self._last = counter()
+
+    def wait(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            current = self._counter()
+            if current != self._last:
+                self._last = current
+                return True
+            time.sleep(self._interval)
+        return False
+
+
+def create_clipboard_watcher(mode="auto", poll_interval=1.5):
+    """Pick the cheapest available change-notification mechanism, else adaptive polling."""
+    if mode != "poll":
+        sysname = platform.system()
+        candidates = []
+        if sysname == "Darwin":
+            def appkit():
+                from AppKit import NSPasteboard  # type: ignore
+                pasteboard = NSPasteboard.generalPasteboard()
+                return ChangeCountWatcher("nspasteboard", pasteboard.changeCount)
+            candidates.append(appkit)
+        elif sysname == "Windows":
+            def win32():
+                import ctypes
+                return ChangeCountWatcher("clipboard-sequence", ctypes.windll.user32.GetClipboardSequenceNumber)
+            candidates.append(win32)
+        else:
+            if os.getenv("WAYLAND_DISPLAY") and shutil.which("wl-paste"):
+                candidates.append(WlPasteWatcher)
+            if os.getenv("DISPLAY"):
+                candidates.append(XFixesWatcher)
+                if shutil.which("clipnotify"):
+                    candidates.append(ClipnotifyWatcher)
+        for factory in candidates:
+            try:
+                return factory()
+            except Exception as e:
+                if DEBUG:
+                    print(f"[Clipboard] Watcher unavailable: {e}")
+    return AdaptivePoller(poll_interval)
+
+
+OCR_PREPROCESS_KEYS = (
+    "ocr_grayscale",
+    "ocr_binarize",
+    "ocr_autocrop",
+    "ocr_downscale",
+    "ocr_target_line_height",
+    "ocr_max_pixels",
+)
+_INK_LUT = [255 if v > 12 else 0 for v in range(256)]
+
+
+def ocr_preprocess_options(cfg):
+    """Preprocessing options from config, or None when preprocessing is disabled."""
+    if not cfg.get("ocr_preprocess", False):
+        return None
+    return {k: cfg.get(k, DEFAULT_CONFIG[k]) for k in OCR_PREPROCESS_KEYS}
+
+
+def _ink_mask(gray, radius):
+    """Adaptive threshold: 255 where a pixel is darker than its local mean (text ink), else 0."""
+    local = gray.filter(ImageFilter.BoxBlur(radius))
+    return ImageChops.subtract(local, gray).point(_INK_LUT)
+
+
+def estimate_line_height(mask):
+    """Median height in px of horizontal ink bands (text lines) in an ink mask, or None."""
+    width, height = mask.size
+    if not width or not height:
+        return None
+    rows = mask.resize((1, height), Image.BOX).tobytes()
+    runs, run = [], 0
+    for v in rows:
+        if v > 0:
+            run += 1
+        elif run:
+            runs.append(run)
+            run = 0
+    if run:
+        runs.append(run)
+    runs = sorted(r for r in runs if r >= 4)
+    return runs[len(runs) // 2] if runs else None
+
+
+def preprocess_for_ocr(image, options, with_transform=False):
+    """Shrink and clean a screenshot before OCR.
+
+    Steps (each toggled by options, see OCR_PREPROCESS_KEYS): grayscale conversion
+    (dark themes are inverted to dark-on-light), auto-crop to the text bounding box,
+    downscaling so text lines are about `ocr_target_line_height` px tall (and the
+    image is under `ocr_max_pixels`), and adaptive binarization.
+
+    With with_transform, returns (image, (left, top, scale_x, scale_y)) mapping
+    output pixels back to the input: x_in = left + x_out / scale_x.
+    """
+    gray = image.convert("L")
+    if gray.resize((1, 1), Image.BOX).getpixel((0, 0)) < 110:
+        gray = ImageOps.invert(gray)
+
+    mask = None
+    if options.get("ocr_autocrop") or options.get("ocr_downscale"):
+        mask = _ink_mask(gray, 15)
+
+    crop_box = None
+    if options.get("ocr_autocrop") and mask is not None:
+        bbox = mask.getbbox()
+        if bbox:
+            margin = 12
+            left, top, right, bottom = bbox
+            crop_box = (max(0, left - margin), max(0, top - margin), min(gray.width, right + margin), min(gray.height, bottom + margin))
+            gray = gray.crop(crop_box)
+            mask = mask.crop(crop_box)
+
+    scale = 1.0
+    if options.get("ocr_downscale") and mask is not None:
+        line_height = estimate_line_height(mask)
+        target = float(options.get("ocr_target_line_height") or 0)
+        # Only shrink clearly oversized text; resampling near the target costs accuracy for nothing
+        if line_height and target and line_height > target * 1.25:
+            scale = target / line_height
+    max_pixels = options.get("ocr_max_pixels")
+    if max_pixels and gray.width * gray.height * scale * scale > max_pixels:
+        scale = (max_pixels / float(gray.width * gray.height)) ** 0.5
+    size = (max(1, int(gray.width * scale)), max(1, int(gray.height * scale))) if scale < 1.0 else gray.size
+
+    transform = (crop_box[0] if crop_box else 0, crop_box[1] if crop_box else 0, size[0] / gray.width, size[1] / gray.height)
+    if options.get("ocr_binarize"):
+        gray = gray.resize(size, Image.LANCZOS) if size != gray.size else gray
+        radius = max(8, int((options.get("ocr_target_line_height") or 40) / 2))
+        out = ImageOps.invert(_ink_mask(gray, radius))
+    elif options.get("ocr_grayscale"):
+        out = gray.resize(size, Image.LANCZOS) if size != gray.size else gray
+    else:
+        # Colour output: apply the crop/scale computed on the gray copy to the original
+        out = image.crop(crop_box) if crop_box else image
+        out = out.resize(size, Image.LANCZOS) if size != out.size else out
+    return (out, transform) if with_transform else out
+
+
+class OCREngine(abc.ABC):
+    """OCR backend interface used by extract_text_from_image.
+
+    Subclasses implement _recognize(image) and _recognize_words(image). The base class adds per-image latency
+    tracking and concurrent batch recognition across a thread pool.
+    """
+
+    name = "base"
+
+    def __init__(self, lang="eng", psm=None, oem=None, workers=None, preprocess=None):
+        self.lang = lang or "eng"
+        self.psm = psm
+        self.oem = oem
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.preprocess = preprocess  # options for preprocess_for_ocr, or None
+        self.latency = LatencyStats()
+        self.preprocess_latency = LatencyStats()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _recognize(self, image):
+        """Plain text read from a (preprocessed) PIL image."""
+
+    @abc.abstractmethod
+    def _recognize_words(self, image):
+        """[[text, left, top, width, height, line], ...] in reading order; line numbers text lines from 0."""
+
+    def _recognize_layout(self, image):
+        """(plain text, words) from one recognition; backends override this to keep their own line layout."""
+        words = self._recognize_words(image)
+        return ocr_text_from_words(words), words
+
+    def settings_key(self):
+        """Everything besides the pixels that changes what this engine reads."""
+        return json.dumps([self.name, self.lang, self.psm, self.oem, self.preprocess], sort_keys=True)
+
+    def _prepare(self, image):
+        transform = (0, 0, 1.0, 1.0)
+        if self.preprocess:
+            started = time.perf_counter()
+            original = image.size
+            image, transform = preprocess_for_ocr(image, self.preprocess, with_transform=True)
+            elapsed = time.perf_counter() - started
+            self.preprocess_latency.add(elapsed)
+            if DEBUG:
+                print(f"[OCR] preprocess {original[0]}x{original[1]} -> {image.size[0]}x{image.size[1]} took {elapsed * 1000:.0f}ms")
+        return image, transform
+
+    def _timed(self, fn, image):
+        started = time.perf_counter()
+        try:
+            return fn(image)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.latency.add(elapsed)
+            if DEBUG:
+                print(f"[OCR] engine={self.name} {image.size[0]}x{image.size[1]} took {elapsed * 1000:.0f}ms")
+
+    def recognize(self, image):
+        image, _ = self._prepare(image)
+        return self._timed(self._recognize, image)
+
+    def recognize_layout(self, image):
+        """(plain text, word boxes) in one pass; boxes (see _recognize_words) are in the coordinates of `image`."""
+        prepared, (left, top, sx, sy) = self._prepare(image)
+        text, words = self._timed(self._recognize_layout, prepared)
+        if (left, top, sx, sy) == (0, 0, 1.0, 1.0):
+            return text, words
+        return text, [[word, round(left + x / sx), round(top + y / sy), round(w / sx), round(h / sy), line]
+                      for word, x, y, w, h, line in words]
+
+    def recognize_words(self, image):
+        """Word boxes (see _recognize_words) in the coordinates of the image passed in."""
+        return self.recognize_layout(image)[1]
+
+    def pool(self):
+        """Shared worker pool (sized to `workers`) for concurrent recognition."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"hintify-{self.name}")
+            return self._executor
+
+    def recognize_batch(self, images):
+        """Recognize several images concurrently; results keep the input order."""
+        return list(self.pool().map(self.recognize, images))
+
+
+class TesseractCLIEngine(OCREngine):
+    """pytesseract backend: one `tesseract` process per image, run concurrently in batches."""
+
+    name = "tesseract"
+
+    def config_string(self):
+        parts = []
+        if self.psm is not None:
+            parts.append(f"--psm {int(self.psm)}")
+        if self.oem is not None:
+            parts.append(f"--oem {int(self.oem)}")
+        return " ".join(parts)
+
+    def _recognize(self, image):
+        return pytesseract.image_to_string(image, lang=self.lang, config=self.config_string())
+
+    def _recognize_words(self, image):
+        return self._recognize_layout(image)[1]
+
+    def _recognize_layout(self, image):
+        data = pytesseract.image_to_data(image, lang=self.lang, config=self.config_string(), output_type=pytesseract.Output.DICT)
+        words, lines = [], {}
+        for i, text in enumerate(data["text"]):
+            text = (text or "").strip()
+            if not text:
+                continue  # page/block/paragraph/line rows carry no text
+            line = lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), len(lines))
+            words.append([text, data["left"][i], data["top"][i], data["width"][i], data["height"][i], line])
+        # Same layout as image_to_string: a line per text line, a blank line between paragraphs
+        line_words = {}
+        for word in words:
+            line_words.setdefault(word[5], []).append(word[0])
+        paragraphs = OrderedDict()
+        for (block, par, _), line in lines.items():
+            paragraphs.setdefault((block, par), []).append(" ".join(line_words[line]))
+        return "\n\n".join("\n".join(group) for group in paragraphs.values()), words
+
+
+class TesserocrEngine(OCREngine):
+    """In-process tesserocr backend keeping warm Tesseract API instances.
+
+    Instances are created lazily (at most one per worker) and reused, so the
+    language data is loaded once instead of per image. tesserocr releases the
+    GIL while recognizing, so batch threads run on separate cores.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang="eng", psm=None, oem=None, workers=None, preprocess=None):
+        super().__init__(lang=lang, psm=psm, oem=oem, workers=workers, preprocess=preprocess)
+        import tesserocr  # type: ignore
+        self._tesserocr = tesserocr
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._create_lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._create_lock:
+            if self._created < self.workers:
+                kwargs = {"lang": self.lang}
+                if self.psm is not None:
+                    kwargs["psm"] = int(self.psm)
+                if self.oem is not None:
+                    kwargs["oem"] = int(self.oem)
+                # Count the slot only once the API exists: a failed build (bad lang, missing
+                # tessdata) must not use up a slot, or later calls would wait on _idle forever
+                api = self._tesserocr.PyTessBaseAPI(**kwargs)
+                self._created += 1
+                return api
+        return self._idle.get()
+
+    def _recognize(self, image):
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def _recognize_words(self, image):
+        return self._recognize_layout(image)[1]
+
+    def _recognize_layout(self, image):
+        RIL = self._tesserocr.RIL
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            api.Recognize()
+            text = api.GetUTF8Text()  # reuses the recognition above
+            iterator = api.GetIterator()
+            words, line = [], -1
+            if iterator is None:
+                return text, words
+            for word in self._tesserocr.iterate_level(iterator, RIL.WORD):
+                word_text = (word.GetUTF8Text(RIL.WORD) or "").strip()
+                box = word.BoundingBox(RIL.WORD)
+                if word.IsAtBeginningOf(RIL.TEXTLINE) or line < 0:
+                    line += 1
+                if word_text and box:
+                    x1, y1, x2, y2 = box
+                    words.append([word_text, x1, y1, x2 - x1, y2 - y1, line])
+            return text, words
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+
+def create_ocr_engine(cfg):
+    """Build the configured OCR engine; 'auto' prefers tesserocr when it is installed."""
+    kind = (cfg.get("ocr_engine") or "auto").lower()
+    kwargs = {
+        "lang": cfg.get("ocr_lang"),
+        "psm": cfg.get("ocr_psm"),
+        "oem": cfg.get("ocr_oem"),
+        "preprocess": ocr_preprocess_options(cfg),
+    }
+    if kind in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine(**kwargs)
+        except Exception as e:
+            if kind == "tesserocr" or importlib.util.find_spec("tesserocr") is not None:
+                colored_print(f"[OCR] tesserocr unavailable ({e}); using the tesseract CLI.", Colors.WARNING)
+            else:
+                report_ocr_engine(cfg)
+    return TesseractCLIEngine(**kwargs)
+
+
+_ocr_fallback_reported = False
+
+
+def report_ocr_engine(cfg):
+    """Say once per process that OCR will start one tesseract process per image when tesserocr is missing.
+
+    Only checks whether tesserocr is installed (no import), so it is cheap enough for startup.
+    """
+    global _ocr_fallback_reported
+    if _ocr_fallback_reported or (cfg.get("ocr_engine") or "auto").lower() != "auto":
+        return
+    if importlib.util.find_spec("tesserocr") is not None:
+        return
+    _ocr_fallback_reported = True
+    colored_print("[OCR] tesserocr is not installed, so every screenshot starts a new tesseract process; "
+                  "pip install 'hintify[ocr]' keeps Tesseract loaded between screenshots.", Colors.OKCYAN)
+
+
+_ocr_engine = None
+_ocr_engine_lock = threading.Lock()
+
+
+def get_ocr_engine():
+    global _ocr_engine
+    with _ocr_engine_lock:
+        if _ocr_engine is None:
+            _ocr_engine = create_ocr_engine(load_config())
+        return _ocr_engine
+
+
+def _clean_ocr_text(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _tidy_ocr_text(text):
+    """OCR text with runs of spaces collapsed but its line breaks kept (at most one blank line in a row)."""
+    lines = [re.sub(r"\s+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def ocr_text_from_words(words):
+    """Plain text rebuilt from word boxes: a line per OCR line, a blank line at large vertical gaps."""
+    return "\n\n".join("\n".join(line for line, _, _ in block) for block in _layout_blocks(_layout_lines(words)) if block)
+
+
+OCR_CACHE_DIR = os.path.expanduser("~/.hintify_ocr_cache")
+
+
+def locate_subimage(haystack, needle):
+    """Top-left (x, y) where grayscale `needle` occurs pixel-for-pixel inside `haystack`, or None."""
+    W, H = haystack.size
+    w, h = needle.size
+    if w > W or h > H or (w, h) == (W, H) or w < 16 or h < 8:
+        return None
+    hay, nee = haystack.tobytes(), needle.tobytes()
+    # Anchor on the (sampled) needle row with the most distinct values so blank rows do not match everywhere
+    anchor = max(range(0, h, max(1, h // 32)), key=lambda r: len(set(nee[r * w:(r + 1) * w])))
+    row = nee[anchor * w:(anchor + 1) * w]
+    if len(set(row)) < 2:
+        return None
+    # One search over the whole buffer; hits that wrap across a row end or leave no room are skipped
+    pos = hay.find(row, anchor * W)
+    while pos != -1:
+        y, left = divmod(pos, W)
+        top = y - anchor
+        if left + w <= W and top + h <= H:
+            if all(hay[(top + r) * W + left:(top + r) * W + left + w] == nee[r * w:(r + 1) * w] for r in range(h)):
+                return left, top
+        pos = hay.find(row, pos + 1)
+    return None
+
+
+class InkSignature:
+    """Bloom filter of the word-level ink runs on every STEP-th row of a grayscale image.
+
+    A run is the bytes from the first to the last non-background pixel of a word
+    on one row (gaps shorter than GAP pixels stay inside it). A run that sits
+    inside a crop with GAP background pixels to either side is byte-for-byte a
+    run of the image it was cut from, so a crop whose runs are missing from an
+    entry's filter cannot come from it, and that entry's pixels need not be
+    decoded and searched. False positives only cost the search it saves.
+    """
+
+    STEP = 4
+    GAP = 6
+    BITS = 1 << 17
+    MAX_PROBES = 32  # runs checked per row phase of a crop
+
+    def __init__(self, background, bits=None):
+        self.background = background
+        self.bits = bits if bits is not None else bytearray(self.BITS // 8)
+
+    @classmethod
+    def _pattern(cls, background):
+        b = re.escape(bytes([background]))
+        return re.compile(b"[^" + b + b"](?:" + b + b"{0,%d}[^" % (cls.GAP - 1) + b + b"])*")
+
+    @classmethod
+    def runs(cls, data, width, rows, background):
+        """Runs on the given rows that are bounded by a full gap inside the row."""
+        pattern = cls._pattern(background)
+        for y in rows:
+            row = data[y * width:(y + 1) * width]
+            for m in pattern.finditer(row):
+                if m.start() >= cls.GAP and m.end() <= width - cls.GAP and m.end() - m.start() >= 4:
+                    yield m.group()
+
+    @staticmethod
+    def _slots(run):
+        h = zlib.crc32(run)
+        return h % InkSignature.BITS, zlib.crc32(run, 0x9E3779B9) % InkSignature.BITS
+
+    @staticmethod
+    def background_of(gray):
+        histogram = gray.histogram()
+        return max(range(256), key=histogram.__getitem__)
+
+    @classmethod
+    def of(cls, gray):
+        width, height = gray.size
+        signature = cls(cls.background_of(gray))
+        for run in cls.runs(gray.tobytes(), width, range(0, height, cls.STEP), signature.background):
+            for slot in cls._slots(run):
+                signature.bits[slot >> 3] |= 1 << (slot & 7)
+        return signature
+
+    def __contains__(self, run):
+        return all(self.bits[slot >> 3] & (1 << (slot & 7)) for slot in self._slots(run))
+
+    def may_contain(self, phases):
+        """False when no row phase of a crop (see crop_phases) fits inside this image."""
+        if self.background not in phases:
+            return True
+        # A phase without runs (blank rows) rules nothing out; all() of nothing is True
+        return any(all(run in self for run in runs) for runs in phases[self.background])
+
+    @classmethod
+    def crop_phases(cls, gray, backgrounds):
+        """{background: [runs of crop rows p, p+STEP, ... for each phase p]} for the given backgrounds."""
+        width, height = gray.size
+        data = gray.tobytes()
+        phases = {}
+        for background in backgrounds:
+            phases[background] = [list(cls.runs(data, width, range(p, height, cls.STEP), background))[:cls.MAX_PROBES]
+                                  for p in range(cls.STEP)]
+        return phases
+
+    def encode(self):
+        return base64.b64encode(zlib.compress(bytes(self.bits))).decode("ascii")
+
+    @classmethod
+    def decode(cls, background, text):
+        return cls(background, bytearray(zlib.decompress(base64.b64decode(text))))
+
+
+class OCRCache:
+    """Persistent LRU of OCR results keyed by pixel hash plus the engine's settings.
+
+    Entries keep the recognized words with their boxes (in the screenshot's own
+    pixels), so a text is rebuilt from them, and a grayscale copy of the image:
+    a later screenshot that is an exact crop of a cached one is located in those
+    pixels and answered from the words inside the region, without Tesseract.
+    Entries also carry an InkSignature, so on a miss only cached images the
+    crop could have come from are decoded and searched, within REGION_BUDGET.
+    The index lives in `path`/index.json next to one PNG per entry; once the
+    entries exceed max_bytes the least recently used are deleted.
+    With keep_images False no pixels are written to disk: the last MEMORY_IMAGES
+    screenshots are kept in memory only, so crops of those still hit until exit.
+    """
+
+    REGION_CANDIDATES = 16  # most recent same-settings entries searched for a crop
+    REGION_BUDGET = 0.03  # seconds of pixel searching per lookup before giving up
+    MEMORY_IMAGES = 4  # decoded grayscale images kept in memory
+    SAVE_DELAY = 2.0  # index writes are batched over this many seconds
+
+    def __init__(self, path=OCR_CACHE_DIR, max_bytes=64 * 1024 * 1024, keep_images=True):
+        self.path = path
+        self.max_bytes = max(1, int(max_bytes))
+        self.keep_images = keep_images
+        self.hits = 0
+        self.region_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_latency = LatencyStats()
+        self._entries = None
+        self._images = OrderedDict()
+        self._signatures = {}
+        self._dirty = False
+        self._save_timer = None
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+
+    def _index_path(self):
+        return os.path.join(self.path, "index.json")
+
+    def _image_path(self, key):
+        return os.path.join(self.path, f"{key}.png")
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            if os.path.exists(self._index_path()):
+                with open(self._index_path(), "r", encoding="utf-8") as f:
+                    data = json.loads(f.read() or "{}")
+                for key, entry in sorted(data.items(), key=lambda kv: kv[1].get("used", 0)):
+                    self._entries[key] = entry
+        except Exception as e:
+            colored_print(f"[OCR] Ignoring unreadable OCR cache: {e}", Colors.WARNING)
+
+    @staticmethod
+    def key(fingerprint, settings):
+        return hashlib.blake2b(f"{settings}\x00{fingerprint}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, image, fingerprint, settings):
+        """(text, words) for `image`, from an exact entry or a cached image it was cropped from."""
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                self._load()
+                key = self.key(fingerprint, settings)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._touch(key, entry)
+                    self.hits += 1
+                    return entry["text"], entry["words"]
+                candidates = [
+                    (k, e) for k, e in reversed(self._entries.items())
+                    if e.get("settings") == settings and (e.get("image") or k in self._images) and e["size"][0] >= image.width and e["size"][1] >= image.height
+                    and tuple(e["size"]) != image.size
+                ][:self.REGION_CANDIDATES]
+                signatures = {k: self._signature(k, e) for k, e in candidates}
+            if candidates:
+                gray = image.convert("L")
+                phases = InkSignature.crop_phases(gray, {sig.background for sig in signatures.values() if sig is not None})
+                candidates = [(k, e) for k, e in candidates if signatures[k] is None or signatures[k].may_contain(phases)]
+                # Images already decoded first; the rest cost a PNG decode each
+                candidates.sort(key=lambda c: c[0] not in self._images)
+                for candidate, entry in candidates:
+                    if time.perf_counter() - started > self.REGION_BUDGET:
+                        if DEBUG:
+                            print("[OCR] cache: crop search budget spent; running OCR")
+                        break
+                    cached = self._gray(candidate)
+                    found = locate_subimage(cached, gray) if cached is not None else None
+                    if found is not None:
+                        words = self._words_in(entry["words"], found, gray.size)
+                        text = _tidy_ocr_text(ocr_text_from_words(words))
+                        with self._lock:
+                            self._touch(candidate, entry)
+                            self.region_hits += 1
+                        # Remember the crop itself so repeats are exact hits (no image: crops of it are crops of the parent)
+                        self.put(image, fingerprint, settings, text, words, keep_image=False)
+                        if DEBUG:
+                            print(f"[OCR] cache: crop at {found} of a cached {entry['size'][0]}x{entry['size'][1]} screenshot")
+                        return text, words
+            with self._lock:
+                self.misses += 1
+            return None
+        finally:
+            self.lookup_latency.add(time.perf_counter() - started)
+
+    @staticmethod
+    def _words_in(words, origin, size):
+        """Words whose box centre lies in the region, shifted to the region's coordinates."""
+        left, top = origin
+        right, bottom = left + size[0], top + size[1]
+        inside = []
+        for text, x, y, w, h, line in words:
+            cx, cy = x + w / 2.0, y + h / 2.0
+            if left <= cx < right and top <= cy < bottom:
+                inside.append([text, x - left, y - top, w, h, line])
+        return inside
+
+    def _signature(self, key, entry):
+        signature = self._signatures.get(key)
+        if signature is None and entry.get("signature"):
+            try:
+                signature = self._signatures[key] = InkSignature.decode(entry["background"], entry["signature"])
+            except Exception:
+                return None
+        return signature
+
+    def _touch(self, key, entry):
+        entry["used"] = time.time()
+        self._entries.move_to_end(key)
+        self._dirty = True
+
+    def _gray(self, key):
+        with self._lock:
+            gray = self._images.get(key)
+            if gray is not None:
+                self._images.move_to_end(key)
+                return gray
+        try:
+            with Image.open(self._image_path(key)) as im:
+                gray = im.convert("L")
+        except Exception:
+            return None
+        self._remember_image(key, gray)
+        return gray
+
+    def _remember_image(self, key, gray):
+        with self._lock:
+            self._images[key] = gray
+            self._images.move_to_end(key)
+            while len(self._images) > self.MEMORY_IMAGES:
+                self._images.popitem(last=False)
+
+    def put(self, image, fingerprint, settings, text, words, keep_image=True):
+        """Store a result; keep_image False skips the pixels (crops are already covered by their parent)."""
+        persist = keep_image and self.keep_images
+        key = self.key(fingerprint, settings)
+        entry = {"settings": settings, "size": list(image.size), "text": text, "words": words,
+                 "image": persist, "bytes": len(json.dumps(words)), "created": time.time(), "used": time.time()}
+        gray = image.convert("L") if keep_image else None
+        with self._lock:
+            self._load()
+            self._entries[key] = entry
+            self._dirty = True
+            if gray is not None:
+                self._remember_image(key, gray)
+        if not persist:
+            self._persisted()
+            return
+        # Signature, PNG encoding and the index write stay off the OCR → LLM path
+        Thread(target=self._persist, args=(key, entry, gray), name="hintify-ocr-cache", daemon=True).start()
+
+    def _persist(self, key, entry, gray):
+        try:
+            signature = InkSignature.of(gray)
+            with self._lock:
+                self._signatures[key] = signature
+                entry["background"], entry["signature"] = signature.background, signature.encode()
+            os.makedirs(self.path, exist_ok=True)
+            tmp = f"{self._image_path(key)}.tmp"
+            gray.save(tmp, format="PNG", compress_level=1)
+            os.replace(tmp, self._image_path(key))
+            with self._lock:
+                entry["bytes"] += os.path.getsize(self._image_path(key)) + len(entry["signature"])
+        except Exception as e:
+            colored_print(f"[OCR] Failed to save OCR cache image: {e}", Colors.WARNING)
+        self._persisted()
+
+    def _persisted(self):
+        """Evict down to budget and schedule one index write for everything put in the next SAVE_DELAY."""
+        with self._lock:
+            self._evict()
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _evict(self):
+        total = sum(e.get("bytes", 0) for e in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            total -= entry.get("bytes", 0)
+            self._images.pop(key, None)
+            self._signatures.pop(key, None)
+            self.evictions += 1
+            self._dirty = True
+            if entry.get("image"):
+                try:
+                    os.remove(self._image_path(key))
+                except OSError:
+                    pass
+
+    def flush(self):
+        with self._lock:
+            self._save_timer = None
+            if self._entries is None or not self._dirty:
+                return
+            # Snapshot under the lock; serializing and writing happen outside it so lookups are not held up
+            snapshot = OrderedDict((k, dict(e)) for k, e in self._entries.items())
+            self._dirty = False
+        self._save(snapshot)
+
+    def _save(self, snapshot):
+        with self._save_lock:
+            try:
+                os.makedirs(self.path, exist_ok=True)
+                tmp = f"{self._index_path()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(snapshot))
+                os.replace(tmp, self._index_path())
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                colored_print(f"[OCR] Failed to save OCR cache: {e}", Colors.WARNING)
+
+    def summary(self):
+        size = len(self._entries) if self._entries is not None else 0
+        mb = sum(e.get("bytes", 0) for e in (self._entries or {}).values()) / (1024 * 1024)
+        return (f"hits={self.hits} crop_hits={self.region_hits} misses={self.misses} entries={size} "
+                f"size={mb:.1f}/{self.max_bytes / (1024 * 1024):.0f}MB evictions={self.evictions} lookup: {self.lookup_latency.summary()}")
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache(cfg):
+    """Shared OCRCache, or None when disabled via the 'ocr_cache' config key."""
+    global _ocr_cache
+    if not cfg.get("ocr_cache", True):
+        return None
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRCache(path=OCR_CACHE_DIR, max_bytes=float(cfg.get("ocr_cache_mb", 64)) * 1024 * 1024,
+                                  keep_images=bool(cfg.get("ocr_cache_images", False)))
+            atexit.register(_ocr_cache.flush)
+        return _ocr_cache
+
+
+def recognize_image(image, engine=None, use_cache=True):
+    """OCR a PIL image through the OCR cache: returns (layout text, words), words as in OCREngine._recognize_words.
+
+    The layout text keeps the engine's line and paragraph breaks either way, for
+    split_questions; extract_text_from_image collapses it into the one-line text
+    the rest of the app uses. Without the cache words is None.
+    """
+    engine = engine or get_ocr_engine()
+    cache = get_ocr_cache(load_config()) if use_cache else None
+    if cache is None:
+        return _tidy_ocr_text(engine.recognize(image)), None
+    fingerprint, settings = clipboard_fingerprint(image), engine.settings_key()
+    hit = cache.get(image, fingerprint, settings)
+    if hit is not None:
+        return hit
+    text, words = engine.recognize_layout(image)
+    text = _tidy_ocr_text(text)
+    cache.put(image, fingerprint, settings, text, words)
+    return text, words
+
+
+def extract_text_from_image(image_bytes, use_cache=True):
+    return _clean_ocr_text(extract_text_and_words(image_bytes, use_cache)[0])
+
+
+def extract_text_and_words(image_bytes, use_cache=True):
+    """(layout text, words) for an encoded image, see recognize_image.
+
+    On failure the text is an '[OCR Error] ...' message and words None.
+    """
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        return recognize_image(image, use_cache=use_cache)
+    except Exception as e:
+        return f"[OCR Error] {str(e)}", None
+
+
+def extract_text_from_images(images_bytes):
+    """Batch variant of extract_text_from_image, recognizing images concurrently."""
+    engine = get_ocr_engine()
+
+    def one(image_bytes):
+        try:
+            return _clean_ocr_text(recognize_image(Image.open(BytesIO(image_bytes)), engine)[0])
+        except Exception as e:
+            return f"[OCR Error] {str(e)}"
+
+    return list(engine.pool().map(one, images_bytes))
+
+
+# -------------------------------
+# 2. Question Classification
+# -------------------------------
+
+MCQ_PATTERN = re.compile(r"\(A\)|\(B\)|\(C\)|\(D\)|\b\d\)\b")
+
+
+# Instruction verbs and question words that make a text a question even without a "?" (routing and splitting only;
+# classify_question keeps its own narrower check, which the prompt's classification is based on)
+_QUESTION_WORDS_RE = re.compile(
+    r"\b(solve|find|calculat|prove|evaluat|explain|simplif|determin|describ|compar|defin|deriv|comput|estimat"
+    r"|identif|differentiat|integrat|expand|factori[sz]|factor|convert|sketch|justify|discuss|analy[sz]|predict"
+    r"|classif|choose|select|show that|verify|(?:what|which|why|how|who|where|when)\b)",
+    re.IGNORECASE,
+)
+
+# An equation, inequality or arithmetic expression ("2x+3=7", "x^2 - 4", "3 * 7"); words joined by "/" or "-"
+# ("and/or", "COVID-19", "pages 12-48") do not count
+_MATH_RE = re.compile(
+    r"[\w)\]]\s*[=<>≤≥≠]\s*[-\w(\[]"
+    r"|(?<![a-z])[a-z\d)]\s*[+*/×÷^]\s*[a-z\d(](?![a-z])"
+    r"|\d\s*-\s*[a-z(]|(?<![a-z])[a-z)]\s*-\s*\d",
+    re.IGNORECASE,
+)
+
+
+def classify_question(text):
+    if MCQ_PATTERN.search(text):
+        return "MCQ"
+    if "?" in text or re.search(r"(solve|find|calculate|prove|evaluate)", text, re.IGNORECASE):
+        return "Descriptive"
+    return "Not a Question"
+
+
+def looks_like_question(text):
+    """Wider check than classify_question, deciding whether a capture is worth an LLM call.
+
+    Besides what classify_question accepts, instruction verbs, question words and
+    bare equations or expressions (a screenshot of just "2x+3=7") count.
+    """
+    return classify_question(text) != "Not a Question" or bool(_QUESTION_WORDS_RE.search(text) or _MATH_RE.search(text))
+
+
+# -------------------------------
+# 3. Difficulty Detection
+# -------------------------------
+
+def detect_difficulty(text):
+    word_count = text.count(" ") + 1
+    if word_count < 15:
+        return "Easy"
+    elif word_count < 40:
+        return "Medium"
+    return "Hard"
+
+
+# -------------------------------
+# 3b. Question Splitting
+# -------------------------------
+
+# "1." "2)" "Q3" "Q.4:" "Question 5" at the start of a question; digits must be followed by whitespace
+_QUESTION_NUMBER_RE = re.compile(
+    r"(?:(?<=\s)|^)(?:(?P<q>Q(?:uestion)?\s*\.?\s*)(?P<qn>\d{1,2})\s*[.:)]?|(?P<n>\d{1,2})(?P<sep>[.)]))(?=\s+\S)",
+    re.IGNORECASE,
+)
+_OPTION_RE = re.compile(r"\(([A-Ea-e])\)")
+
+
+def _option_spans(text):
+    """(start, end) of each MCQ option group, from its "(A)" up to its last option marker."""
+    spans, start, expected, last = [], None, "a", None
+    for m in _OPTION_RE.finditer(text):
+        letter = m.group(1).lower()
+        if letter == "a":
+            if start is not None and last is not None:
+                spans.append((start, last))
+            start, expected, last = m.start(), "b", m.start()
+        elif start is not None and letter == expected:
+            expected, last = chr(ord(letter) + 1), m.start()
+    if start is not None and last is not None:
+        spans.append((start, last))
+    return spans
+
+
+def _number_markers(text):
+    """Candidate question-number markers as (start, end, number, style, at_start), outside MCQ option groups.
+
+    at_start is True for markers opening the text, a line or a sentence (after ". ", "? ", "! " or ": ").
+    """
+    blocked = _option_spans(text)
+    markers = []
+    for m in _QUESTION_NUMBER_RE.finditer(text):
+        if any(a < m.start() < b for a, b in blocked):
+            continue
+        before = text[:m.start()].rstrip(" \t")
+        at_start = not before or before.endswith("\n") or m.start() > len(before) and before[-1] in ".?!:"
+        if m.group("q"):
+            markers.append((m.start(), m.end(), int(m.group("qn")), "q", at_start))
+        else:
+            markers.append((m.start(), m.end(), int(m.group("n")), m.group("sep"), at_start))
+    return markers
+
+
+def _next_marker(markers, after, number, style):
+    """The marker numbered `number` that follows `after`, or None.
+
+    A number can also end a sentence ("radius 3. 3. Evaluate"), so a marker at a
+    line or sentence start wins; failing that, the last candidate before the
+    first marker of the number after it is taken.
+    """
+    candidates = [m for m in markers if m[0] > after[0] and m[3] == style and m[2] == number]
+    if not candidates:
+        return None
+    for marker in candidates:
+        if marker[4]:
+            return marker
+    following = [m[0] for m in markers if m[0] > candidates[0][0] and m[3] == style and m[2] == number + 1]
+    before_next = [m for m in candidates if not following or m[0] < following[0]]
+    return before_next[-1]
+
+
+def _numbered_segments(text, markers):
+    """Split at the longest run of consecutively numbered markers of one style, or None."""
+    best = []
+    for first in markers:
+        chain = [first]
+        while True:
+            marker = _next_marker(markers, chain[-1], chain[-1][2] + 1, first[3])
+            if marker is None:
+                break
+            chain.append(marker)
+        # Longer chains win; between equal ones, the one starting at a line or sentence start
+        if len(chain) > len(best) or len(chain) == len(best) and first[4] and not best[0][4]:
+            best = chain
+    if len(best) < 2:
+        return None
+    segments = []
+    for k, (start, end, number, _, _) in enumerate(best):
+        stop = best[k + 1][0] if k + 1 < len(best) else len(text)
+        segments.append((str(number), _clean_ocr_text(text[end:stop])))
+    # A run of "1) 21 2) 27 ..." is an option list, not questions: every part must read as a question
+    if not all(_reads_as_question(t) for _, t in segments):
+        return None
+    preamble = _clean_ocr_text(text[:best[0][0]])
+    if preamble and _reads_as_question(preamble):
+        segments.insert(0, ("", preamble))
+    return segments
+
+
+def _reads_as_question(text):
+    """A question stem of at least two words before any "(A)" options, classified as a question."""
+    first_option = _OPTION_RE.search(text)
+    stem = text[:first_option.start()] if first_option else text
+    return len(stem.split()) >= 2 and (classify_question(text) != "Not a Question" or bool(_QUESTION_WORDS_RE.search(text)))
+
+
+def _layout_lines(words):
+    """[(text, top, bottom)] per OCR text line, in reading order."""
+    lines = OrderedDict()
+    for text, x, y, w, h, line in words:
+        entry = lines.setdefault(line, [[], y, y + h])
+        entry[0].append(text)
+        entry[1], entry[2] = min(entry[1], y), max(entry[2], y + h)
+    return [(" ".join(t), top, bottom) for t, top, bottom in lines.values()]
+
+
+def _layout_blocks(lines):
+    """Group lines into blocks separated by vertical gaps well above the usual line height."""
+    if len(lines) < 2:
+        return [lines]
+    heights = sorted(bottom - top for _, top, bottom in lines)
+    gap_limit = max(4, heights[len(heights) // 2]) * 1.2
+    blocks = [[lines[0]]]
+    for prev, line in zip(lines, lines[1:]):
+        if line[1] - prev[2] > gap_limit:
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+
+def split_questions(text, words=None, max_questions=6):
+    """Split OCR text holding several questions into [(label, question text), ...].
+
+    Question numbering ("1.", "2)", "Q3", "Question 4") is the main signal;
+    numbers inside MCQ option groups ("(A) 2. ...") and option lists numbered
+    like questions are ignored. With word boxes, numbering is looked for at line
+    starts first, and a page without numbering is split at large vertical gaps
+    when every block reads as a question. Labels are the question's own number
+    ("" for unnumbered parts). Returns a single part when there is nothing to split.
+    """
+    whole = [("", text)]
+    if not text or max_questions < 2:
+        return whole
+    segments = None
+    if words:
+        lines = _layout_lines(words)
+        joined = "\n".join(line for line, _, _ in lines)
+        line_starts = {0} | {i + 1 for i, c in enumerate(joined) if c == "\n"}
+        segments = _numbered_segments(joined, [m for m in _number_markers(joined) if m[0] in line_starts])
+        if segments is None:
+            blocks = [_clean_ocr_text(" ".join(line for line, _, _ in block)) for block in _layout_blocks(lines)]
+            if len(blocks) > 1 and all(_reads_as_question(b) for b in blocks):
+                segments = [("", b) for b in blocks]
+    if segments is None:
+        segments = _numbered_segments(text, _number_markers(text))
+    if not segments:
+        return whole
+    if len(segments) > max_questions:
+        rest = " ".join(t for _, t in segments[max_questions - 1:])
+        segments = segments[:max_questions - 1] + [(segments[max_questions - 1][0], rest)]
+    return segments
+
+
+def classify_capture(text, words=None, layout=None):
+    """Question type and difficulty of a capture, plus its questions when it holds several.
+
+    Returns (qtype, difficulty, parts) with parts as [(label, text, qtype, difficulty), ...]
+    for a multi-question capture and [] otherwise. layout is the OCR text with its line
+    breaks (see recognize_image), which only the split looks at. The interactive pipeline,
+    batch mode and the hint server all classify through here, so they hint the same questions.
+    """
+    cfg = load_config()
+    parts = []
+    if cfg.get("split_questions", True):
+        with trace_span("split") as attrs:
+            parts = split_questions(layout or text, words, int(cfg.get("max_questions", 6) or 1))
+            attrs["questions"] = len(parts)
+    with trace_span("classify"):
+        qtype, difficulty = classify_question(text), detect_difficulty(text)
+        if len(parts) < 2:
+            return qtype, difficulty, []
+        return qtype, difficulty, [(label or str(i + 1), part, classify_question(part), detect_difficulty(part))
+                                   for i, (label, part) in enumerate(parts)]
+
+
+# -------------------------------
+# 4. Prompt + LLM Providers (Ollama only)
+# -------------------------------
+
+# Static instructions first so every request shares the same prefix; Ollama reuses
+# the KV cache of a matching prefix and only evaluates the question-specific suffix.
+SYSTEM_PROMPT = """You are SnapAssist AI, a study buddy for students.
+
+Your role:
+- Provide ONLY hints, NEVER the exact answer or final numeric/option.
+- Do NOT solve the question fully.
+- Do NOT mention which option is correct.
+- Do NOT provide the final numeric value, simplified expression, or boxed result.
+- Instead, give guiding clues that push the student to think.
+
+Response format:
+Always output between 3 to 5 hints in this style:
+Hint 1: ...
+Hint 2: ...
+Hint 3: ...
+(Hint 4 and Hint 5 only if needed)
+
+Guidelines for hints:
+- Focus on relevant formulae, rules, and methods.
+- Use progressive layers: concept → formula → setup → approach → final nudge.
+- Each hint should guide without completing the solution.
+- Keep hints concise for faster responses.
+
+End with an encouragement such as:
+“Now try completing the final step on your own.”
+or
+“Work carefully through the last step to see which option fits.”
+
+If the text is not a valid question, reply only:
+⚠️ This does not appear to be a question.
+"""
+
+
+def build_user_prompt(text, qtype, difficulty):
+    """The per-question part of the prompt (sent after SYSTEM_PROMPT)."""
+    return f"""The following text was extracted from a screenshot:
+{text}
+
+Classification:
+- Type: {qtype}
+- Difficulty: {difficulty}
+"""
+
+
+def build_prompt(text, qtype, difficulty, system=SYSTEM_PROMPT):
+    """Single-message prompt for providers without a separate system role."""
+    return f"{system}\n{build_user_prompt(text, qtype, difficulty)}"
+
+
+# Trimmed instructions for Easy questions: fewer prompt tokens, three hints
+SHORT_SYSTEM_PROMPT = """You are SnapAssist AI, a study buddy for students.
+Give exactly 3 short hints that guide the student toward the answer.
+Never state the answer, the correct option or the final value.
+
+Format:
+Hint 1: ...
+Hint 2: ...
+Hint 3: ...
+
+If the text is not a valid question, reply only:
+⚠️ This does not appear to be a question.
+"""
+
+PROMPT_TEMPLATES = {"full": SYSTEM_PROMPT, "short": SHORT_SYSTEM_PROMPT}
+NOT_A_QUESTION = "⚠️ This does not appear to be a question."
+
+
+class Route:
+    """Where and how one question is answered; see route_question."""
+
+    def __init__(self, tier, model=None, num_predict=None, template="full", local_response=None):
+        self.tier = tier
+        self.model = model
+        self.num_predict = num_predict
+        self.template = template
+        self.local_response = local_response
+
+    @property
+    def system(self):
+        return PROMPT_TEMPLATES.get(self.template, SYSTEM_PROMPT)
+
+    @property
+    def cache_tag(self):
+        """What besides the question changes the hints produced on this route."""
+        return f"{self.template}/{self.num_predict or ''}"
+
+    def __repr__(self):
+        if self.local_response is not None:
+            return f"Route({self.tier}, local)"
+        return f"Route({self.tier}, model={self.model}, num_predict={self.num_predict}, template={self.template})"
+
+
+def route_question(text, qtype, difficulty, cfg):
+    """Choose model, num_predict and prompt template from the classification and text length.
+
+    The tier is the detected difficulty, bumped to Hard for long OCR text; each tier's
+    settings come from the ollama_model_*/num_predict_*/prompt_template_* config keys.
+    """
+    if qtype == "Not a Question" and cfg.get("skip_non_questions", True) and not looks_like_question(text):
+        return Route("skip", local_response=NOT_A_QUESTION)
+    if not cfg.get("routing", True):
+        return Route("default")
+    tier = difficulty
+    if cfg.get("route_hard_chars") and len(text) >= cfg["route_hard_chars"]:
+        tier = "Hard"
+    key = tier.lower()
+    return Route(
+        tier,
+        model=cfg.get(f"ollama_model_{key}") or None,
+        num_predict=cfg.get(f"num_predict_{key}") or None,
+        template=cfg.get(f"prompt_template_{key}") or "full",
+    )
+
+
+# Request-to-final-hints latency per routing tier
+route_latency = {}
+
+
+def record_route_latency(tier, seconds):
+    stats = route_latency.get(tier)
+    if stats is None:
+        stats = route_latency.setdefault(tier, LatencyStats())
+    stats.add(seconds)
+
+
+def route_summary():
+    return " ".join(f"{tier}[{stats.summary()}]" for tier, stats in sorted(route_latency.items()))
+
+
+def have_ollama():
+    return model_registry.available()
+
+
+def normalize_ollama_host(host):
+    """Turn OLLAMA_HOST-style values ('0.0.0.0', 'localhost:11434', 'http://h:p') into a base URL."""
+    host = (host or "").strip() or "127.0.0.1:11434"
+    if "://" not in host:
+        host = "http://" + host
+    scheme, rest = host.split("://", 1)
+    netloc = rest.split("/", 1)[0]
+    if netloc.startswith("0.0.0.0"):
+        netloc = "127.0.0.1" + netloc[len("0.0.0.0"):]
+    if scheme == "http" and ":" not in netloc.rsplit("]", 1)[-1]:
+        netloc += ":11434"
+    return f"{scheme}://{netloc}"
+
+
+class LineHold:
+    """Holds back the text after the last newline until the stream says whether it was cut off.
+
+    A response stopped by the output cap (num_predict / maxOutputTokens) ends
+    mid-sentence; that last line is dropped instead of being shown as a hint.
+    Complete lines pass straight through, so streaming is not delayed.
+    """
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, text):
+        text = self.pending + text
+        cut = text.rfind("\n") + 1
+        self.pending = text[cut:]
+        return text[:cut]
+
+    def finish(self, truncated):
+        tail, self.pending = self.pending, ""
+        if truncated and DEBUG and tail.strip():
+            print(f"[LLM] Dropping the line cut off by the output cap: {tail.strip()!r}")
+        return "" if truncated else tail
+
+
+def drop_truncated_line(text, truncated):
+    """Non-streamed counterpart of LineHold: without its cut-off last line when `truncated`."""
+    if not truncated or "\n" not in text:
+        return text
+    return text[:text.rfind("\n")]
+
+
+def _ollama_truncated(data):
+    return data.get("done_reason") == "length"
+
+
+class OllamaClient:
+    """HTTP client for the Ollama server API, reusing one pooled keep-alive session.
+
+    Talking to the server directly avoids spawning `ollama run` / `ollama list` per
+    question; `keep_alive` keeps the model resident between hints. With a `system`
+    prompt requests go to /api/chat, so the unchanged system prefix is served from
+    the model's KV cache and only the new user message is evaluated.
+    """
+
+    def __init__(self, host=None, keep_alive="30m", timeout=120, connect_timeout=3):
+        self.host = normalize_ollama_host(host or os.getenv("OLLAMA_HOST"))
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.prompt_eval = LatencyStats()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, path):
+        return f"{self.host}{path}"
+
+    @staticmethod
+    def _path(system):
+        return "/api/chat" if system else "/api/generate"
+
+    @staticmethod
+    def _chunk_text(data):
+        if "message" in data:
+            return (data.get("message") or {}).get("content") or ""
+        return data.get("response") or ""
+
+    def _record(self, data):
+        """Account the prompt-eval/eval counters Ollama reports in its final message."""
+        self.requests += 1
+        self.prompt_tokens += data.get("prompt_eval_count") or 0
+        self.eval_tokens += data.get("eval_count") or 0
+        self.prompt_eval.add((data.get("prompt_eval_duration") or 0) / 1e9)
+        if DEBUG:
+            print(
+                f"[LLM] Ollama prompt_eval={data.get('prompt_eval_count') or 0} tok in {(data.get('prompt_eval_duration') or 0) / 1e6:.0f}ms, "
+                f"eval={data.get('eval_count') or 0} tok in {(data.get('eval_duration') or 0) / 1e6:.0f}ms"
+            )
+
+    def summary(self):
+        avg = self.prompt_tokens / self.requests if self.requests else 0.0
+        return f"requests={self.requests} avg_prompt_tokens={avg:.0f} eval_tokens={self.eval_tokens} prompt_eval {self.prompt_eval.summary()}"
+
+    def is_available(self, timeout=1.0):
+        try:
+            resp = self.session.get(self._url("/api/version"), timeout=timeout)
+            return resp.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def list_models(self):
+        resp = self.session.get(self._url("/api/tags"), timeout=(self.connect_timeout, 10))
+        resp.raise_for_status()
+        return [m.get("name") or m.get("model") for m in (resp.json().get("models") or []) if m]
+
+    def pull(self, model):
+        resp = self.session.post(self._url("/api/pull"), json={"model": model, "stream": False}, timeout=(self.connect_timeout, None))
+        resp.raise_for_status()
+        return True
+
+    def warm(self, model, system=None, keep_alive=None):
+        """Load `model` into memory; with `system`, also evaluate that prompt prefix into its KV cache."""
+        if system:
+            payload = self._payload("", model, False, keep_alive, {"num_predict": 1}, system)
+        else:
+            payload = {"model": model, "keep_alive": keep_alive or self.keep_alive}  # no prompt: load only
+        resp = self.session.post(self._url(self._path(system)), json=payload, timeout=(self.connect_timeout, self.timeout))
+        resp.raise_for_status()
+        return True
+
+    def _payload(self, prompt, model, stream, keep_alive=None, options=None, system=None):
+        payload = {"model": model, "stream": stream, "keep_alive": keep_alive or self.keep_alive}
+        if system:
+            payload["messages"] = [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+        else:
+            payload["prompt"] = prompt
+        if options:
+            payload["options"] = options
+        return payload
+
+    def generate(self, prompt, model, keep_alive=None, options=None, system=None):
+        payload = self._payload(prompt, model, False, keep_alive, options, system)
+        resp = self.session.post(self._url(self._path(system)), json=payload, timeout=(self.connect_timeout, self.timeout))
+        if resp.status_code != 200:
+            raise requests.HTTPError(f"Ollama HTTP {resp.status_code}: {resp.text.strip()}", response=resp)
+        data = resp.json()
+        self._record(data)
+        return drop_truncated_line(self._chunk_text(data), _ollama_truncated(data)).strip()
+
+    def generate_stream(self, prompt, model, keep_alive=None, options=None, system=None, on_open=None):
+        """Yield response text chunks as the server produces them (NDJSON stream).
+
+        on_open(response) is called once the response is open, so another thread can close it.
+        """
+        payload = self._payload(prompt, model, True, keep_alive, options, system)
+        with self.session.post(self._url(self._path(system)), json=payload, stream=True, timeout=(self.connect_timeout, self.timeout)) as resp:
+            if on_open is not None:
+                on_open(resp)
+            if resp.status_code != 200:
+                raise requests.HTTPError(f"Ollama HTTP {resp.status_code}: {resp.text.strip()}", response=resp)
+            hold, truncated = LineHold(), False
+            for raw in resp.iter_lines():
+                if not raw:
+                    continue
+                data = json.loads(raw)
+                if data.get("error"):
+                    raise requests.HTTPError(f"Ollama error: {data['error']}", response=resp)
+                text = hold.feed(self._chunk_text(data))
+                if text:
+                    yield text
+                if data.get("done"):
+                    # Keep reading to the end of the body so the connection goes back to the pool
+                    self._record(data)
+                    truncated = _ollama_truncated(data)
+            tail = hold.finish(truncated)
+            if tail:
+                yield tail
+
+    async def agenerate_stream(self, prompt, model, keep_alive=None, options=None, system=None):
+        """asyncio variant of generate_stream, reading the pooled session's stream on a worker thread.
+
+        Cancelling the consuming task closes the response at once (proxies, TLS and
+        keep-alive work as for the blocking calls), and Ollama stops generating when
+        its client disconnects.
+        """
+        opened = []
+        chunks = self.generate_stream(prompt, model, keep_alive, options, system, on_open=opened.append)
+
+        def abort():
+            for resp in opened:
+                resp.close()
+
+        async for chunk in iterate_in_thread(chunks, on_cancel=abort):
+            yield chunk
+
+
+_ollama_client = None
+
+
+def get_ollama_client():
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = OllamaClient()
+    return _ollama_client
+
+
+def normalize_ollama_model(name):
+    """Canonical model reference: 'llama3.2' means 'llama3.2:latest'; the default registry prefix is dropped."""
+    name = (name or "").strip()
+    for prefix in ("registry.ollama.ai/library/", "registry.ollama.ai/"):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    if ":" not in name.rsplit("/", 1)[-1]:
+        name += ":latest"
+    return name
+
+
+def ollama_model_matches(model, names):
+    """Exact, tag-aware membership test: 'llama3.2' matches 'llama3.2:latest' but
+    'llama3.2:3b' does not match 'llama3.2:3b-instruct'."""
+    wanted = normalize_ollama_model(model)
+    return any(normalize_ollama_model(n) == wanted for n in names)
+
+
+def parse_ollama_list(stdout):
+    """Model names from `ollama list` output (first column, header skipped)."""
+    names = []
+    for line in (stdout or "").splitlines():
+        fields = line.split()
+        if fields and fields[0] != "NAME":
+            names.append(fields[0])
+    return names
+
+
+class OllamaModelRegistry:
+    """Cached inventory of the local Ollama models.
+
+    The inventory is fetched once (GET /api/tags, else `ollama list`) and trusted
+    for `ttl` seconds; after that callers still get the cached list immediately
+    while a background thread refreshes it. Pulls and pre-warming go through here
+    too, so one question never probes the server more than the TTL allows.
+    A failed fetch (server not up yet, no CLI) is only trusted for `negative_ttl`
+    and then retried synchronously, so a server that starts later is found quickly.
+    """
+
+    def __init__(self, ttl=300, negative_ttl=5):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.refreshes = 0
+        self.pulls = 0
+        self._names = None  # normalized model names, None until the first fetch
+        self._host = None
+        self._fetched = 0.0
+        self._reachable = False
+        self._refreshing = False
+        self._warmed = set()
+        self._lock = threading.Lock()
+        self._pull_lock = threading.Lock()
+
+    def _fetch(self):
+        """(reachable, names or None) from the HTTP API, else the CLI."""
+        client = get_ollama_client()
+        try:
+            return True, client.list_models()
+        except requests.ConnectionError:
+            pass  # Server not reachable over HTTP; fall back to the CLI
+        except Exception as e:
+            if DEBUG:
+                print(f"[Models] Listing models over HTTP failed: {e}")
+            return True, None
+        if shutil.which("ollama") is None:
+            return False, None
+        try:
+            result = subprocess.run(["ollama", "list"], capture_output=True, text=True, check=True, timeout=30)
+            return True, parse_ollama_list(result.stdout)
+        except Exception as e:
+            if DEBUG:
+                print(f"[Models] 'ollama list' failed: {e}")
+            return True, None  # CLI present; the server may still come up
+
+    def refresh(self):
+        started = time.perf_counter()
+        host = get_ollama_client().host
+        try:
+            reachable, names = self._fetch()
+        finally:
+            with self._lock:
+                self._refreshing = False
+        with self._lock:
+            self.refreshes += 1
+            if names is not None:
+                self._names = {normalize_ollama_model(n) for n in names if n}
+            elif self._host != host:
+                self._names = None  # never keep another server's inventory
+            self._reachable = reachable
+            self._host = host
+            self._fetched = time.monotonic()
+        if DEBUG:
+            print(f"[Models] Inventory refreshed in {(time.perf_counter() - started) * 1000:.0f}ms ({self.summary()})")
+        return self._names
+
+    def _ensure_fresh(self):
+        """Fetch synchronously if nothing is cached for this host; refresh in the background once stale."""
+        host = get_ollama_client().host
+        with self._lock:
+            cached = bool(self._fetched) and self._host == host
+            known = self._reachable and self._names is not None
+            ttl = self.ttl if known else self.negative_ttl
+            if cached and (self._refreshing or time.monotonic() - self._fetched <= ttl):
+                return
+            # A stale inventory is served while it refreshes; a stale failure is retried right away
+            cached = cached and known
+            if cached:
+                self._refreshing = True
+        if cached:
+            Thread(target=self.refresh, name="hintify-models", daemon=True).start()
+        else:
+            self.refresh()
+
+    def available(self):
+        """True if the Ollama server answers or the CLI is installed."""
+        self._ensure_fresh()
+        return self._reachable
+
+    def models(self):
+        self._ensure_fresh()
+        return sorted(self._names or ())
+
+    def has(self, model):
+        self._ensure_fresh()
+        return self._names is not None and normalize_ollama_model(model) in self._names
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched = 0.0
+
+    def ensure(self, model):
+        """Make sure `model` is installed, pulling it if the inventory says it is missing."""
+        if self.has(model):
+            return True
+        with self._pull_lock:
+            if self.has(model):
+                return True  # pulled meanwhile by another caller
+            print(f"[Setup] Pulling Ollama model '{model}'...")
+            try:
+                try:
+                    get_ollama_client().pull(model)
+                except requests.ConnectionError:
+                    if shutil.which("ollama") is None:
+                        raise
+                    subprocess.run(["ollama", "pull", model], check=True)
+            except Exception as e:
+                print(f"[Setup] Could not ensure Ollama model '{model}': {e}")
+                return False
+            self.pulls += 1
+            with self._lock:
+                self._names = (self._names or set()) | {normalize_ollama_model(model)}
+            return True
+
+    def prewarm(self, model, keep_alive=None, system=SYSTEM_PROMPT):
+        """Load `model` and the `system` prompt prefix so the first question skips the cold start."""
+        key = (get_ollama_client().host, normalize_ollama_model(model), hashlib.sha1(system.encode("utf-8")).hexdigest())
+        if key in self._warmed:
+            return True
+        started = time.perf_counter()
+        try:
+            get_ollama_client().warm(model, system=system, keep_alive=keep_alive)
+        except Exception as e:
+            if DEBUG:
+                print(f"[Models] Pre-warming '{model}' failed: {e}")
+            return False
+        self._warmed.add(key)
+        record_span("prewarm", time.perf_counter() - started, model=model)
+        if DEBUG:
+            print(f"[Models] Pre-warmed '{model}' in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return True
+
+    def summary(self):
+        age = time.monotonic() - self._fetched if self._fetched else None
+        return (f"reachable={self._reachable} models={len(self._names or ())} refreshes={self.refreshes} pulls={self.pulls}"
+                + (f" age={age:.0f}s" if age is not None else ""))
+
+
+model_registry = OllamaModelRegistry()
+
+
+def ensure_ollama_model(model):
+    with trace_span("ensure_model", model=model):
+        return model_registry.ensure(model)
+
+
+def warm_targets(model, cfg):
+    """[(model, system prompt)] the routes of a question can use, in tier order, without repeats.
+
+    Tier models that are not installed are left out: they are pulled when first needed.
+    """
+    targets = []
+    for tier in ("Easy", "Medium", "Hard"):
+        route = route_question("", "Descriptive", tier, dict(cfg, route_hard_chars=0))
+        target = (route.model or model, route.system)
+        if target not in targets and (target[0] == model or model_registry.has(target[0])):
+            targets.append(target)
+    return targets
+
+
+def prepare_ollama_model(model, keep_alive=None, prewarm=True, cfg=None):
+    """Startup path: make sure the model is installed, then load it (with the prompt prefixes its routes use)."""
+    if not ensure_ollama_model(model):
+        return False
+    if prewarm:
+        for target_model, system in warm_targets(model, cfg if cfg is not None else load_config()):
+            model_registry.prewarm(target_model, keep_alive, system)
+    return True
+
+
+def _cli_prompt(prompt, system):
+    # `ollama run` reads a single message from stdin
+    return f"{system}\n{prompt}" if system else prompt
+
+
+def _ollama_failed(e):
+    """Error text for a failed Ollama call; a 404 means the cached model inventory is out of date."""
+    if "HTTP 404" in str(e):
+        model_registry.invalidate()
+    return f"[LLM Error] {e}"
+
+
+def query_with_ollama(prompt, model, keep_alive=None, system=None, options=None):
+    """Generate via the Ollama HTTP API; falls back to `ollama run` if the server is unreachable.
+
+    With `system` the prompt is sent as a chat turn after that system message.
+    Callers are expected to have run ensure_ollama_model already.
+    """
+    client = get_ollama_client()
+    try:
+        if DEBUG:
+            print(f"[LLM] Calling Ollama HTTP model='{model}' host='{client.host}' (len(prompt)={len(prompt)})")
+        return client.generate(prompt, model, keep_alive=keep_alive, options=options, system=system)
+    except requests.ConnectionError:
+        if DEBUG:
+            print("[LLM] Ollama server not reachable over HTTP; falling back to 'ollama run'")
+    except requests.Timeout:
+        return "[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
+    except Exception as e:
+        return _ollama_failed(e)
+
+    if shutil.which("ollama") is None:
+        return "[Setup] Ollama CLI not found. Install from https://ollama.com/download and ensure 'ollama' is in your PATH."
+    try:
+        result = subprocess.run(["ollama", "run", model], input=_cli_prompt(prompt, system), text=True, capture_output=True, check=True, timeout=120)
+        return result.stdout.strip()
+    except subprocess.TimeoutExpired:
+        return "[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
+    except subprocess.CalledProcessError as e:
+        return f"[LLM Error] {e.stderr or str(e)}"
+
+
+def stream_with_ollama(prompt, model, keep_alive=None, system=None, options=None):
+    """Streaming variant of query_with_ollama: yields raw text chunks as they arrive."""
+    client = get_ollama_client()
+    try:
+        if DEBUG:
+            print(f"[LLM] Streaming Ollama HTTP model='{model}' host='{client.host}' (len(prompt)={len(prompt)})")
+        yield from client.generate_stream(prompt, model, keep_alive=keep_alive, options=options, system=system)
+        return
+    except requests.ConnectionError:
+        if DEBUG:
+            print("[LLM] Ollama server not reachable over HTTP; falling back to 'ollama run'")
+    except requests.Timeout:
+        yield "\n[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
+        return
+    except Exception as e:
+        yield "\n" + _ollama_failed(e)
+        return
+
+    if shutil.which("ollama") is None:
+        yield "[Setup] Ollama CLI not found. Install from https://ollama.com/download and ensure 'ollama' is in your PATH."
+        return
+    proc = None
+    try:
+        proc = subprocess.Popen(["ollama", "run", model], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        proc.stdin.write(_cli_prompt(prompt, system))
+        proc.stdin.close()
+        for line in proc.stdout:
+            yield line
+        if proc.wait(timeout=120) != 0:
+            yield f"\n[LLM Error] {proc.stderr.read().strip()}"
+    except subprocess.TimeoutExpired:
+        yield "\n[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
+    except Exception as e:
+        yield f"\n[LLM Error] {e}"
+    finally:
+        # Also runs when the consumer closes the stream early (superseded question)
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+
+async def astream_with_ollama(prompt, model, keep_alive=None, system=None, options=None):
+    """asyncio variant of stream_with_ollama; cancelling the task aborts generation."""
+    client = get_ollama_client()
+    try:
+        if DEBUG:
+            print(f"[LLM] Streaming Ollama HTTP (async) model='{model}' host='{client.host}' (len(prompt)={len(prompt)})")
+        async for chunk in client.agenerate_stream(prompt, model, keep_alive=keep_alive, options=options, system=system):
+            yield chunk
+        return
+    except requests.ConnectionError:
+        if DEBUG:
+            print("[LLM] Ollama server not reachable over HTTP; falling back to 'ollama run'")
+    except requests.Timeout:
+        yield "\n[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
+        return
+    except Exception as e:
+        yield "\n" + _ollama_failed(e)
+        return
+
+    if shutil.which("ollama") is None:
+        yield "[Setup] Ollama CLI not found. Install from https://ollama.com/download and ensure 'ollama' is in your PATH."
+        return
+    proc = None
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ollama", "run", model, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        proc.stdin.write(_cli_prompt(prompt, system).encode("utf-8"))
+        await proc.stdin.drain()
+        proc.stdin.close()
+        while True:
+            line = await asyncio.wait_for(proc.stdout.readline(), 120)
+            if not line:
+                break
+            yield line.decode("utf-8", "replace")
+        if await proc.wait() != 0:
+            yield f"\n[LLM Error] {(await proc.stderr.read()).decode('utf-8', 'replace').strip()}"
+    except asyncio.TimeoutError:
+        yield "\n[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
+    except Exception as e:
+        yield f"\n[LLM Error] {e}"
+    finally:
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+
+
+async def iterate_in_thread(chunks, on_cancel=None):
+    """Drive a blocking chunk generator from a worker thread as an async generator.
+
+    Used for the requests-based Ollama and Gemini streams. When the consumer is
+    cancelled the worker stops at its next chunk and closes the generator,
+    releasing the HTTP response; on_cancel() runs right away to unblock a worker
+    still waiting for that chunk (e.g. by closing the response).
+    """
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(pending.put_nowait, item)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    def pump():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                put(chunk)
+        except Exception as e:
+            put(e)
+        finally:
+            chunks.close()
+            put(finished)
+
+    Thread(target=pump, name="hintify-stream", daemon=True).start()
+    done = False
+    try:
+        while True:
+            item = await pending.get()
+            if item is finished:
+                done = True
+                return
+            if isinstance(item, Exception):
+                done = True
+                raise item
+            yield item
+    finally:
+        stop.set()
+        if not done and on_cancel is not None:
+            try:
+                on_cancel()
+            except Exception as e:
+                if DEBUG:
+                    print(f"[LLM] Closing the abandoned stream failed: {e}")
+
+
+GEMINI_API_BASE = os.getenv("HINTIFY_GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+GEMINI_FALLBACK_MODEL = "gemini-1.5-flash"
+
+
+class GeminiClient:
+    """Gemini REST client with a pooled keep-alive session, retries and remembered fallbacks.
+
+    429/5xx responses and dropped connections are retried with bounded exponential
+    backoff (honouring Retry-After). When a model answers 404/403 and the fallback
+    model works, the substitution is remembered so later calls go straight to it.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_base=None, timeout=60, connect_timeout=5, max_retries=3, backoff=0.5, max_backoff=8.0, fallback_model=GEMINI_FALLBACK_MODEL):
+        self.api_base = api_base
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.fallback_model = fallback_model
+        self.latency = LatencyStats()
+        self.requests = 0
+        self.retries = 0
+        self.fallbacks = {}  # requested model -> model that actually answered
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, model, stream):
+        base = (self.api_base or GEMINI_API_BASE).rstrip("/")
+        if stream:
+            return f"{base}/models/{model}:streamGenerateContent?alt=sse"
+        return f"{base}/models/{model}:generateContent"
+
+    def _retry_delay(self, attempt, resp=None):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self.backoff * (2 ** attempt)
+        return min(self.max_backoff, max(0.0, delay))
+
+    def _post(self, model, prompt, api_key, stream, max_tokens=None):
+        """POST with retries; returns the final response (the caller closes it)."""
+        headers = {"Content-Type": "application/json", "X-goog-api-key": api_key}
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        if max_tokens:
+            payload["generationConfig"] = {"maxOutputTokens": int(max_tokens)}
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                resp = self.session.post(self._url(model, stream), headers=headers, json=payload, stream=stream, timeout=(self.connect_timeout, self.timeout))
+            except requests.ConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                resp = None
+            if resp is not None and (resp.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries):
+                return resp
+            delay = self._retry_delay(attempt, resp)
+            if resp is not None:
+                resp.close()
+            attempt += 1
+            self.retries += 1
+            if DEBUG:
+                status = resp.status_code if resp is not None else "connection error"
+                print(f"[LLM] Gemini {status}; retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def _open(self, prompt, model, api_key, stream, max_tokens=None):
+        """Send the request to the remembered model, falling back once on 404/403."""
+        model = self.fallbacks.get(model, model)
+        started = time.perf_counter()
+        resp = self._post(model, prompt, api_key, stream, max_tokens)
+        if resp.status_code in (403, 404) and self.fallback_model and model != self.fallback_model:
+            if DEBUG:
+                print(f"[LLM] Falling back to Gemini REST model='{self.fallback_model}' (status={resp.status_code})")
+            resp.close()
+            fallback = self._post(self.fallback_model, prompt, api_key, stream, max_tokens)
+            if fallback.status_code == 200:
+                self.fallbacks[model] = self.fallback_model
+            resp = fallback
+        if resp.status_code != 200:
+            self.latency.add(time.perf_counter() - started)
+            text = resp.text.strip()
+            resp.close()
+            raise requests.HTTPError(f"Gemini HTTP {resp.status_code}: {text}", response=resp)
+        return resp, started
+
+    def generate(self, prompt, model, api_key, max_tokens=None):
+        resp, started = self._open(prompt, model, api_key, stream=False, max_tokens=max_tokens)
+        try:
+            data = resp.json()
+            return drop_truncated_line(_gemini_text_from_payload(data, sep="\n"), _gemini_truncated(data)).strip()
+        finally:
+            resp.close()
+            self.latency.add(time.perf_counter() - started)
+            if DEBUG:
+                print(f"[LLM] Gemini took {(time.perf_counter() - started) * 1000:.0f}ms ({self.summary()})")
+
+    def generate_stream(self, prompt, model, api_key, max_tokens=None):
+        """Yield text chunks from streamGenerateContent (SSE)."""
+        resp, started = self._open(prompt, model, api_key, stream=True, max_tokens=max_tokens)
+        hold, truncated = LineHold(), False
+        try:
+            for raw in resp.iter_lines(decode_unicode=True):
+                if not raw or not raw.startswith("data:"):
+                    continue
+                data = json.loads(raw[5:].strip() or "{}")
+                truncated = truncated or _gemini_truncated(data)
+                chunk = hold.feed(_gemini_text_from_payload(data))
+                if chunk:
+                    yield chunk
+            tail = hold.finish(truncated)
+            if tail:
+                yield tail
+        finally:
+            resp.close()
+            self.latency.add(time.perf_counter() - started)
+            if DEBUG:
+                print(f"[LLM] Gemini stream took {(time.perf_counter() - started) * 1000:.0f}ms ({self.summary()})")
+
+    def summary(self):
+        return f"requests={self.requests} retries={self.retries} fallbacks={len(self.fallbacks)} {self.latency.summary()}"
+
+
+_gemini_client = None
+
+
+def get_gemini_client():
+    global _gemini_client
+    if _gemini_client is None:
+        _gemini_client = GeminiClient()
+    return _gemini_client
+
+
+def _gemini_truncated(data):
+    candidates = data.get("candidates") or []
+    return bool(candidates) and (candidates[0] or {}).get("finishReason") == "MAX_TOKENS"
+
+
+def _gemini_text_from_payload(data, sep=""):
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = ((candidates[0] or {}).get("content") or {}).get("parts") or []
+    texts = [p.get("text") for p in parts if isinstance(p.get("text"), str)]
+    if sep:
+        texts = [t.strip() for t in texts if t.strip()]
+    return sep.join(texts)
+
+
+def query_with_gemini(prompt, model, api_key, max_tokens=None):
+    """Call Gemini via REST API, with fallback to gemini-1.5-flash if needed."""
+    try:
+        if DEBUG:
+            print(f"[LLM] Calling Gemini REST model='{model}' (len(prompt)={len(prompt)})")
+        return get_gemini_client().generate(prompt, model, api_key, max_tokens) or "[LLM Error] Empty response from Gemini"
+    except requests.Timeout:
+        return "[LLM Error] Gemini request timed out. Try again later."
+    except Exception as e:
+        return f"[LLM Error] {e}"
+
+
+def stream_with_gemini(prompt, model, api_key, max_tokens=None):
+    """Stream Gemini output via streamGenerateContent (SSE), yielding text chunks."""
+    try:
+        if DEBUG:
+            print(f"[LLM] Streaming Gemini REST model='{model}' (len(prompt)={len(prompt)})")
+        yield from get_gemini_client().generate_stream(prompt, model, api_key, max_tokens)
+    except requests.HTTPError as e:
+        yield f"[LLM Error] {e}"
+    except requests.Timeout:
+        yield "\n[LLM Error] Gemini request timed out. Try again later."
+    except Exception as e:
+        yield f"\n[LLM Error] {e}"
+
+
+def astream_with_gemini(prompt, model, api_key, max_tokens=None):
+    """asyncio variant of stream_with_gemini (the retrying client runs on a worker thread)."""
+    return iterate_in_thread(stream_with_gemini(prompt, model, api_key, max_tokens))
+
+
+class HintRequest:
+    """Prompt, provider/model choice and cache handling for one question.
+
+    Shared by generate_hints (blocking) and generate_hints_async (pipeline) so both
+    paths pick the same provider and read/write the same cache entries.
+    """
+
+    def __init__(self, text, qtype, difficulty, args, cfg=None):
+        self.text = text
+        self.cfg = cfg = cfg if cfg is not None else load_config()
+        with trace_span("prompt"):
+            self.route = route_question(text, qtype, difficulty, cfg)
+            self.system = self.route.system
+            self.user_prompt = build_user_prompt(text, qtype, difficulty)
+            self.prompt = build_prompt(text, qtype, difficulty, system=self.system)
+        self.options = {"num_predict": int(self.route.num_predict)} if self.route.num_predict else None
+        self.ollama_model = self.route.model or cfg.get("ollama_model") or os.getenv("HINTIFY_OLLAMA_MODEL") or args.ollama_model
+        self.gemini_model = cfg.get("gemini_model") or os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+        self.gemini_key = get_gemini_api_key()
+        self.keep_alive = cfg.get("ollama_keep_alive")
+        self.cache = get_hint_cache(cfg)
+        self.strategy = (getattr(args, "provider_strategy", None) or cfg.get("provider_strategy") or "single").lower()
+        self.provider = None
+        self.model = None
+        self.cache_hit = False
+        self.started = time.perf_counter()
+        if DEBUG:
+            print(f"[Flow] Provider='ollama', qtype='{qtype}', difficulty='{difficulty}' {self.route}")
+
+    def _cached(self, provider, model):
+        if self.cache is None:
+            return None
+        hit = self.cache.get(hint_cache_key(self.text, provider, model, self.route.cache_tag))
+        if DEBUG:
+            print(f"[Cache] {'hit' if hit is not None else 'miss'} provider='{provider}' model='{model}' ({self.cache.summary()})")
+        if hit is not None:
+            self.provider, self.model, self.cache_hit = provider, model, True
+        return hit
+
+    def _use(self, provider, model):
+        self.provider, self.model = provider, model
+        return None
+
+    def resolve(self):
+        """Pick the provider and model; may probe the Ollama server and pull the model.
+
+        Returns a final response (cache hit or [Setup] message), or None when the
+        chosen provider still has to be called.
+        """
+        with trace_span("resolve") as attrs:
+            response = self._resolve()
+            attrs.update(provider=self.provider, model=self.model, cache_hit=self.cache_hit)
+        return response
+
+    def _resolve(self):
+        if self.route.local_response is not None:
+            self.provider = "local"
+            return self.route.local_response
+        provider = (self.cfg.get("provider") or "ollama").lower()
+        if provider == "ollama" and have_ollama():
+            hit = self._cached("ollama", self.ollama_model)
+            if hit is not None:
+                return hit
+            if not ensure_ollama_model(self.ollama_model):
+                return "[Setup] Failed to pull required Ollama model. Please try again."
+            return self._use("ollama", self.ollama_model)
+        if provider == "gemini":
+            if not self.gemini_key:
+                return "[Setup] GEMINI_API_KEY not set. Export GEMINI_API_KEY to use Gemini."
+            return self._cached("gemini", self.gemini_model) or self._use("gemini", self.gemini_model)
+
+        # Auto fallback: if configured provider unavailable
+        if have_ollama():
+            hit = self._cached("ollama", self.ollama_model)
+            if hit is not None:
+                return hit
+            if ensure_ollama_model(self.ollama_model):
+                return self._use("ollama", self.ollama_model)
+        if self.gemini_key:
+            return self._cached("gemini", self.gemini_model) or self._use("gemini", self.gemini_model)
+        return "[Setup] No LLM provider available. Install Ollama or set GEMINI_API_KEY."
+
+    def resolve_provider(self, provider):
+        """resolve() restricted to one provider (the second contender of a race/hedge)."""
+        if provider == "ollama":
+            if not have_ollama():
+                return "[Setup] Ollama is not available."
+            hit = self._cached("ollama", self.ollama_model)
+            if hit is not None:
+                return hit
+            if not ensure_ollama_model(self.ollama_model):
+                return "[Setup] Failed to pull required Ollama model. Please try again."
+            return self._use("ollama", self.ollama_model)
+        if not self.gemini_key:
+            return "[Setup] GEMINI_API_KEY not set. Export GEMINI_API_KEY to use Gemini."
+        return self._cached("gemini", self.gemini_model) or self._use("gemini", self.gemini_model)
+
+    def complete(self):
+        """Blocking, non-streamed call to the resolved provider; returns the raw text."""
+        if self.provider == "ollama":
+            return query_with_ollama(self.user_prompt, self.model, keep_alive=self.keep_alive, system=self.system, options=self.options)
+        return query_with_gemini(self.prompt, self.model, self.gemini_key, self.route.num_predict)
+
+    def chunks(self):
+        if self.provider == "ollama":
+            return stream_with_ollama(self.user_prompt, self.model, keep_alive=self.keep_alive, system=self.system, options=self.options)
+        return stream_with_gemini(self.prompt, self.model, self.gemini_key, self.route.num_predict)
+
+    def achunks(self):
+        if self.provider == "ollama":
+            return astream_with_ollama(self.user_prompt, self.model, keep_alive=self.keep_alive, system=self.system, options=self.options)
+        return astream_with_gemini(self.prompt, self.model, self.gemini_key, self.route.num_predict)
+
+    def finish(self, response):
+        """Record the request's latency under its routing tier (errors are not counted)."""
+        if "[LLM Error]" not in response and "[Setup]" not in response:
+            tier = "cached" if self.cache_hit else self.route.tier
+            record_route_latency(tier, time.perf_counter() - self.started)
+            if DEBUG:
+                print(f"[Route] {tier} answered in {(time.perf_counter() - self.started) * 1000:.0f}ms ({route_summary()})")
+        return response
+
+    def remember(self, response):
+        if self.cache is not None and "[LLM Error]" not in response and "[Setup]" not in response:
+            self.cache.put(hint_cache_key(self.text, self.provider, self.model, self.route.cache_tag), response)
+        return self.finish(response)
+
+
+def _trace_first_chunk(chunks, started):
+    """Pass chunks through, recording the provider's time to first token."""
+    first = True
+    try:
+        for chunk in chunks:
+            if first:
+                first = False
+                record_span("llm.first_token", time.perf_counter() - started)
+            yield chunk
+    finally:
+        chunks.close()
+
+
+async def _atrace_first_chunk(chunks, started):
+    first = True
+    try:
+        async for chunk in chunks:
+            if first:
+                first = False
+                record_span("llm.first_token", time.perf_counter() - started)
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+def _replay_cached(request, response, on_line):
+    if request.cache_hit and on_line is not None:
+        for line in response.splitlines():
+            on_line(line)
+    return request.finish(response)
+
+
+def generate_hints(text, qtype, difficulty, args, on_line=None):
+    """Generate formatted hints for OCR text.
+
+    When on_line is given, the provider response is streamed and on_line(line) is
+    called for each finished hint line as soon as it is available.
+    """
+    request = HintRequest(text, qtype, difficulty, args)
+    early = request.resolve()
+    if early is not None:
+        return _replay_cached(request, early, on_line)
+    started = time.perf_counter()
+    if on_line is not None:
+        response = stream_and_format_hints(_trace_first_chunk(request.chunks(), started), on_line)
+        record_span("llm", time.perf_counter() - started, provider=request.provider, model=request.model)
+    else:
+        raw = request.complete()
+        record_span("llm", time.perf_counter() - started, provider=request.provider, model=request.model)
+        with trace_span("sanitize"):
+            response = sanitize_and_format_hints(raw)
+    return request.remember(response)
+
+
+async def generate_hints_async(text, qtype, difficulty, args, on_line=None):
+    """asyncio counterpart of generate_hints used by the pipeline.
+
+    The provider stream is consumed natively on the event loop, so cancelling the
+    task drops the HTTP connection (or kills `ollama run`) right away instead of
+    waiting for the next line or a timeout. With provider_strategy 'race' or
+    'hedge' a second provider is queried too (see race_providers).
+    """
+    on_line = on_line or (lambda line: None)
+    request = HintRequest(text, qtype, difficulty, args)
+    early = await asyncio.to_thread(request.resolve)
+    if early is not None:
+        return _replay_cached(request, early, on_line)
+
+    if request.strategy in ("race", "hedge"):
+        other = HintRequest(text, qtype, difficulty, args, cfg=request.cfg)
+        other_provider = "gemini" if request.provider == "ollama" else "ollama"
+        early = await asyncio.to_thread(other.resolve_provider, other_provider)
+        if other.cache_hit:
+            return _replay_cached(other, early, on_line)
+        if early is None:
+            started = time.perf_counter()
+            response = await race_providers(request, other, on_line, hedge=request.strategy == "hedge")
+            record_span("llm", time.perf_counter() - started, strategy=request.strategy)
+            return response
+        if DEBUG:
+            print(f"[Race] {other_provider} unavailable ({early}); using {request.provider} only")
+
+    started = time.perf_counter()
+    first_line = []
+
+    def timed_on_line(line):
+        if not first_line:
+            first_line.append(True)
+            provider_latency[request.provider].add(time.perf_counter() - started)
+        on_line(line)
+
+    response = await astream_and_format_hints(_atrace_first_chunk(request.achunks(), started), timed_on_line)
+    record_span("llm", time.perf_counter() - started, provider=request.provider, model=request.model)
+    return request.remember(response)
+
+
+# Time from request start to the first hint line, per provider; drives the hedge delay
+provider_latency = {"ollama": LatencyStats(), "gemini": LatencyStats()}
+race_stats = {"races": 0, "hedged": 0, "ollama_wins": 0, "gemini_wins": 0, "fallbacks": 0, "saved_s": 0.0}
+HEDGE_DEFAULT_DELAY = 2.0  # seconds, until the primary provider has enough latency samples
+HEDGE_MIN_SAMPLES = 5
+
+
+class ProviderFailed(Exception):
+    """A raced provider returned an error instead of hints."""
+
+
+async def _fail_on_error(chunks):
+    try:
+        async for chunk in chunks:
+            if "[LLM Error]" in chunk or "[Setup]" in chunk:
+                raise ProviderFailed(chunk.strip())
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+def hedge_delay_for(provider, cfg):
+    """Seconds to wait for `provider` before hedging: configured, else its p95 first-line latency."""
+    if cfg.get("hedge_delay") is not None:
+        return float(cfg["hedge_delay"])
+    stats = provider_latency[provider]
+    if stats.count < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return stats.percentile(95)
+
+
+async def race_providers(primary, secondary, on_line, hedge=False):
+    """Stream the first provider to produce a hint line; cancel the other.
+
+    race:  both providers start immediately.
+    hedge: the secondary starts only if the primary has not produced a line within
+           hedge_delay_for(primary) seconds (or failed before that).
+    Only hints taken from model output claim the win (padding from finish() does
+    not). A provider that errors never wins; if the winner fails after streaming
+    some lines, the other provider is asked again and its lines continue from
+    there. If both fail the primary's error is returned. Only an answer whose lines
+    are the ones shown is cached.
+    """
+    started = time.perf_counter()
+    tasks = {}
+    formatters = {}
+    winner = []
+    shown = []  # lines already passed to on_line
+    claimed = asyncio.Event()
+
+    def emit(request, line):
+        formatter = formatters[request]
+        if not winner:
+            if line not in formatter.lines[:formatter.accepted]:
+                return  # padding or an error from a provider without hints does not win
+            winner.append(request)
+            claimed.set()
+            provider_latency[request.provider].add(time.perf_counter() - started)
+            for other, task in tasks.items():
+                if other is not request:
+                    task.cancel()
+        if winner[0] is request and formatter.lines.index(line) >= len(shown):
+            shown.append(line)
+            on_line(line)
+
+    def contend(request):
+        chunks = _fail_on_error(request.achunks())
+        formatters[request] = HintStreamFormatter()
+        tasks[request] = asyncio.ensure_future(
+            astream_and_format_hints(chunks, lambda line: emit(request, line), formatters[request]))
+
+    def failed(request):
+        task = tasks.get(request)
+        return task is None or task.cancelled() or task.exception() is not None
+
+    race_stats["races"] += 1
+    fallback = None
+    try:
+        contend(primary)
+        secondary_started = 0.0
+        if hedge:
+            delay = hedge_delay_for(primary.provider, primary.cfg)
+            waiter = asyncio.ensure_future(claimed.wait())
+            await asyncio.wait({waiter, tasks[primary]}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+        if not winner:
+            secondary_started = time.perf_counter() - started
+            if hedge:
+                race_stats["hedged"] += 1
+            contend(secondary)
+        await asyncio.wait(list(tasks.values()))
+        if winner and failed(winner[0]):
+            # The winner broke off mid-answer; the other provider picks up after the lines already shown
+            fallback = secondary if winner[0] is primary else primary
+            race_stats["fallbacks"] += 1
+            colored_print(f"[Race] {winner[0].provider} failed after {len(shown)} lines "
+                          f"({tasks[winner[0]].exception()}); falling back to {fallback.provider}", Colors.WARNING)
+            winner[0] = fallback
+            contend(fallback)
+            await asyncio.wait([tasks[fallback]])
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+    if not winner or failed(winner[0]):
+        done = [r for r in (primary, secondary) if not failed(r)]
+        if done and not shown:
+            response = tasks[done[0]].result()  # finished without a model hint (padding only)
+        else:
+            error = tasks[primary].exception() if not tasks[primary].cancelled() else None
+            response = sanitize_and_format_hints(str(error) if error else "")
+        for line in response.splitlines():
+            on_line(line)
+        return response
+
+    request = winner[0]
+    elapsed = time.perf_counter() - started
+    race_stats[f"{request.provider}_wins"] += 1
+    loser = secondary if request is primary else primary
+    mode = "Hedge" if hedge else "Race"
+    if fallback is not None:
+        message = f"[{mode}] {request.provider} answered after {elapsed:.2f}s in place of {loser.provider}"
+    elif loser not in tasks:
+        message = f"[{mode}] {request.provider} answered in {elapsed:.2f}s; no hedge needed"
+    else:
+        message = f"[{mode}] {request.provider} won after {elapsed:.2f}s ({loser.provider} cancelled)"
+        typical = provider_latency[loser.provider]
+        if request is secondary and typical.count:
+            # The loser never answered; estimate what waiting for it would have cost
+            saved = max(0.0, typical.percentile(50) - elapsed)
+            race_stats["saved_s"] += saved
+            message += f", ~{saved:.2f}s saved vs {loser.provider}'s p50"
+        if hedge:
+            message += f"; hedged after {secondary_started:.2f}s"
+    colored_print(message, Colors.OKCYAN)
+    response = tasks[request].result()
+    if response.splitlines()[:len(shown)] != shown:
+        # After a fallback the lines on screen came from both providers; cache neither answer
+        return request.finish(response)
+    return request.remember(response)
+
+
+# -------------------------------
+# 4b. Hint Cache
+# -------------------------------
+
+# Bump when build_prompt or the sanitizer changes so stale cached hints are not reused
+PROMPT_VERSION = "3"
+HINT_CACHE_PATH = os.path.expanduser("~/.hintify_hint_cache.json")
+
+# OCR variants of one character; everything else inside the text (' | ! _ . , ...) can be maths
+_OCR_QUOTES = str.maketrans({"‘": "'", "’": "'", "´": "'", "`": "'", "“": '"', "”": '"', "•": " ", "·": " "})
+# Sentence punctuation and stray quotes around the whole text do not change the question
+_EDGE_NOISE_RE = re.compile(r"""^[\s.,;:?'"~-]+|[\s.,;:?'"~]+$""")
+_SPACE_AROUND_SYMBOL_RE = re.compile(r"\s*([^\w\s])\s*")
+
+
+def normalize_question_text(text):
+    """Canonical form of OCR text: case, whitespace, quote styles and punctuation at the ends are ignored."""
+    text = unicodedata.normalize("NFKC", text or "").lower().translate(_OCR_QUOTES)
+    text = re.sub(r"\s+", " ", text)
+    text = _EDGE_NOISE_RE.sub("", text)
+    return _SPACE_AROUND_SYMBOL_RE.sub(r"\1", text)
+
+
+def question_key(text):
+    """Key shared by requests asking the same question (normalized OCR text)."""
+    return "text:" + hashlib.sha256(normalize_question_text(text).encode("utf-8")).hexdigest()
+
+
+def hint_settings_key(cfg, args):
+    """Fingerprint of everything that can pick the provider, model or prompt for a question."""
+    raw = json.dumps([cfg, getattr(args, "ollama_model", None), getattr(args, "provider_strategy", None),
+                      getattr(args, "server", None), os.getenv("HINTIFY_OLLAMA_MODEL"), os.getenv("GEMINI_MODEL")],
+                     sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def hint_cache_key(text, provider, model, route_tag=""):
+    """Key of one question's hints for a provider/model and routing (Route.cache_tag: template and output cap)."""
+    raw = "\x00".join([PROMPT_VERSION, provider or "", model or "", route_tag or "", normalize_question_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class HintCache:
+    """On-disk LRU/TTL cache of formatted hints, keyed by hint_cache_key().
+
+    Writes are batched: a put schedules one file write for everything stored in
+    the next SAVE_DELAY seconds, serialized outside the lock lookups take.
+    """
+
+    SAVE_DELAY = 2.0
+
+    def __init__(self, path=HINT_CACHE_PATH, max_entries=256, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = None
+        self._dirty = False
+        self._save_timer = None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.loads(f.read() or "{}")
+                # Stored least- to most-recently used
+                for key, entry in sorted(data.items(), key=lambda kv: kv[1].get("used", 0)):
+                    self._entries[key] = entry
+        except Exception as e:
+            colored_print(f"[Cache] Ignoring unreadable hint cache: {e}", Colors.WARNING)
+        self._evict()
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds and now - entry.get("created", 0) > self.ttl_seconds
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            del self._entries[key]
+            self.evictions += 1
+            self._dirty = True
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            self._dirty = True
+
+    def get(self, key):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or self._expired(entry, now):
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                    self._dirty = True
+                self.misses += 1
+                return None
+            entry["used"] = now
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self.hits += 1
+            return entry["response"]
+
+    def put(self, key, response):
+        with self._lock:
+            self._load()
+            now = time.time()
+            self._entries[key] = {"response": response, "created": now, "used": now}
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self._evict()
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._save_timer = None
+            if self._entries is None or not self._dirty:
+                return
+            snapshot = OrderedDict((k, dict(e)) for k, e in self._entries.items())
+            self._dirty = False
+        self._save(snapshot)
+
+    def _save(self, snapshot):
+        with self._save_lock:
+            try:
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(snapshot))
+                os.replace(tmp, self.path)
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                colored_print(f"[Cache] Failed to save hint cache: {e}", Colors.WARNING)
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        size = len(self._entries) if self._entries is not None else 0
+        return f"hits={self.hits} misses={self.misses} hit_rate={rate:.0f}% entries={size}/{self.max_entries} evictions={self.evictions}"
 
-def detect_difficulty(text):
-    word_count = text.count(" ") + 1
-    if word_count < 15:
-        return "Easy"
-    elif word_count < 40:
-        return "Medium"
-    return "Hard"
+
+_hint_cache = None
+_hint_cache_lock = threading.Lock()
+
+
+def get_hint_cache(cfg):
+    """Shared HintCache, or None when disabled via the 'hint_cache' config key."""
+    global _hint_cache
+    if not cfg.get("hint_cache", True):
+        return None
+    with _hint_cache_lock:
+        if _hint_cache is None:
+            _hint_cache = HintCache(
+                max_entries=cfg.get("hint_cache_size", 256),
+                ttl_seconds=float(cfg.get("hint_cache_ttl_hours", 168)) * 3600,
+            )
+            atexit.register(_hint_cache.flush)
+        return _hint_cache
+
+
+def _on_config_change(new, old):
+    """Drop process-wide objects built from config keys that just changed."""
+    global _ocr_engine, _hint_cache, _ocr_cache
+    def changed(prefix):
+        return any(new.get(k) != old.get(k) for k in set(new) | set(old) if k.startswith(prefix))
+    if changed("ocr_"):
+        # In-flight recognitions keep their engine; the next image builds a new one
+        with _ocr_engine_lock:
+            _ocr_engine = None
+    if changed("ocr_cache"):
+        with _ocr_cache_lock:
+            old_cache, _ocr_cache = _ocr_cache, None
+        if old_cache is not None:
+            old_cache.flush()
+    if changed("hint_cache"):
+        with _hint_cache_lock:
+            old_cache, _hint_cache = _hint_cache, None
+        if old_cache is not None:
+            old_cache.flush()
+    if new.get("ollama_models_ttl") is not None:
+        model_registry.ttl = new["ollama_models_ttl"]
+
+
+config_store.subscribe(_on_config_change)
 
 
 # -------------------------------
-# 4. Prompt + LLM Providers (Ollama only)
+# 5. Main Clipboard Monitor (capture → OCR → LLM pipeline)
 # -------------------------------
 
-def build_prompt(text, qtype, difficulty):
-    return f"""
-You are SnapAssist AI, a study buddy for students.
+class HintEvent:
+    """Streaming update placed on the results queue: kind is 'start', 'line', 'part' or 'done'.
 
-The following text was extracted from a screenshot:
-{text}
+    'part' carries one finished question (its `index` in the screenshot) of a
+    multi-question job; 'done' always carries the complete response.
 
-Classification:
-- Type: {qtype}
-- Difficulty: {difficulty}
+    Plain strings on the queue are still complete (non-streamed) responses.
+    """
 
-Your role:
-- Provide ONLY hints, NEVER the exact answer or final numeric/option.
-- Do NOT solve the question fully.
-- Do NOT mention which option is correct.
-- Do NOT provide the final numeric value, simplified expression, or boxed result.
-- Instead, give guiding clues that push the student to think.
+    def __init__(self, kind, text="", job_id=None, index=None):
+        self.kind = kind
+        self.text = text
+        self.job_id = job_id
+        self.index = index
+        self.created = time.perf_counter()
 
-Response format:
-Always output between 3 to 5 hints in this style:
-Hint 1: ...
-Hint 2: ...
-Hint 3: ...
-(Hint 4 and Hint 5 only if needed)
 
-Guidelines for hints:
-- Focus on relevant formulae, rules, and methods.
-- Use progressive layers: concept → formula → setup → approach → final nudge.
-- Each hint should guide without completing the solution.
-- Keep hints concise for faster responses.
+class HintText(str):
+    """A complete (non-streamed) response on the results queue, tagged with its job."""
 
-End with an encouragement such as:
-“Now try completing the final step on your own.”
-or
-“Work carefully through the last step to see which option fits.”
+    def __new__(cls, text, job_id=None):
+        obj = super().__new__(cls, text)
+        obj.job_id = job_id
+        obj.created = time.perf_counter()
+        return obj
 
-If the text is not a valid question, reply only:
-⚠️ This does not appear to be a question.
-"""
 
+def format_question_section(label, text, hints):
+    """One question's block in a multi-question response: a header quoting the question, then its hints."""
+    question = text if len(text) <= 80 else text[:77].rstrip() + "..."
+    return f"Question {label}: {question}\n{hints}"
 
-def have_ollama():
-    return shutil.which("ollama") is not None
 
+def generate_question_hints(text, qtype, difficulty, parts, args):
+    """Blocking hints for a capture classified by classify_capture.
 
-def ensure_ollama_model(model):
-    try:
-        result = subprocess.run(["ollama", "list"], capture_output=True, text=True, check=True)
-        if model in (result.stdout or ""):
-            return True
-        print(f"[Setup] Pulling Ollama model '{model}'...")
-        subprocess.run(["ollama", "pull", model], check=True)
-        return True
-    except Exception as e:
-        print(f"[Setup] Could not ensure Ollama model '{model}': {e}")
-        return False
+    Returns (response, questions). A multi-question capture is hinted one question at
+    a time and its response joins the same sections HintPipeline._run_parts shows;
+    questions holds each one's label, text, type, difficulty and hints ([] for one question).
+    """
+    if not parts:
+        return generate_hints(text, qtype, difficulty, args), []
+    questions = []
+    for label, part, part_qtype, part_difficulty in parts:
+        try:
+            hints = generate_hints(part, part_qtype, part_difficulty, args)
+        except Exception as e:
+            # One failing question must not take the others down with it
+            hints = f"[LLM Error] {e}"
+        questions.append({"label": label, "text": part, "qtype": part_qtype, "difficulty": part_difficulty, "hints": hints})
+    response = "\n\n".join(format_question_section(q["label"], q["text"], q["hints"]) for q in questions)
+    return response, questions
+
+
+def record_render(item):
+    """Trace the time from a final result being queued until the UI has shown it."""
+    job_id = getattr(item, "job_id", None)
+    if job_id is not None:
+        tracer.record_job_span(job_id, "render", time.perf_counter() - item.created)
+
+
+class JobCancelled(Exception):
+    """Raised inside a pipeline stage when its job was superseded by a newer screenshot."""
+
+
+class HintJob:
+    """One screenshot (or text) moving through the pipeline."""
+
+    def __init__(self, job_id, image_bytes=None, text=None, trace=None, fingerprint=None, settings=None):
+        self.job_id = job_id
+        self.image_bytes = image_bytes
+        self.fingerprint = fingerprint
+        self.settings = settings  # hint_settings_key() when the job was submitted
+        self.text = text
+        self.qtype = None
+        self.difficulty = None
+        self.parts = None  # [(label, text, qtype, difficulty)] when the screenshot holds several questions
+        self.created = time.time()
+        self.trace = trace or tracer.start()
+        self.trace.job_id = job_id
+        self.cancelled = threading.Event()
+        self._on_cancel = []
+        self._cancel_lock = threading.Lock()
+
+    def cancel(self):
+        with self._cancel_lock:
+            self.cancelled.set()
+            callbacks, self._on_cancel = self._on_cancel, []
+        self.trace.finish("cancelled")
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Run callback() when the job is cancelled (immediately if it already is)."""
+        with self._cancel_lock:
+            if not self.cancelled.is_set():
+                self._on_cancel.append(callback)
+                return
+        callback()
 
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled(self.job_id)
 
-def query_with_ollama(prompt, model):
-    if not have_ollama():
-        return "[Setup] Ollama CLI not found. Install from https://ollama.com/download and ensure 'ollama' is in your PATH."
-    ensure_ollama_model(model)
-    try:
-        if DEBUG:
-            print(f"[LLM] Calling Ollama model='{model}' (len(prompt)={len(prompt)})")
-        result = subprocess.run(["ollama", "run", model], input=prompt, text=True, capture_output=True, check=True, timeout=120)
-        return result.stdout.strip()
-    except subprocess.TimeoutExpired:
-        return "[LLM Error] Ollama request timed out. Try a smaller prompt or different model."
-    except subprocess.CalledProcessError as e:
-        return f"[LLM Error] {e.stderr or str(e)}"
 
+class ResultQueue(queue.Queue):
+    """Results queue that also wakes listeners (e.g. the Tk loop) on every put."""
 
-def query_with_gemini(prompt, model, api_key):
-    """Call Gemini via REST API, with fallback to gemini-1.5-flash if needed."""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {"Content-Type": "application/json", "X-goog-api-key": api_key}
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    def __init__(self):
+        super().__init__()
+        self.listeners = []
 
-    try:
-        if DEBUG:
-            print(f"[LLM] Calling Gemini REST model='{model}' (len(prompt)={len(prompt)})")
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-        if resp.status_code == 404 or resp.status_code == 403:
-            # Not found / not allowed -> fallback
-            fallback_model = "gemini-1.5-flash"
-            if model != fallback_model:
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        for listener in list(self.listeners):
+            try:
+                listener()
+            except Exception as e:
+                # A listener failing (e.g. the window already closed) must not lose the result
                 if DEBUG:
-                    print(f"[LLM] Falling back to Gemini REST model='{fallback_model}' (status={resp.status_code})")
-                return query_with_gemini(prompt, fallback_model, api_key)
-        if resp.status_code != 200:
-            return f"[LLM Error] Gemini HTTP {resp.status_code}: {resp.text.strip()}"
-        data = resp.json()
-        candidates = data.get("candidates") or []
-        if not candidates:
-            return "[LLM Error] Empty response from Gemini"
-        parts = ((candidates[0] or {}).get("content") or {}).get("parts") or []
-        texts = []
-        for part in parts:
-            t = part.get("text")
-            if isinstance(t, str) and t.strip():
-                texts.append(t.strip())
-        text = "\n".join(texts).strip()
-        return text or "[LLM Error] Empty response from Gemini"
-    except requests.Timeout:
-        return "[LLM Error] Gemini request timed out. Try again later."
-    except Exception as e:
-        return f"[LLM Error] {e}"
+                    print(f"[Pipeline] Result listener failed: {e}")
 
 
-def generate_hints(text, qtype, difficulty, args):
-    prompt = build_prompt(text, qtype, difficulty)
-    cfg = load_config()
-    provider = (cfg.get("provider") or "ollama").lower()
-    ollama_model = cfg.get("ollama_model") or os.getenv("HINTIFY_OLLAMA_MODEL") or args.ollama_model
-    gem_model = cfg.get("gemini_model") or os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-    gem_key = os.getenv("GEMINI_API_KEY") or (keyring.get_password("hintify", "gemini_api_key") or None)
+class RecentRequests:
+    """In-memory LRU of finished results, keyed by image fingerprint and by question text.
 
-    if DEBUG:
-        print(f"[Flow] Provider='ollama', qtype='{qtype}', difficulty='{difficulty}'")
-
-    if provider == "ollama" and have_ollama():
-        ok = ensure_ollama_model(ollama_model)
-        if not ok:
-            return "[Setup] Failed to pull required Ollama model. Please try again."
-        raw = query_with_ollama(prompt, ollama_model)
-        return sanitize_and_format_hints(raw)
-    if provider == "gemini":
-        if not gem_key:
-            return "[Setup] GEMINI_API_KEY not set. Export GEMINI_API_KEY to use Gemini."
-        raw = query_with_gemini(prompt, gem_model, gem_key)
-        return sanitize_and_format_hints(raw)
+    Keys also carry the job's hint_settings_key(), so switching provider or model
+    does not serve answers generated under the old settings.
+    """
 
-    # Auto fallback: if configured provider unavailable
-    if have_ollama():
-        ok = ensure_ollama_model(ollama_model)
-        if ok:
-            raw = query_with_ollama(prompt, ollama_model)
-            return sanitize_and_format_hints(raw)
-    if gem_key:
-        raw = query_with_gemini(prompt, gem_model, gem_key)
-        return sanitize_and_format_hints(raw)
-    return "[Setup] No LLM provider available. Install Ollama or set GEMINI_API_KEY."
+    def __init__(self, max_entries=64, ttl_seconds=300):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
+    def get(self, key):
+        if not self.ttl_seconds or key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created"] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, keys, **result):
+        if not self.ttl_seconds:
+            return
+        entry = dict(result, created=time.time())
+        with self._lock:
+            for key in keys:
+                if key is not None:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SharedGeneration:
+    """One LLM generation followed by every pipeline job asking the same question.
+
+    Lines produced so far are replayed to jobs that attach late. When the last
+    follower goes away (its job was superseded) the generation keeps running for
+    a grace period, so a re-capture of the same question can still adopt it; the
+    pipeline releases it sooner once the next job turns out to ask something else.
+    """
 
-# -------------------------------
-# 5. Main Clipboard Monitor
-# -------------------------------
+    def __init__(self, key):
+        self.key = key
+        self.lines = []
+        self.listeners = []
+        self.traces = []  # traces of the jobs following, in the order they attached
+        self.task = None
+        self.released = False
+        self._release_timer = None
+
+    def emit(self, line):
+        self.lines.append(line)
+        for listener in list(self.listeners):
+            listener(line)
+
+    def add(self, name, seconds, **attrs):
+        """Trace interface for the generation task: spans go to the newest job still following it."""
+        if self.traces:
+            self.traces[-1].add(name, seconds, **attrs)
+        else:
+            tracer.observe(name, seconds)
+
+    async def follow(self, on_line, grace):
+        if self._release_timer is not None:
+            self._release_timer.cancel()
+            self._release_timer = None
+        for line in list(self.lines):
+            on_line(line)
+        trace = _current_trace.get()
+        self.listeners.append(on_line)
+        self.traces.append(trace)
+        try:
+            return await asyncio.shield(self.task)
+        finally:
+            self.listeners.remove(on_line)
+            self.traces.remove(trace)
+            if not self.listeners and not self.task.done():
+                if grace > 0:
+                    self._release_timer = asyncio.get_running_loop().call_later(grace, self.release)
+                else:
+                    self.release()
+
+    def release(self):
+        """Cancel the generation unless a job is following it again."""
+        if self._release_timer is not None:
+            self._release_timer.cancel()
+            self._release_timer = None
+        if not self.listeners:
+            self.released = True
+            self.task.cancel()
+
+
+class HintPipeline:
+    """Staged pipeline: capture poller → OCR worker pool → asyncio LLM stage → results queue.
+
+    Submitting a new screenshot cancels every older job ("latest wins"): stale jobs
+    are dropped at the OCR queue, and the LLM stage runs each job as an asyncio task
+    that is cancelled the moment its job is superseded, closing the provider
+    connection so no more tokens are generated for it. When the OCR queue is full,
+    the oldest (already stale) job is evicted instead of blocking capture.
+
+    Duplicates are not recomputed: a screenshot captured again while it is still
+    being processed attaches to its job, one seen recently (by fingerprint or
+    question text) is answered from RecentRequests, and jobs with the same
+    question text follow a single SharedGeneration.
+    """
 
-def monitor_clipboard(args):
-    colored_print("🔍 SnapAssist AI is running... Press Ctrl+C to stop.", Colors.HEADER)
-    last_hash = None
+    def __init__(self, args, ocr_workers=2, queue_size=2):
+        self.args = args
+        self.results = ResultQueue()
+        self.ocr_queue = queue.Queue(maxsize=queue_size)
+        self.ocr_workers = max(1, int(ocr_workers))
+        # Updated from the capture, OCR and event loop threads: only while holding _lock
+        self.stats = {"submitted": 0, "superseded": 0, "dropped": 0, "completed": 0, "coalesced": 0}
+        self.loop = None
+        self.remote = HintServerClient(args.server) if getattr(args, "server", None) else None
+        self.recent = RecentRequests(ttl_seconds=float(load_config().get("recent_requests_ttl", 300) or 0))
+        self._generations = {}  # (settings, question_key) -> SharedGeneration (event loop thread only)
+        self._llm_tasks = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._latest = None
+        self._last_fingerprint = None
+        self._threads = []
+
+    # ---- submission ----
+
+    def submit_image(self, image_bytes, trace=None, fingerprint=None):
+        if fingerprint is not None:
+            with self._lock:
+                live = self._latest
+                if live is not None and live.fingerprint == fingerprint and live.trace.status is None:
+                    # The same screenshot again while it is still being processed
+                    self.stats["coalesced"] += 1
+                    if trace is not None:
+                        trace.discard()
+                    return live
+        job = self._new_job(image_bytes=image_bytes, trace=trace, fingerprint=fingerprint)
+        recent = self.recent.get((job.settings, "image", fingerprint) if fingerprint is not None else None)
+        if recent is not None:
+            with self._lock:
+                self.stats["coalesced"] += 1
+            self._publish_recent(job, recent)
+            return job
+        self._put_latest(self.ocr_queue, job)
+        return job
+
+    def submit_text(self, text):
+        job = self._new_job(text=text)
+        with use_trace(job.trace):
+            self._classify(job)
+        if self.remote is not None:
+            self._put_latest(self.ocr_queue, job)
+        else:
+            self._schedule_llm(job)
+        return job
+
+    def _new_job(self, image_bytes=None, text=None, trace=None, fingerprint=None):
+        with self._lock:
+            self._next_id += 1
+            job = HintJob(self._next_id, image_bytes=image_bytes, text=text, trace=trace, fingerprint=fingerprint,
+                          settings=hint_settings_key(load_config(), self.args))
+            if self._latest is not None and not self._latest.cancelled.is_set():
+                self._latest.cancel()
+                self.stats["superseded"] += 1
+            self._latest = job
+            self.stats["submitted"] += 1
+            return job
+
+    def _put_latest(self, q, job):
+        """Non-blocking put: on a full queue evict the oldest job (backpressure without stalling)."""
+        with self._lock:
+            while True:
+                try:
+                    q.put_nowait(job)
+                    return
+                except queue.Full:
+                    try:
+                        old = q.get_nowait()
+                        old.cancel()
+                        self.stats["dropped"] += 1
+                    except queue.Empty:
+                        pass
+
+    # ---- capture stage ----
+
+    def poll_once(self, force=False):
+        """One capture tick; submits and returns a job if the clipboard image changed."""
+        with self._lock:
+            last = None if force else self._last_fingerprint
+        trace = tracer.start()
+        with use_trace(trace), trace_span("capture"):
+            fingerprint, image_bytes = poll_clipboard_change(last)
+        if not image_bytes:
+            trace.discard()
+            return None
+        with self._lock:
+            if not force and fingerprint == self._last_fingerprint:
+                trace.discard()
+                return None
+            self._last_fingerprint = fingerprint
+        colored_print("📸 Screenshot detected. Processing...", Colors.OKCYAN)
+        if DEBUG:
+            print(f"[Clipboard] {clipboard_stats.summary()}")
+        return self.submit_image(image_bytes, trace=trace, fingerprint=fingerprint)
 
-    while True:
+    def _publish(self, job, response):
+        if getattr(self.args, "stream", False):
+            self.results.put(HintEvent("start", job_id=job.job_id))
+            self.results.put(HintEvent("done", response, job_id=job.job_id))
+        else:
+            self.results.put(HintText(response, job.job_id))
+
+    def _publish_recent(self, job, recent):
+        """Answer a job from a recently finished request for the same screenshot."""
+        job.image_bytes = None
+        job.text, job.qtype, job.difficulty = recent["text"], recent["qtype"], recent["difficulty"]
+        if job.qtype:
+            colored_print(f"🧠 Detected Question Type: {job.qtype}, Difficulty: {job.difficulty}", Colors.OKBLUE)
+        if DEBUG:
+            print(f"[Pipeline] Job {job.job_id} answered from a recent identical request")
+        self._publish(job, recent["response"])
+        with self._lock:
+            self.stats["completed"] += 1
+        job.trace.finish("coalesced")
+
+    def _remember(self, job, response):
+        if "[LLM Error]" not in response and "[Setup]" not in response:
+            keys = [(job.settings, "image", job.fingerprint) if job.fingerprint is not None else None,
+                    (job.settings, question_key(job.text)) if job.text else None]
+            self.recent.put(keys, text=job.text, qtype=job.qtype, difficulty=job.difficulty, response=response)
+
+    # ---- worker stages ----
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self._spawn(self.loop.run_forever, "hintify-llm")
+        for i in range(self.ocr_workers):
+            self._spawn(self._ocr_worker, f"hintify-ocr-{i}")
+        return self
+
+    def _spawn(self, target, name):
+        t = Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _ocr_worker(self):
+        while True:
+            job = self.ocr_queue.get()
+            with use_trace(job.trace):
+                self._ocr_job(job)
+
+    def _ocr_job(self, job):
+        try:
+            job.check()
+            if self.remote is not None:
+                self._run_remote(job)
+                return
+            with trace_span("ocr"):
+                text, words = extract_text_and_words(job.image_bytes)
+            job.image_bytes = None
+            job.check()
+            if not text or text.startswith("[OCR Error]"):
+                colored_print(text or "⚠️ No text found in the screenshot.", Colors.WARNING)
+                job.trace.finish("no_text")
+                return
+            job.text = _clean_ocr_text(text)
+            self._classify(job, words, layout=text)
+            self._schedule_llm(job)
+        except JobCancelled:
+            if DEBUG:
+                print(f"[Pipeline] Job {job.job_id} superseded during OCR")
+        except Exception as e:
+            colored_print(f"[Error] {e}", Colors.FAIL)
+            job.trace.finish("error")
+
+    def _classify(self, job, words=None, layout=None):
+        """Classify the job's text (see classify_capture) and report what was found."""
+        job.qtype, job.difficulty, job.parts = classify_capture(job.text, words, layout)
+        if job.parts:
+            found = ", ".join(f"Q{label}: {qtype}/{difficulty}" for label, _, qtype, difficulty in job.parts)
+            colored_print(f"🧠 Detected {len(job.parts)} questions ({found})", Colors.OKBLUE)
+        else:
+            colored_print(f"🧠 Detected Question Type: {job.qtype}, Difficulty: {job.difficulty}", Colors.OKBLUE)
+
+    def _run_remote(self, job):
+        """Client mode: OCR and hints both come from a `hintify serve` instance."""
+        try:
+            with trace_span("remote", server=self.remote.url) as attrs:
+                if job.image_bytes is not None:
+                    result = self.remote.hints_for_image(job.image_bytes)
+                else:
+                    result = self.remote.hints_for_text(job.text)
+                attrs["server_job_id"] = result.get("job_id")
+        except Exception as e:
+            result = {"error": f"[Setup] {e}"}
+        job.image_bytes = None
+        job.check()
+        if result.get("qtype"):
+            colored_print(f"🧠 Detected Question Type: {result['qtype']}, Difficulty: {result['difficulty']}", Colors.OKBLUE)
+        response = result.get("hints") or result.get("error") or "⚠️ No text found in the screenshot."
+        if result.get("hints") is None and not (result.get("error") or "").startswith("[Setup]"):
+            colored_print(response, Colors.WARNING)
+            job.trace.finish("no_text")
+            return
+        self._publish(job, response)
+        self._remember(job, response)
+        with self._lock:
+            self.stats["completed"] += 1
+        job.trace.finish("ok")
+
+    def _schedule_llm(self, job):
+        """Hand a job to the event loop; cancelling the job cancels its task."""
+        future = asyncio.run_coroutine_threadsafe(self._llm_job(job), self.loop)
+        with self._lock:
+            self._llm_tasks.add(future)
+        future.add_done_callback(self._llm_tasks.discard)
+        job.on_cancel(future.cancel)
+        return future
+
+    async def _llm_job(self, job):
+        _current_trace.set(job.trace)  # tasks run in a copy of the context; no reset needed
         try:
-            image_bytes = get_clipboard_image_bytes()
-            if image_bytes:
-                current_hash = hashlib.md5(image_bytes).hexdigest()
-                if current_hash != last_hash:
-                    last_hash = current_hash
-                    colored_print("📸 Screenshot detected. Processing...", Colors.OKCYAN)
+            job.check()
+            await self._run_llm(job)
+            with self._lock:
+                self.stats["completed"] += 1
+            job.trace.finish("ok")
+        except (JobCancelled, asyncio.CancelledError):
+            job.trace.finish("cancelled")
+            if DEBUG:
+                print(f"[Pipeline] Job {job.job_id} superseded during generation")
+        except Exception as e:
+            colored_print(f"[Error] {e}", Colors.FAIL)
+            job.trace.finish("error")
+        if DEBUG:
+            print(f"[Pipeline] {self.summary()}")
 
-                    text = extract_text_from_image(image_bytes)
-                    if not text:
-                        colored_print("⚠️ No text found in the screenshot.", Colors.WARNING)
-                        time.sleep(args.poll_interval)
-                        continue
+    async def _run_llm(self, job):
+        if job.parts:
+            await self._run_parts(job)
+            return
+        stream = getattr(self.args, "stream", False)
+        started = False
 
-                    qtype = classify_question(text)
-                    difficulty = detect_difficulty(text)
+        def on_line(line):
+            # Must not raise: it also runs inside a generation other jobs may be following
+            nonlocal started
+            if not stream or job.cancelled.is_set():
+                return
+            if not started:
+                self.results.put(HintEvent("start", job_id=job.job_id))
+                started = True
+            self.results.put(HintEvent("line", line, job_id=job.job_id))
+
+        response = await self._hints_for(job.text, job.qtype, job.difficulty, on_line, job)
+        job.check()
+        if stream:
+            if not started:
+                self.results.put(HintEvent("start", job_id=job.job_id))
+            self.results.put(HintEvent("done", response, job_id=job.job_id))
+        else:
+            self.results.put(HintText(response, job.job_id))
+        self._remember(job, response)
 
-                    colored_print(f"🧠 Detected Question Type: {qtype}, Difficulty: {difficulty}", Colors.OKBLUE)
-                    response = generate_hints(text, qtype, difficulty, args)
+    async def _run_parts(self, job):
+        """Hint each question of a worksheet concurrently, publishing each one as it finishes."""
+        sections = [None] * len(job.parts)
+        self.results.put(HintEvent("start", job_id=job.job_id))
 
-                    response_queue.put(response)
+        async def one(index, label, text, qtype, difficulty):
+            try:
+                hints = await self._hints_for(text, qtype, difficulty, lambda line: None, job)
+            except (JobCancelled, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                # One failing question must not take the others (or the final 'done') down with it
+                colored_print(f"[Error] Question {label}: {e}", Colors.FAIL)
+                hints = f"[LLM Error] {e}"
+            sections[index] = format_question_section(label, text, hints)
+            job.check()
+            self.results.put(HintEvent("part", sections[index], job_id=job.job_id, index=index))
+
+        outcomes = await asyncio.gather(*(one(i, *part) for i, part in enumerate(job.parts)), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        response = "\n\n".join(sections)
+        job.check()
+        self.results.put(HintEvent("done", response, job_id=job.job_id))
+        self._remember(job, response)
+
+    async def _hints_for(self, text, qtype, difficulty, on_line, job):
+        recent = self.recent.get((job.settings, question_key(text)))
+        if recent is not None:
+            with self._lock:
+                self.stats["coalesced"] += 1
+            response = recent["response"]
+            for line in response.splitlines():
+                on_line(line)
+            return response
+        return await self._generate(text, qtype, difficulty, on_line, job)
+
+    async def _generate(self, text, qtype, difficulty, on_line, job):
+        """Follow the in-flight generation for this question, starting one if there is none."""
+        key = (job.settings, question_key(text))
+        for other in list(self._generations.values()):
+            if other.key != key and not other.listeners:
+                other.release()  # superseded by this job's (different) question; no need to wait out the grace
+        work = self._generations.get(key)
+        if work is None or work.released or work.task.done():
+            work = self._generations[key] = SharedGeneration(key)
+
+            async def run(work=work):
+                _current_trace.set(work)  # not the starting job's trace: another job may adopt the generation
+                return await generate_hints_async(text, qtype, difficulty, self.args, on_line=work.emit)
+
+            work.task = asyncio.ensure_future(run())
+
+            def forget(task):
+                if self._generations.get(key) is work:
+                    del self._generations[key]
+                if not task.cancelled():
+                    task.exception()  # retrieved here in case no job is following any more
+
+            work.task.add_done_callback(forget)
+        else:
+            with self._lock:
+                self.stats["coalesced"] += 1
+            if DEBUG:
+                print(f"[Pipeline] Job {job.job_id} attached to the in-flight generation for the same question")
+        return await work.follow(on_line, float(load_config().get("coalesce_grace", 2.0) or 0))
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+        text = " ".join(f"{k}={v}" for k, v in stats.items()) + f" ocr_queue={self.ocr_queue.qsize()} llm_active={len(self._llm_tasks)}"
+        if _ocr_engine is not None:
+            text += f" ocr[{_ocr_engine.name}]: {_ocr_engine.latency.summary()}"
+        if _ocr_cache is not None:
+            text += f" ocr_cache: {_ocr_cache.summary()}"
+        if _ollama_client is not None and _ollama_client.requests:
+            text += f" ollama: {_ollama_client.summary()}"
+        if _gemini_client is not None and _gemini_client.requests:
+            text += f" gemini: {_gemini_client.summary()}"
+        if route_latency:
+            text += f" routes: {route_summary()}"
+        if race_stats["races"]:
+            text += " race: " + " ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in race_stats.items())
+        if tracer.stages:
+            text += f" stages: {tracer.summary()}"
+        return text
+
+
+def monitor_clipboard(args, pipeline):
+    """Capture stage: wait for clipboard changes and feed new screenshots into the pipeline."""
+    colored_print("🔍 SnapAssist AI is running... Press Ctrl+C to stop.", Colors.HEADER)
+    watcher = create_clipboard_watcher(getattr(args, "clipboard_watch", "auto"), args.poll_interval)
+    if DEBUG:
+        print(f"[Clipboard] Watching clipboard via {watcher.name}")
 
-            time.sleep(args.poll_interval)
+    while True:
+        try:
+            watcher.wait(30.0)
+            watcher.feedback(pipeline.poll_once() is not None)
+            if not watcher.alive:
+                colored_print(f"[Clipboard] {watcher.name} watcher stopped; falling back to polling.", Colors.WARNING)
+                watcher.close()
+                watcher = AdaptivePoller(args.poll_interval)
         except KeyboardInterrupt:
             colored_print("\n🛑 SnapAssist AI stopped.", Colors.FAIL)
+            if DEBUG:
+                print(f"[Clipboard] {clipboard_stats.summary()}")
+            watcher.close()
             break
         except Exception as e:
             colored_print(f"[Error] {e}", Colors.FAIL)
             time.sleep(max(1.0, args.poll_interval))
 
 
-def process_clipboard_once(args):
+def process_clipboard_once(pipeline):
     """Process current clipboard image immediately if present."""
-    image_bytes = get_clipboard_image_bytes()
-    if not image_bytes:
+    if pipeline.poll_once(force=True) is None:
         print("⚠️ No image found in the clipboard.")
-        return
-    text = extract_text_from_image(image_bytes)
-    if not text or text.startswith("[OCR Error]"):
-        print(text or "⚠️ No text found in the screenshot.")
-        return
-    qtype = classify_question(text)
-    difficulty = detect_difficulty(text)
-    print(f"🧠 Detected Question Type: {qtype}, Difficulty: {difficulty}")
-    response = generate_hints(text, qtype, difficulty, args)
-    response_queue.put(response)
 
 
 # -------------------------------
@@ -732,7 +4581,7 @@ def trigger_windows_selection_capture():
         return False
 
 
-def capture_and_process(args):
+def capture_and_process(args, pipeline):
     sysname = platform.system()
     ok = False
     if sysname == "Darwin":
@@ -740,23 +4589,725 @@ def capture_and_process(args):
     elif sysname == "Windows":
         ok = trigger_windows_selection_capture()
 
-    # After triggering, poll clipboard briefly for the image and process
+    # After triggering, poll clipboard briefly for a new image; the pipeline processes it
     if ok:
         deadline = time.time() + (5 if sysname == "Darwin" else 12)
         while time.time() < deadline:
-            image_bytes = get_clipboard_image_bytes()
-            if image_bytes:
-                process_clipboard_once(args)
+            if pipeline.poll_once() is not None:
                 return
             time.sleep(0.25)
         print("⚠️ Timed out waiting for captured image on clipboard.")
 
+# -------------------------------
+# 5c. Batch / Offline Mode
+# -------------------------------
+
+BATCH_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+BATCH_FIELDS = ["id", "source", "page", "text", "qtype", "difficulty", "hints", "questions", "error", "ocr_ms", "llm_ms"]
+
+
+class BatchItem:
+    """One question image: a file on disk or a rendered PDF page."""
+
+    def __init__(self, source, page=None, image_bytes=None):
+        self.source = source
+        self.page = page
+        self.image_bytes = image_bytes
+
+    @property
+    def item_id(self):
+        return f"{self.source}#page={self.page}" if self.page is not None else self.source
+
+
+def render_pdf_pages(path, dpi=200):
+    """Yield (page number, PNG bytes) for a PDF; needs PyMuPDF or pdf2image (poppler)."""
+    try:
+        import fitz  # type: ignore  # PyMuPDF
+    except ImportError:
+        fitz = None
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            for number, page in enumerate(doc, start=1):
+                yield number, page.get_pixmap(dpi=dpi).tobytes("png")
+        return
+    try:
+        from pdf2image import convert_from_path  # type: ignore
+    except ImportError:
+        raise RuntimeError("Reading PDFs needs PyMuPDF ('pip install pymupdf') or pdf2image + poppler")
+    for number, image in enumerate(convert_from_path(path, dpi=dpi), start=1):
+        buf = BytesIO()
+        image.save(buf, format="PNG")
+        yield number, buf.getvalue()
+
+
+def collect_batch_items(inputs):
+    """Expand directories, globs, image files and PDFs into BatchItems (sorted, de-duplicated)."""
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            paths.extend(os.path.join(entry, n) for n in sorted(os.listdir(entry)))
+        elif any(ch in entry for ch in "*?["):
+            paths.extend(sorted(glob.glob(entry, recursive=True)))
+        else:
+            paths.append(entry)
+    items, seen = [], set()
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if path in seen or not os.path.isfile(path):
+            continue
+        seen.add(path)
+        if ext == ".pdf":
+            for number, png in render_pdf_pages(path):
+                items.append(BatchItem(path, page=number, image_bytes=png))
+        elif ext in BATCH_IMAGE_EXTENSIONS:
+            items.append(BatchItem(path))
+    return items
+
+
+def load_batch_progress(path, fmt):
+    """IDs already completed (without error) in an existing output file, for --resume.
+
+    The file is rewritten with one row per completed ID; failed rows are dropped
+    since those items are processed again and appended.
+    """
+    if not os.path.exists(path):
+        return set()
+    kept = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if row.get("id") and not row.get("error"):
+                kept[row["id"]] = row
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=BATCH_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(kept.values())
+        else:
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in kept.values())
+    os.replace(tmp, path)
+    return set(kept)
+
+
+class BatchWriter:
+    """Appends one JSONL line or CSV row per finished item, flushed immediately."""
+
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._csv = csv.DictWriter(self._file, fieldnames=BATCH_FIELDS) if fmt == "csv" else None
+        if self._csv is not None and new_file:
+            self._csv.writeheader()
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            if self._csv is not None:
+                questions = record.get("questions")
+                self._csv.writerow(dict(record, questions=json.dumps(questions, ensure_ascii=False) if questions else None))
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _batch_ocr(source, image_bytes):
+    """Process-pool worker: the same OCR as the interactive path.
+
+    Returns (layout text, word boxes, ms) for classify_capture. The OCR cache is not
+    used here: worker processes would each write the shared index and exit before
+    their delayed index writes ran.
+    """
+    started = time.perf_counter()
+    if image_bytes is None:
+        with open(source, "rb") as f:
+            image_bytes = f.read()
+    text, words = extract_text_and_words(image_bytes, use_cache=False)
+    return text, words, (time.perf_counter() - started) * 1000
+
+
+def _batch_worker_init(debug):
+    global DEBUG, _ocr_fallback_reported
+    DEBUG = debug
+    _ocr_fallback_reported = True  # run_batch already said which engine is used
+
+
+def run_batch(args):
+    """`hintify batch`: OCR question images in a process pool, then generate hints concurrently."""
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    try:
+        items = collect_batch_items(args.inputs)
+    except RuntimeError as e:
+        colored_print(f"[Batch] {e}", Colors.FAIL)
+        return 1
+    done = load_batch_progress(args.output, fmt) if args.resume else set()
+    if not args.resume and os.path.exists(args.output):
+        open(args.output, "w").close()
+    todo = [item for item in items if item.item_id not in done]
+    colored_print(f"[Batch] {len(items)} image(s), {len(items) - len(todo)} already done, {len(todo)} to process", Colors.OKCYAN)
+    if not todo:
+        return 0
+    if not ensure_tesseract_binary():
+        return 1
+    report_ocr_engine(load_config())
+
+    writer = BatchWriter(args.output, fmt)
+    counts = {"done": 0, "errors": 0}
+    counts_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def finish(record):
+        writer.write(record)
+        with counts_lock:
+            counts["done"] += 1
+            counts["errors"] += 1 if record["error"] else 0
+            print(f"[Batch] {counts['done']}/{len(todo)} {record['id']}" + (f" — {record['error']}" if record["error"] else ""))
+
+    def hints(record, parts):
+        trace = tracer.start(record["id"])
+        trace.add("ocr", record["ocr_ms"] / 1000.0)  # measured in the OCR worker process
+        llm_started = time.perf_counter()
+        try:
+            with use_trace(trace):
+                response, record["questions"] = generate_question_hints(
+                    record["text"], record["qtype"], record["difficulty"], parts, args)
+        except Exception as e:
+            response = f"[LLM Error] {e}"
+        record["llm_ms"] = round((time.perf_counter() - llm_started) * 1000, 1)
+        record["hints"] = response
+        if response.startswith("[Setup]") or "[LLM Error]" in response:
+            record["error"] = response
+        trace.finish("error" if record["error"] else "ok")
+        finish(record)
+
+    processes = max(1, args.ocr_processes or os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_batch_worker_init, initargs=(DEBUG,)) as ocr_pool, \
+                ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="hintify-batch-llm") as llm_pool:
+            ocr_jobs = {ocr_pool.submit(_batch_ocr, item.source, item.image_bytes): item for item in todo}
+            llm_jobs = []
+            for future in as_completed(ocr_jobs):
+                item = ocr_jobs[future]
+                record = dict.fromkeys(BATCH_FIELDS)
+                record.update(id=item.item_id, source=item.source, page=item.page)
+                words = None
+                try:
+                    layout, words, record["ocr_ms"] = future.result()
+                except Exception as e:
+                    layout = f"[OCR Error] {e}"
+                record["ocr_ms"] = round(record["ocr_ms"] or 0, 1)
+                text = _clean_ocr_text(layout)
+                if not text or text.startswith("[OCR Error]"):
+                    record["error"] = text or "No text found"
+                    finish(record)
+                    continue
+                qtype, difficulty, parts = classify_capture(text, words, layout)
+                record.update(text=text, qtype=qtype, difficulty=difficulty)
+                llm_jobs.append(llm_pool.submit(hints, record, parts))
+            for future in llm_jobs:
+                future.result()
+    finally:
+        # Rows already written stay readable for --resume even if the run is interrupted
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    colored_print(
+        f"[Batch] Finished {counts['done']} item(s) in {elapsed:.1f}s ({counts['done'] / elapsed:.2f}/s), "
+        f"{counts['errors']} error(s) → {args.output}",
+        Colors.OKGREEN if not counts["errors"] else Colors.WARNING,
+    )
+    if DEBUG and tracer.stages:
+        print(f"[Trace] {tracer.summary()}")
+    return 0 if not counts["errors"] else 2
+
+
+# -------------------------------
+# 5d. Hint Server (`hintify serve`) and Client
+# -------------------------------
+
+class ServerBusy(Exception):
+    """The hint server's request queue is full."""
+
+
+class RequestCoalescer:
+    """Share one in-flight computation between identical concurrent requests."""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, fn):
+        """Return (result, shared): fn() runs once per key; concurrent callers wait for it."""
+        from concurrent.futures import Future
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class HintService:
+    """OCR → classify → hints for server requests, with admission control.
+
+    At most `ocr_concurrency` OCR and `llm_concurrency` LLM calls run at once;
+    up to `queue_size` further requests wait for a slot and the rest are rejected
+    with ServerBusy. Identical concurrent requests are computed once.
+    """
+
+    def __init__(self, args, queue_size=32, ocr_concurrency=None, llm_concurrency=2):
+        self.args = args
+        self.ocr_slots = threading.BoundedSemaphore(max(1, ocr_concurrency or os.cpu_count() or 1))
+        self.llm_slots = threading.BoundedSemaphore(max(1, llm_concurrency))
+        self.max_admitted = max(1, queue_size) + max(1, ocr_concurrency or os.cpu_count() or 1)
+        self.coalescer = RequestCoalescer()
+        self.counters = {"requests_image": 0, "requests_text": 0, "rejected": 0, "failed": 0}
+        self.admitted = 0
+        self.inflight = 0
+        self.request_latency = LatencyStats()
+        self.ocr_latency = LatencyStats()
+        self.llm_latency = LatencyStats()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Load the OCR engine and make sure the model is present before taking requests."""
+        get_ocr_engine()
+        if have_ollama():
+            cfg = load_config()
+            prepare_ollama_model(cfg.get("ollama_model") or self.args.ollama_model, cfg.get("ollama_keep_alive"),
+                                 prewarm=cfg.get("ollama_prewarm", True), cfg=cfg)
+
+    def handle(self, image_bytes=None, text=None):
+        kind = "image" if image_bytes is not None else "text"
+        with self._lock:
+            self.counters[f"requests_{kind}"] += 1
+            self._next_id += 1
+            trace = tracer.start(f"srv-{self._next_id}")
+        if image_bytes is not None:
+            key = "image:" + hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+        else:
+            key = question_key(text)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with use_trace(trace):
+                result, shared = self.coalescer.run(key, lambda: self._admitted(image_bytes, text))
+            status = "coalesced" if shared else ("error" if result.get("error") else "ok")
+        except ServerBusy:
+            status = "rejected"
+            raise
+        finally:
+            trace.finish(status)
+        self.request_latency.add(time.perf_counter() - started)
+        return dict(result, coalesced=shared, job_id=trace.job_id)
+
+    def _admitted(self, image_bytes, text):
+        with self._lock:
+            if self.admitted >= self.max_admitted:
+                self.counters["rejected"] += 1
+                raise ServerBusy(f"queue full ({self.admitted} requests pending)")
+            self.admitted += 1
+        try:
+            return self._process(image_bytes, text)
+        except Exception:
+            with self._lock:
+                self.counters["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.admitted -= 1
+
+    def _process(self, image_bytes, text):
+        result = {"text": text, "qtype": None, "difficulty": None, "hints": None, "questions": [], "error": None,
+                  "ocr_ms": None, "llm_ms": None}
+        words = layout = None
+        if image_bytes is not None:
+            with self.ocr_slots:
+                started = time.perf_counter()
+                layout, words = extract_text_and_words(image_bytes)
+                text = _clean_ocr_text(layout)
+                elapsed = time.perf_counter() - started
+                self.ocr_latency.add(elapsed)
+                record_span("ocr", elapsed)
+                result["ocr_ms"] = round(elapsed * 1000, 1)
+            if not text or text.startswith("[OCR Error]"):
+                result["error"] = text or "No text found in the image"
+                return result
+        qtype, difficulty, parts = classify_capture(text, words, layout)
+        result.update(text=text, qtype=qtype, difficulty=difficulty)
+        with self.llm_slots:
+            with self._lock:
+                self.inflight += 1
+            started = time.perf_counter()
+            try:
+                hints, result["questions"] = generate_question_hints(text, qtype, difficulty, parts, self.args)
+            finally:
+                self.llm_latency.add(time.perf_counter() - started)
+                with self._lock:
+                    self.inflight -= 1
+        result["llm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["hints"] = hints
+        if hints.startswith("[Setup]") or "[LLM Error]" in hints:
+            result["error"] = hints
+        return result
+
+    def metrics(self):
+        """Prometheus text exposition of the service counters and latencies."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP hintify_{name} {help_text}")
+            lines.append(f"# TYPE hintify_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"hintify_{name}{labels} {value}")
+
+        def summary(name, help_text, stats):
+            samples = [(f'{{quantile="{q}"}}', f"{stats.percentile(q * 100):.6f}") for q in (0.5, 0.95, 0.99)]
+            samples += [("_sum", f"{stats.total:.6f}"), ("_count", stats.count)]
+            metric(name, "summary", help_text, samples)
+
+        with self._lock:
+            counters = dict(self.counters)
+            admitted, inflight = self.admitted, self.inflight
+        metric("requests_total", "counter", "Hint requests received.",
+               [('{kind="image"}', counters["requests_image"]), ('{kind="text"}', counters["requests_text"])])
+        metric("requests_coalesced_total", "counter", "Requests answered by an identical in-flight request.", [("", self.coalescer.coalesced)])
+        metric("requests_rejected_total", "counter", "Requests rejected because the queue was full.", [("", counters["rejected"])])
+        metric("requests_failed_total", "counter", "Requests that raised an internal error.", [("", counters["failed"])])
+        metric("queue_depth", "gauge", "Admitted requests not yet finished.", [("", admitted)])
+        metric("llm_inflight", "gauge", "LLM calls currently running.", [("", inflight)])
+        summary("request_seconds", "End-to-end request latency.", self.request_latency)
+        summary("ocr_seconds", "OCR latency.", self.ocr_latency)
+        summary("llm_seconds", "Hint generation latency.", self.llm_latency)
+        lines.extend(tracer.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+
+MAX_REQUEST_BYTES = 20 * 1024 * 1024
+
+
+def make_hint_handler(service):
+    from http.server import BaseHTTPRequestHandler
+
+    class HintRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "Hintify"
+        timeout = 60  # idle keep-alive connections give their handler thread back
+
+        def log_message(self, fmt, *log_args):
+            if DEBUG:
+                print(f"[Server] {fmt % log_args}")
+
+        def _send(self, status, body, content_type="application/json", headers=None):
+            if not isinstance(body, bytes):
+                body = (json.dumps(body, ensure_ascii=False) if content_type == "application/json" else body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, service.metrics(), "text/plain; version=0.0.4")
+            elif self.path == "/healthz":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/v1/hints":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # Without a usable length the body cannot be skipped, so the connection is not reusable
+                self._send(400, {"error": "invalid Content-Length header"})
+                self.close_connection = True
+                return
+            if length > MAX_REQUEST_BYTES:
+                self._send(413, {"error": f"request larger than {MAX_REQUEST_BYTES} bytes"})
+                self.close_connection = True
+                return
+            body = self.rfile.read(length)
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            image_bytes = text = None
+            try:
+                if content_type == "application/json":
+                    data = json.loads(body or b"{}")
+                    text = (data.get("text") or "").strip() or None
+                    if data.get("image_base64"):
+                        image_bytes = base64.b64decode(data["image_base64"])
+                else:
+                    image_bytes = body or None
+            except Exception as e:
+                self._send(400, {"error": f"bad request body: {e}"})
+                return
+            if image_bytes is None and text is None:
+                self._send(400, {"error": "send image bytes or JSON {\"text\": ...} / {\"image_base64\": ...}"})
+                return
+            try:
+                self._send(200, service.handle(image_bytes=image_bytes, text=text))
+            except ServerBusy as e:
+                self._send(503, {"error": str(e)}, headers={"Retry-After": "1"})
+            except Exception as e:
+                colored_print(f"[Server] {e}", Colors.FAIL)
+                self._send(500, {"error": str(e)})
+
+    return HintRequestHandler
+
+
+def create_hint_server(service, host="127.0.0.1", port=8765, unix_socket=None, max_connections=64):
+    """Threaded HTTP server for `service`; at most `max_connections` are served at once.
+
+    Further connections wait in the listen backlog until a handler thread is free,
+    so a burst of clients cannot spawn an unbounded number of threads.
+    """
+    from http.server import HTTPServer
+    import socketserver
+
+    slots = threading.BoundedSemaphore(max(1, int(max_connections)))
+
+    class BoundedThreads(socketserver.ThreadingMixIn):
+        daemon_threads = True
+
+        def process_request(self, request, client_address):
+            slots.acquire()
+            try:
+                super().process_request(request, client_address)
+            except BaseException:
+                slots.release()
+                raise
+
+        def process_request_thread(self, request, client_address):
+            try:
+                super().process_request_thread(request, client_address)
+            finally:
+                slots.release()
+
+    handler = make_hint_handler(service)
+    if unix_socket:
+        class UnixHintServer(BoundedThreads, socketserver.UnixStreamServer):
+            def get_request(self):
+                request, _ = super().get_request()
+                return request, ("unix", 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        return UnixHintServer(unix_socket, handler)
+
+    class HintServer(BoundedThreads, HTTPServer):
+        pass
+
+    return HintServer((host, port), handler)
+
+
+def run_server(args):
+    """`hintify serve`: one warm OCR + model instance answering many thin clients."""
+    if not ensure_tesseract_binary():
+        return 1
+    report_ocr_engine(load_config())
+    service = HintService(args, queue_size=args.queue_size, ocr_concurrency=args.ocr_concurrency, llm_concurrency=args.llm_concurrency)
+    colored_print("[Server] Warming up OCR engine and model...", Colors.OKCYAN)
+    service.warm_up()
+    server = create_hint_server(service, host=args.host, port=args.port, unix_socket=args.unix_socket,
+                                max_connections=args.max_connections)
+    where = f"unix:{args.unix_socket}" if args.unix_socket else f"http://{args.host}:{server.server_address[1]}"
+    colored_print(f"[Server] Serving hints on {where} (POST /v1/hints, GET /metrics)", Colors.OKGREEN)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        colored_print("\n[Server] Stopped.", Colors.FAIL)
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+    return 0
+
+
+class HintServerClient:
+    """Client for a `hintify serve` instance at http://host:port or unix:/path/to/socket."""
+
+    def __init__(self, url, timeout=180):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        import http.client
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.url.startswith("unix:"):
+                path = self.url[len("unix:"):]
+                timeout = self.timeout
+
+                class UnixConnection(http.client.HTTPConnection):
+                    def connect(self):
+                        import socket
+                        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        self.sock.settimeout(timeout)
+                        self.sock.connect(path)
+
+                conn = UnixConnection("localhost", timeout=self.timeout)
+            else:
+                netloc = self.url.split("://", 1)[-1].split("/", 1)[0]
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _post(self, body, content_type):
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", "/v1/hints", body=body, headers={"Content-Type": content_type})
+                resp = conn.getresponse()
+                data = json.loads(resp.read() or b"{}")
+            except (ConnectionError, OSError) as e:
+                # Kept-alive connection closed by the server: reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise ConnectionError(f"Hint server {self.url} unreachable: {e}")
+                continue
+            if resp.status != 200:
+                raise RuntimeError(f"Hint server HTTP {resp.status}: {data.get('error')}")
+            return data
+
+    def hints_for_image(self, image_bytes):
+        return self._post(image_bytes, "application/octet-stream")
+
+    def hints_for_text(self, text):
+        return self._post(json.dumps({"text": text}).encode("utf-8"), "application/json")
+
+
 # -------------------------------
 # 6. Fixed Window GUI (optional)
 # -------------------------------
 
+_HINT_LABEL_RE = re.compile(r"^((?:Hint|Question)\s+\d+:)(\s*)(.*)$")
+_ENCOURAGEMENT_PREFIXES = ("now try", "work carefully")
+
+
+class HintRenderer:
+    """Keeps a Text widget in sync with the hint lines that should be on screen.
+
+    set_lines()/append_line() only update the target and schedule a flush, so a
+    burst of updates (a streamed response, several results queued at once) costs
+    at most one redraw per frame; an update after a quiet spell is drawn on the
+    next pass of the Tk loop. A flush keeps the lines already shown up to the first
+    difference and rewrites only the rest; results passed as `rendered` are traced
+    (record_render) once that flush has put them on screen.
+    """
+
+    def __init__(self, widget, frame_ms=16):
+        self.widget = widget
+        self.frame_ms = max(0, int(frame_ms))
+        self.shown = []
+        self.target = []
+        self.flushes = 0
+        self.lines_written = 0
+        self.latency = LatencyStats()
+        self._rendered = []
+        self._scheduled = None
+        self._dirty_since = None
+        self._last_flush = 0.0
+
+    def set_lines(self, lines, rendered=None):
+        self.target = list(lines)
+        self._schedule(rendered)
+
+    def append_line(self, line, rendered=None):
+        self.target.append(line)
+        self._schedule(rendered)
+
+    def _schedule(self, rendered):
+        if rendered is not None:
+            self._rendered.append(rendered)
+        if self._dirty_since is None:
+            self._dirty_since = time.perf_counter()
+        if self._scheduled is None:
+            # Draw on the next loop pass when idle, otherwise no sooner than a frame after the last redraw
+            wait = self.frame_ms - (time.perf_counter() - self._last_flush) * 1000
+            self._scheduled = self.widget.after(max(0, int(wait)), self.flush)
+
+    def _insert_line(self, line):
+        w = self.widget
+        stripped = line.strip()
+        m = _HINT_LABEL_RE.match(stripped)
+        if m:
+            label, spaces, rest = m.group(1), m.group(2), m.group(3)
+            w.insert(tk.END, label, ("hint_label",), spaces or " ", (), rest + "\n", ("hint_text",))
+        elif stripped.lower().startswith(_ENCOURAGEMENT_PREFIXES):
+            w.insert(tk.END, line + "\n", ("enc",))
+        else:
+            w.insert(tk.END, line + "\n", ("hint_text",))
+
+    def flush(self):
+        """Apply the pending target to the widget (called from the Tk loop)."""
+        self._scheduled = None
+        rendered, self._rendered = self._rendered, []
+        if not self.widget.winfo_exists():
+            return
+        shown, target = self.shown, self.target
+        keep = 0
+        for old, new in zip(shown, target):
+            if old != new:
+                break
+            keep += 1
+        if keep < len(shown) or keep < len(target):
+            w = self.widget
+            w.config(state="normal")
+            if keep < len(shown):
+                w.delete(f"{keep + 1}.0", tk.END)
+            for line in target[keep:]:
+                self._insert_line(line)
+            w.config(state="disabled")
+            # Follow a growing (streamed) response; show a replaced one from the top
+            w.see(tk.END if keep and keep == len(shown) else "1.0")
+            self.lines_written += len(target) - keep
+            self.shown = list(target)
+            self.flushes += 1
+        self._last_flush = time.perf_counter()
+        if self._dirty_since is not None:
+            self.latency.add(time.perf_counter() - self._dirty_since)
+            self._dirty_since = None
+        for item in rendered:
+            record_render(item)
+
+
 class FixedWindow:
-    def __init__(self, root, args):
+    def __init__(self, root, args, pipeline):
         cfg = load_config()
         theme = (cfg.get("theme") or "dark").lower()
 
@@ -816,6 +5367,7 @@ class FixedWindow:
         # Store references for live theme application
         self.root = root
         self.args = args
+        self.pipeline = pipeline
         self._cfg = cfg
         self._theme = theme
         self._theme_tokens = {
@@ -901,7 +5453,7 @@ class FixedWindow:
             buttons_frame,
             image=getattr(self, 'capture_photo', None) or None,
             text="📸" if not hasattr(self, 'capture_photo') else "",
-            command=lambda: capture_and_process(args),
+            command=lambda: capture_and_process(args, pipeline),
             bg=accent,
             fg=accent_text,
             activebackground=accent,
@@ -951,10 +5503,12 @@ class FixedWindow:
         self.text_widget.tag_configure("hint_label", font=("SF Pro Text", 16, "bold"), foreground=label_color)
         self.text_widget.tag_configure("hint_text", font=("SF Pro Text", 15), foreground=fg_text)
         self.text_widget.tag_configure("enc", font=("SF Pro Text", 14, "italic"), foreground=enc_color)
+        self.renderer = HintRenderer(self.text_widget, cfg.get("render_frame_ms", 16))
+        self._parts = {}  # question index -> finished section of a multi-question response
 
         # Keyboard shortcut
         try:
-            root.bind_all('<Key-c>', lambda e: capture_and_process(args))
+            root.bind_all('<Key-c>', lambda e: capture_and_process(args, pipeline))
         except Exception:
             pass
 
@@ -1011,25 +5565,25 @@ class FixedWindow:
         self.text_widget.tag_configure("hint_text", foreground=tokens["fg_text"]) 
         self.text_widget.tag_configure("enc", foreground=tokens["enc_color"]) 
 
-    def show(self, response):
-        if not self.text_widget.winfo_exists():
-            return
-        self.text_widget.config(state="normal")
-        self.text_widget.delete("1.0", tk.END)
-        # Pretty-print hints: bold labels, styled text
-        lines = [l for l in (response or "").splitlines()]
-        for idx, line in enumerate(lines):
-            m = re.match(r"^(Hint\s+\d+:)(\s*)(.*)$", line.strip())
-            if m:
-                label, spaces, rest = m.group(1), m.group(2), m.group(3)
-                self.text_widget.insert(tk.END, label, ("hint_label",))
-                self.text_widget.insert(tk.END, spaces or " ")
-                self.text_widget.insert(tk.END, rest + "\n", ("hint_text",))
-            elif line.strip().lower().startswith("now try") or line.strip().lower().startswith("work carefully"):
-                self.text_widget.insert(tk.END, line + "\n", ("enc",))
-            else:
-                self.text_widget.insert(tk.END, line + "\n", ("hint_text",))
-        self.text_widget.config(state="disabled")
+    def show(self, response, rendered=None):
+        self.renderer.set_lines((response or "").splitlines(), rendered)
+
+    def handle_event(self, event):
+        """Apply a streaming HintEvent: clear on start, append each line or finished question as it arrives."""
+        if event.kind == "start":
+            self.streaming = True
+            self._parts = {}
+            self.renderer.set_lines([])
+        elif event.kind == "line":
+            self.renderer.append_line(event.text)
+        elif event.kind == "part":
+            # Questions of a worksheet finish in any order; keep them in page order
+            self._parts[event.index] = event.text
+            self.renderer.set_lines("\n\n".join(self._parts[i] for i in sorted(self._parts)).splitlines())
+        elif event.kind == "done":
+            self.streaming = False
+            # The final text normally equals the streamed lines, making this a no-op diff
+            self.renderer.set_lines((event.text or "").splitlines(), event)
 
     def open_settings(self, args):
         cfg = load_config()
@@ -1056,7 +5610,7 @@ class FixedWindow:
 
         # Gemini API key
         tk.Label(top, text="Gemini API key", bg=t["panel_bg"], fg=t["fg_text"]).pack(anchor="w", padx=12, pady=(12,2))
-        current_key = os.getenv("GEMINI_API_KEY") or (keyring.get_password("hintify", "gemini_api_key") or "")
+        current_key = get_gemini_api_key() or ""
         key_var = tk.StringVar(value=current_key)
         key_entry = tk.Entry(top, textvariable=key_var, show="•")
         key_entry.pack(fill="x", padx=12)
@@ -1074,7 +5628,7 @@ class FixedWindow:
             val = (key_var.get() or "").strip()
             if val:
                 try:
-                    keyring.set_password("hintify", "gemini_api_key", val)
+                    config_store.set_secret("gemini_api_key", val)
                     os.environ["GEMINI_API_KEY"] = val
                     print("[Settings] Gemini API key saved to keychain.")
                 except Exception as e:
@@ -1082,7 +5636,7 @@ class FixedWindow:
 
         def clear_key():
             try:
-                keyring.delete_password("hintify", "gemini_api_key")
+                config_store.delete_secret("gemini_api_key")
                 if "GEMINI_API_KEY" in os.environ:
                     del os.environ["GEMINI_API_KEY"]
                 key_var.set("")
@@ -1097,7 +5651,8 @@ class FixedWindow:
                 "gemini_model": gem_var.get().strip() or "gemini-2.0-flash",
                 "theme": theme_var.get(),
             }
-            save_config(new_cfg)
+            # Keep keys the dialog does not edit (setup_completed, cache/OCR tuning, ...)
+            save_config(dict(cfg, **new_cfg))
             # Save key if provided
             if key_var.get().strip():
                 save_key()
@@ -1112,39 +5667,134 @@ class FixedWindow:
         tk.Button(btns, text="Cancel", command=top.destroy, relief="groove").pack(side="right")
 
 
-def headless_print_loop():
+def headless_print_loop(results):
+    streamed = False
     try:
         while True:
             try:
-                response = response_queue.get(timeout=0.5)
-                if response:
+                response = results.get(timeout=0.5)
+                if isinstance(response, HintEvent):
+                    if response.kind == "start":
+                        streamed = False
+                        print("\n📘 Hints:", flush=True)
+                    elif response.kind == "line":
+                        streamed = True
+                        print(response.text, flush=True)
+                    elif response.kind == "part":
+                        streamed = True
+                        print(response.text + "\n", flush=True)
+                    elif response.kind == "done":
+                        print(("" if streamed else response.text + "\n"), flush=True)
+                        record_render(response)
+                elif response:
                     print("\n📘 Hints:\n" + response + "\n")
+                    record_render(response)
             except Exception:
                 pass
     except KeyboardInterrupt:
+        if DEBUG and tracer.stages:
+            print(f"[Trace] {tracer.summary()}")
         return
 
 
-def gui_loop(args):
-    if tk is None:
+def gui_loop(args, pipeline):
+    if importlib.util.find_spec("tkinter") is None:
         print("[GUI] tkinter not available. Running in headless mode.")
-        headless_print_loop()
+        headless_print_loop(pipeline.results)
         return
     try:
         root = tk.Tk()
     except Exception as e:
         print(f"[GUI] Failed to initialize tkinter GUI ({e}). Falling back to headless mode.")
-        headless_print_loop()
+        headless_print_loop(pipeline.results)
         return
-    app = FixedWindow(root, args)
+    app = FixedWindow(root, args, pipeline)
+    startup_timer.mark("gui window")
+    if getattr(args, "startup_report", False):
+        root.after_idle(lambda: print(startup_timer.report()))
+
+    # Config edits (settings dialog or the file itself) arrive on other threads;
+    # remember the theme and apply it from the Tk loop.
+    pending_theme = []
+    # Set while a wake-up is in flight, so a burst of puts queues a single one
+    wake_pending = threading.Event()
+
+    def drain(*_):
+        wake_pending.clear()
+        if pending_theme:
+            app.apply_theme(pending_theme.pop())
+            pending_theme.clear()
+        while True:
+            try:
+                response = pipeline.results.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(response, HintEvent):
+                app.handle_event(response)
+            else:
+                app.show(response, response)
 
-    def poll_queue():
-        while not response_queue.empty():
-            response = response_queue.get()
-            app.show(response)
-        root.after(500, poll_queue)
+    try:
+        root.tk.getvar("tcl_platform(threaded)")
+        threaded_tcl = True
+    except Exception:
+        # event_generate is not safe from other threads without a thread-enabled Tcl
+        threaded_tcl = False
 
-    root.after(500, poll_queue)
+    wake_fds = None
+    if threaded_tcl:
+        def send_wake():
+            root.event_generate("<<HintifyResults>>", when="tail")
+
+        root.bind("<<HintifyResults>>", drain)
+    elif hasattr(root.tk, "createfilehandler"):
+        # A pipe the Tk loop watches: writing a byte from any thread wakes it
+        wake_fds = os.pipe()
+        os.set_blocking(wake_fds[0], False)
+
+        def send_wake():
+            os.write(wake_fds[1], b"\0")
+
+        def on_pipe(fd, mask):
+            try:
+                os.read(fd, 4096)
+            except BlockingIOError:
+                pass
+            drain()
+
+        root.tk.createfilehandler(wake_fds[0], tk.READABLE, on_pipe)
+    else:
+        send_wake = None
+
+    def wake():
+        if not wake_pending.is_set():
+            wake_pending.set()
+            try:
+                send_wake()
+            except Exception as e:
+                wake_pending.clear()
+                if DEBUG:
+                    print(f"[GUI] Waking the Tk loop failed: {e}")
+
+    def on_config_change(new, old):
+        if new.get("theme") != old.get("theme"):
+            pending_theme.append(new.get("theme"))
+            if send_wake:
+                wake()
+
+    config_store.subscribe(on_config_change)
+
+    if send_wake:
+        # Worker threads wake the Tk loop instead of it polling the queue
+        pipeline.results.listeners.append(wake)
+        root.after_idle(drain)
+    else:
+        def poll_queue():
+            drain()
+            # Poll quickly while a response is streaming in, slowly otherwise
+            root.after(50 if getattr(app, "streaming", False) else 500, poll_queue)
+
+        root.after(500, poll_queue)
     root.mainloop()
 
 
@@ -1155,32 +5805,137 @@ def gui_loop(args):
 def parse_args():
     parser = argparse.ArgumentParser(description="SnapAssist AI - cross-platform clipboard-to-hints")
     parser.add_argument("--no-gui", action="store_true", help="Run without tkinter GUI")
-    parser.add_argument("--poll-interval", type=float, default=1.5, help="Clipboard polling interval in seconds")
+    parser.add_argument("--poll-interval", type=float, default=1.5, help="Base clipboard polling interval in seconds (when no change events are available)")
+    parser.add_argument("--clipboard-watch", choices=["auto", "poll"], default="auto", help="'auto' uses clipboard change events when available; 'poll' always polls")
     # Provider is no longer selectable; we keep the flag for compatibility but ignore it
     parser.add_argument("--provider", choices=["ollama", "gemini"], default=None, help="(Ignored) Provider selection; Ollama is enforced")
     parser.add_argument("--ollama-model", default=os.getenv("HINTIFY_OLLAMA_MODEL", "granite3.2-vision:2b"), help="Ollama model to use")
     parser.add_argument("--gemini-model", default=os.getenv("GEMINI_MODEL", "gemini-2.0-flash"), help="(Unused) Gemini model")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--ocr-workers", type=int, default=2, help="Number of OCR worker threads")
+    parser.add_argument("--stream", action="store_true", help="Stream hints line by line as the model produces them")
+    parser.add_argument("--provider-strategy", choices=["single", "race", "hedge"], default=None, help="Query Ollama and Gemini at once ('race') or only when the first is slow ('hedge'); overrides the config")
     parser.add_argument("--capture-now", action="store_true", help="Immediately prompt to select an area and process once")
+    parser.add_argument("--doctor", action="store_true", help="Check (and install) dependencies, then exit")
+    parser.add_argument("--startup-report", action="store_true", help="Print how long each startup phase took")
     parser.add_argument("--hotkey-daemon", action="store_true", help=argparse.SUPPRESS)
+
+    parser.add_argument("--server", default=os.getenv("HINTIFY_SERVER"), help="Use a 'hintify serve' instance (http://host:port or unix:/path) instead of local OCR and models")
+    parser.add_argument("--trace-log", nargs="?", const=TRACE_LOG_PATH, default=None, help=f"Write per-stage JSON trace lines (default path {TRACE_LOG_PATH}; '-' for stderr)")
+    parser.add_argument("--metrics-file", default=None, help="Write Prometheus text stage metrics to this file after each job")
+    parser.add_argument("--otel", action="store_true", help="Export stage spans via OpenTelemetry")
+
+    commands = parser.add_subparsers(dest="command", metavar="{batch,serve,stats}")
+    batch = commands.add_parser("batch", help="Generate hints offline for a directory, glob or PDF of question images")
+    batch.add_argument("inputs", nargs="+", help="Image files, directories, glob patterns or PDFs")
+    batch.add_argument("-o", "--output", default="hints.jsonl", help="Output file (.jsonl or .csv; default hints.jsonl)")
+    batch.add_argument("--format", choices=["jsonl", "csv"], default=None, help="Output format (default: from the output extension)")
+    batch.add_argument("--ocr-processes", type=int, default=None, help="OCR worker processes (default: CPU count)")
+    batch.add_argument("--concurrency", type=int, default=2, help="Concurrent LLM requests")
+    batch.add_argument("--resume", action="store_true", help="Skip items already completed in the output file; failed ones are retried and replace their rows")
+    serve = commands.add_parser("serve", help="Serve OCR + hints to other Hintify clients over HTTP or a Unix socket")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to bind (default 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="TCP port (default 8765)")
+    serve.add_argument("--unix-socket", default=None, help="Listen on this Unix socket path instead of TCP")
+    serve.add_argument("--queue-size", type=int, default=32, help="Requests allowed to wait for a slot before returning 503")
+    serve.add_argument("--ocr-concurrency", type=int, default=None, help="Concurrent OCR jobs (default: CPU count)")
+    serve.add_argument("--llm-concurrency", type=int, default=2, help="Concurrent LLM requests")
+    serve.add_argument("--max-connections", type=int, default=64, help="Connections served at once; more wait to be accepted")
+    stats = commands.add_parser("stats", help="Print p50/p95 latency per pipeline stage from the trace log")
+    stats.add_argument("--log", default=None, help=f"Trace log to read (default: trace_log from the config, else {TRACE_LOG_PATH})")
+    stats.add_argument("--last", type=int, default=200, help="Only the most recent N jobs (default 200)")
     return parser.parse_args()
 
 
+def configure_tracing(args, cfg):
+    """Set up the trace exporters from CLI flags, falling back to the config file."""
+    tracer.configure(
+        log_path=getattr(args, "trace_log", None) or cfg.get("trace_log"),
+        metrics_path=getattr(args, "metrics_file", None) or cfg.get("metrics_file"),
+        otel=getattr(args, "otel", False) or bool(cfg.get("trace_otel")),
+    )
+
+
+def run_trace_stats(args):
+    """`hintify stats`: rolling p50/p95 per stage over the last N jobs in the trace log."""
+    path = args.log or load_config().get("trace_log") or TRACE_LOG_PATH
+    if path == "-" or not os.path.exists(path):
+        colored_print(f"[Trace] No trace log at {path}. Run hintify with --trace-log first.", Colors.WARNING)
+        return 1
+    spans, jobs = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            (jobs if record.get("event") == "job" else spans).append(record)
+    jobs = jobs[-max(1, args.last):]
+    recent = {j["trace_id"] for j in jobs}
+    stages, outcomes = {}, {}
+    for record in spans:
+        # Late spans (render) arrive after their job record; keep them if the job is recent
+        if record.get("trace_id") in recent:
+            stages.setdefault(record["span"], LatencyStats(window=len(spans))).add(record["ms"] / 1000.0)
+    for job in jobs:
+        outcomes.setdefault(job["status"], LatencyStats(window=len(jobs))).add(job["ms"] / 1000.0)
+
+    order = {name: i for i, name in enumerate(TRACE_STAGES)}
+    print(f"[Trace] {len(jobs)} job(s) from {path}")
+    print(f"  {'stage':<16} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    rows = sorted(stages.items(), key=lambda kv: (order.get(kv[0], len(order)), kv[0]))
+    rows += [(f"job:{status}", stats) for status, stats in sorted(outcomes.items())]
+    for name, stats in rows:
+        print(f"  {name:<16} {stats.count:>5} {stats.percentile(50) * 1000:>9.1f} {stats.percentile(95) * 1000:>9.1f} {max(stats.samples) * 1000:>9.1f}")
+    return 0
+
+
+def _ensure_model_in_background(args):
+    cfg = load_config()
+    model = cfg.get("ollama_model") or os.getenv("HINTIFY_OLLAMA_MODEL") or args.ollama_model
+    if not prepare_ollama_model(model, cfg.get("ollama_keep_alive"), prewarm=cfg.get("ollama_prewarm", True), cfg=cfg):
+        colored_print("[Setup] Could not ensure the required Ollama model. Please check your network and try again.", Colors.FAIL)
+
+
 def main():
     args = parse_args()
+    startup_timer.mark("parse args")
 
     # Hotkey daemon mode (separate process)
     if getattr(args, "hotkey_daemon", False):
         run_hotkey_daemon()
         sys.exit(0)
 
+    if getattr(args, "doctor", False):
+        sys.exit(0 if run_doctor(args) else 1)
+
     # Set debug flag
+    global DEBUG
     DEBUG = getattr(args, "debug", False)
 
-    # Pre-flight checks
-    ensure_tesseract_binary()
-    # First-launch guided setup
-    ensure_provider_on_first_launch(args)
+    if args.command == "stats":
+        sys.exit(run_trace_stats(args))
+    configure_tracing(args, load_config())
+    model_registry.ttl = load_config().get("ollama_models_ttl", model_registry.ttl)
+
+    def on_trace_config(new, old):
+        if any(new.get(k) != old.get(k) for k in ("trace_log", "trace_otel", "metrics_file")):
+            configure_tracing(args, new)
+
+    config_store.subscribe(on_trace_config)
+
+    if args.command == "batch":
+        sys.exit(run_batch(args))
+    if args.command == "serve":
+        sys.exit(run_server(args))
+
+    # Pre-flight checks (a thin client of a hint server needs neither OCR nor a model)
+    if not args.server:
+        ensure_tesseract_binary()
+        report_ocr_engine(load_config())
+        # First-launch guided setup
+        ensure_provider_on_first_launch(args)
+    startup_timer.mark("preflight + config")
 
     # macOS guidance with colors
     try:
@@ -1191,7 +5946,9 @@ def main():
     except Exception:
         pass
 
-    if not have_ollama():
+    if args.server:
+        colored_print(f"[Server] Using hint server {args.server}", Colors.OKCYAN)
+    elif not have_ollama():
         colored_print("[Setup] Ollama not detected. Install from https://ollama.com/download", Colors.WARNING)
         if platform.system() == "Darwin":
             colored_print("[Setup] On macOS: brew install --cask ollama", Colors.OKCYAN)
@@ -1202,26 +5959,34 @@ def main():
         except Exception:
             pass
         sys.exit(1)
+    startup_timer.mark("ollama check")
 
-    # Ensure the required model is present before starting
-    if not ensure_ollama_model(args.ollama_model):
-        colored_print("[Setup] Could not ensure the required Ollama model. Please check your network and try again.", Colors.FAIL)
-        sys.exit(1)
+    # Make sure the model is present without holding up the window; questions wait on it anyway
+    if not args.server:
+        Thread(target=_ensure_model_in_background, args=(args,), daemon=True).start()
 
     # Start hotkey daemon subprocess (won't crash main app if it fails)
     start_hotkey_daemon_subprocess()
 
+    # OCR and LLM stages run on their own workers so clipboard polling never stalls
+    pipeline = HintPipeline(args, ocr_workers=args.ocr_workers).start()
+
     # Optional immediate capture
     if getattr(args, "capture_now", False) and platform.system() == "Darwin":
-        capture_and_process(args)
+        capture_and_process(args, pipeline)
 
     # Start clipboard monitor thread
-    Thread(target=monitor_clipboard, args=(args,), daemon=True).start()
+    Thread(target=monitor_clipboard, args=(args, pipeline), daemon=True).start()
+    startup_timer.mark("pipeline start")
 
     if args.no_gui:
-        headless_print_loop()
+        if args.startup_report:
+            print(startup_timer.report())
+        headless_print_loop(pipeline.results)
     else:
-        gui_loop(args)
+        gui_loop(args, pipeline)
+
+startup_timer.mark("module import")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import hintify  # noqa: E402
+from mock_llm import MockLLMServer  # noqa: E402
+
+RESPONSE = "Hint 1: Move the constant.\nHint 2: Divide by 3.\nHint 3: Check it."
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """A fresh config file under tmp_path; returns a setter that saves DEFAULT_CONFIG plus overrides."""
+    monkeypatch.setattr(hintify, "CONFIG_PATH", str(tmp_path / "config.json"))
+
+    def set_config(**overrides):
+        cfg = dict(hintify.DEFAULT_CONFIG, **overrides)
+        hintify.save_config(cfg)
+        return hintify.load_config()
+
+    set_config()
+    return set_config
+
+
+@pytest.fixture
+def mock():
+    """Local stub of the Ollama and Gemini HTTP APIs answering RESPONSE."""
+    with MockLLMServer(responses=[RESPONSE], chunk_size=5, models=["llama3.2:3b"]) as server:
+        yield server
+
+
+def posts(mock, fragment):
+    """JSON bodies of the POSTs the stub received on paths containing `fragment`."""
+    return [body for method, path, body in mock.requests if method == "POST" and fragment in path]
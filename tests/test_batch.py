@@ -0,0 +1,126 @@
+import csv
+import json
+import types
+
+import pytest
+
+import hintify
+
+
+def fake_ocr(source, image_bytes):
+    """Stands in for _batch_ocr in the worker processes (module level so it pickles)."""
+    return f"Solve the equation from {source} for x.", None, 1.0
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """run_batch over two fake images with OCR and hint generation stubbed out."""
+    items = [hintify.BatchItem(str(tmp_path / name)) for name in ("a.png", "b.png")]
+    monkeypatch.setattr(hintify, "collect_batch_items", lambda inputs: items)
+    monkeypatch.setattr(hintify, "ensure_tesseract_binary", lambda: True)
+    monkeypatch.setattr(hintify, "_batch_ocr", fake_ocr)
+    monkeypatch.setattr(hintify, "generate_hints", lambda text, qtype, difficulty, args: "Hint 1: Isolate x.")
+
+    def run(output, resume=False):
+        args = types.SimpleNamespace(inputs=[], output=str(output), format=None, resume=resume,
+                                     ocr_processes=1, concurrency=1)
+        return hintify.run_batch(args)
+
+    run.ids = [item.item_id for item in items]
+    return run
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def test_resume_replaces_failed_rows(batch, tmp_path):
+    a, b = batch.ids
+    output = tmp_path / "hints.jsonl"
+    output.write_text(json.dumps({"id": a, "hints": "Hint 1: old", "error": None}) + "\n"
+                      + json.dumps({"id": b, "hints": None, "error": "[LLM Error] timed out"}) + "\n")
+    assert batch(output, resume=True) == 0
+    rows = read_jsonl(output)
+    assert [row["id"] for row in rows] == [a, b]
+    assert rows[0]["hints"] == "Hint 1: old"
+    assert rows[1]["hints"] == "Hint 1: Isolate x." and not rows[1]["error"]
+
+
+def test_resume_rewrites_csv_once_per_item(batch, tmp_path):
+    a, b = batch.ids
+    output = tmp_path / "hints.csv"
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=hintify.BATCH_FIELDS)
+        writer.writeheader()
+        writer.writerow({"id": b, "error": "No text found"})
+        writer.writerow({"id": a, "hints": "Hint 1: old"})
+    assert batch(output, resume=True) == 0
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["id"] for row in rows] == [a, b]
+    assert rows[1]["hints"] == "Hint 1: Isolate x."
+
+
+def test_failing_hint_generation_is_recorded_not_fatal(batch, tmp_path, monkeypatch):
+    def boom(text, qtype, difficulty, args):
+        raise RuntimeError("provider exploded")
+
+    monkeypatch.setattr(hintify, "generate_hints", boom)
+    output = tmp_path / "hints.jsonl"
+    assert batch(output) == 2
+    assert all("provider exploded" in row["error"] for row in read_jsonl(output))
+
+
+def test_writer_is_closed_when_the_run_aborts(batch, tmp_path, monkeypatch):
+    closed = []
+
+    class Writer(hintify.BatchWriter):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    def classify(text):
+        raise RuntimeError("classifier broke")
+
+    monkeypatch.setattr(hintify, "BatchWriter", Writer)
+    monkeypatch.setattr(hintify, "classify_question", classify)
+    with pytest.raises(RuntimeError):
+        batch(tmp_path / "hints.jsonl")
+    assert closed == [True]
+
+
+class FakeEngine(hintify.OCREngine):
+    """Reads every image as the same question (module level so forked workers share it)."""
+
+    name = "fake"
+
+    def _recognize(self, image):
+        return "Solve x + 1 = 2\nfor x."
+
+    def _recognize_words(self, image):
+        return [[w, 10 * i, 0, 8, 8, 0] for i, w in enumerate("Solve x + 1 = 2 for x.".split())]
+
+
+def test_ocr_workers_leave_the_shared_cache_alone(tmp_path, monkeypatch, config):
+    from PIL import Image
+
+    config(ocr_cache=True, ocr_cache_images=True, hint_cache=False)
+    cache_dir = tmp_path / "ocr-cache"
+    monkeypatch.setattr(hintify, "OCR_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(hintify, "_ocr_cache", None)
+    monkeypatch.setattr(hintify, "_ocr_engine", FakeEngine())
+    items = []
+    for i in range(4):
+        path = tmp_path / f"q{i}.png"
+        Image.new("RGB", (40 + i, 20), "white").save(path)
+        items.append(hintify.BatchItem(str(path)))
+    monkeypatch.setattr(hintify, "collect_batch_items", lambda inputs: items)
+    monkeypatch.setattr(hintify, "ensure_tesseract_binary", lambda: True)
+    monkeypatch.setattr(hintify, "generate_hints", lambda text, qtype, difficulty, args: "Hint 1: Isolate x.")
+    output = tmp_path / "hints.jsonl"
+    args = types.SimpleNamespace(inputs=[], output=str(output), format=None, resume=False, ocr_processes=2, concurrency=2)
+    assert hintify.run_batch(args) == 0
+    rows = read_jsonl(output)
+    assert len(rows) == 4 and all(row["text"] == "Solve x + 1 = 2 for x." for row in rows)
+    # No worker wrote an index or left PNGs behind in the cache shared with the interactive app
+    assert not cache_dir.exists()
@@ -0,0 +1,64 @@
+import pytest
+from PIL import Image
+
+import hintify
+
+
+@pytest.fixture
+def clipboard(monkeypatch):
+    """Settable clipboard contents; returns a one-item list holding the current grab."""
+    current = [None]
+    monkeypatch.setattr(hintify, "grab_clipboard", lambda: current[0])
+    return current
+
+
+def test_unchanged_image_is_not_encoded_again(clipboard, monkeypatch):
+    stats = hintify.ClipboardStats()
+    encoded = []
+    encode = hintify.encode_clipboard_image
+    monkeypatch.setattr(hintify, "encode_clipboard_image", lambda grabbed: encoded.append(1) or encode(grabbed))
+    clipboard[0] = Image.new("RGB", (40, 20), "white")
+    fingerprint, image_bytes = hintify.poll_clipboard_change(None, stats)
+    assert image_bytes.startswith(b"\x89PNG")
+    assert hintify.poll_clipboard_change(fingerprint, stats) == (fingerprint, None)
+    assert (stats.ticks, stats.processed, stats.skipped, len(encoded)) == (2, 1, 1, 1)
+
+
+def test_a_single_changed_pixel_is_a_new_image(clipboard):
+    image = Image.new("RGB", (40, 20), "white")
+    clipboard[0] = image
+    fingerprint, _ = hintify.poll_clipboard_change(None, hintify.ClipboardStats())
+    image = image.copy()
+    image.putpixel((39, 19), (0, 0, 0))
+    clipboard[0] = image
+    changed, image_bytes = hintify.poll_clipboard_change(fingerprint, hintify.ClipboardStats())
+    assert changed != fingerprint and image_bytes
+
+
+def test_empty_clipboard_keeps_the_last_fingerprint(clipboard):
+    stats = hintify.ClipboardStats()
+    assert hintify.poll_clipboard_change("last", stats) == ("last", None)
+    clipboard[0] = ["/nonexistent/screenshot.png"]
+    assert hintify.poll_clipboard_change("last", stats) == ("last", None)
+    assert stats.empty == 2 and stats.processed == 0
+
+
+def test_failed_encode_is_retried(clipboard, monkeypatch):
+    stats = hintify.ClipboardStats()
+    clipboard[0] = Image.new("RGB", (40, 20), "white")
+    monkeypatch.setattr(hintify, "encode_clipboard_image", lambda grabbed: None)
+    assert hintify.poll_clipboard_change("last", stats) == ("last", None)
+    assert (stats.failed, stats.processed) == (1, 0)
+    monkeypatch.undo()
+    monkeypatch.setattr(hintify, "grab_clipboard", lambda: clipboard[0])
+    fingerprint, image_bytes = hintify.poll_clipboard_change("last", stats)
+    assert fingerprint != "last" and image_bytes
+    assert (stats.failed, stats.processed) == (1, 1)
+
+
+def test_file_lists_are_keyed_by_path_size_and_mtime(tmp_path):
+    path = tmp_path / "shot.png"
+    Image.new("RGB", (8, 8), "white").save(path)
+    fingerprint = hintify.clipboard_fingerprint([str(path)])
+    assert fingerprint.startswith(f"file:{path}:")
+    assert hintify.encode_clipboard_image([str(path)]).startswith(b"\x89PNG")
@@ -0,0 +1,112 @@
+import sys
+import types
+
+import pytest
+
+import hintify
+
+
+class FakeWatcher(hintify.ClipboardWatcher):
+    """Fires on every wait() and dies after `lives` of them, like wl-paste on an unsupported compositor."""
+
+    name = "fake"
+
+    def __init__(self, lives=2):
+        self.lives = lives
+        self.closed = False
+
+    def wait(self, timeout):
+        self.lives -= 1
+        if self.lives <= 0:
+            self.alive = False
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def named(name, fail=False):
+    def factory():
+        if fail:
+            raise RuntimeError(f"{name} unavailable")
+        watcher = FakeWatcher()
+        watcher.name = name
+        return watcher
+    return factory
+
+
+@pytest.fixture
+def linux(monkeypatch):
+    monkeypatch.setattr(hintify.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(hintify.shutil, "which", lambda tool: f"/usr/bin/{tool}")
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    monkeypatch.delenv("DISPLAY", raising=False)
+    for cls in ("WlPasteWatcher", "XFixesWatcher", "ClipnotifyWatcher"):
+        monkeypatch.setattr(hintify, cls, named(cls))
+    return monkeypatch
+
+
+def test_watcher_interface_is_abstract():
+    class NoWait(hintify.ClipboardWatcher):
+        pass
+
+    with pytest.raises(TypeError):
+        NoWait()
+
+
+def test_poll_mode_always_polls(linux):
+    linux.setenv("WAYLAND_DISPLAY", "wayland-0")
+    assert isinstance(hintify.create_clipboard_watcher("poll", 0.5), hintify.AdaptivePoller)
+
+
+def test_wayland_prefers_wl_paste(linux):
+    linux.setenv("WAYLAND_DISPLAY", "wayland-0")
+    linux.setenv("DISPLAY", ":0")
+    assert hintify.create_clipboard_watcher().name == "WlPasteWatcher"
+
+
+def test_x11_falls_through_unavailable_backends(linux):
+    linux.setenv("DISPLAY", ":0")
+    linux.setattr(hintify, "XFixesWatcher", named("XFixesWatcher", fail=True))
+    assert hintify.create_clipboard_watcher().name == "ClipnotifyWatcher"
+
+
+def test_no_backend_means_adaptive_polling(linux):
+    linux.setenv("DISPLAY", ":0")
+    linux.setattr(hintify, "XFixesWatcher", named("XFixesWatcher", fail=True))
+    linux.setattr(hintify.shutil, "which", lambda tool: None)
+    assert isinstance(hintify.create_clipboard_watcher(), hintify.AdaptivePoller)
+
+
+def test_macos_uses_the_pasteboard_change_count(monkeypatch):
+    monkeypatch.setattr(hintify.platform, "system", lambda: "Darwin")
+    counts = iter(range(100))
+    pasteboard = types.SimpleNamespace(changeCount=lambda: next(counts))
+    appkit = types.SimpleNamespace(NSPasteboard=types.SimpleNamespace(generalPasteboard=lambda: pasteboard))
+    monkeypatch.setitem(sys.modules, "AppKit", appkit)
+    watcher = hintify.create_clipboard_watcher()
+    assert watcher.name == "nspasteboard"
+    assert watcher.wait(1.0) is True
+
+
+def test_dead_watcher_falls_back_to_polling(monkeypatch):
+    watcher = FakeWatcher(lives=2)
+    monkeypatch.setattr(hintify, "create_clipboard_watcher", lambda mode, interval: watcher)
+    pollers = []
+
+    class Poller(hintify.AdaptivePoller):
+        def __init__(self, interval):
+            super().__init__(interval)
+            pollers.append(self)
+
+        def wait(self, timeout=None):
+            raise KeyboardInterrupt  # stop the monitor once it is polling
+
+    monkeypatch.setattr(hintify, "AdaptivePoller", Poller)
+    polls = []
+    pipeline = types.SimpleNamespace(poll_once=lambda: polls.append(1))
+    args = types.SimpleNamespace(poll_interval=0.5, clipboard_watch="auto")
+    hintify.monitor_clipboard(args, pipeline)
+    assert len(polls) == 2  # the watcher still drove captures until it died
+    assert len(pollers) == 1 and pollers[0].interval == 0.5
+    assert watcher.closed  # the dead watcher's helper process / thread is released
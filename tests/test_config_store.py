@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+import hintify
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A ConfigStore on its own file, without the background watcher thread."""
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"provider": "ollama"}))
+    store = hintify.ConfigStore(path=str(path), poll_seconds=0)
+    store.changes = []
+    store.subscribe(lambda new, old: store.changes.append((old.get("provider"), new.get("provider"))))
+    return store
+
+
+def edit(path, **values):
+    """Rewrite the file as another program would, making sure its mtime/size signature moves."""
+    data = json.loads(path.read_text())
+    data.update(values)
+    path.write_text(json.dumps(data, indent=4))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_external_edit_is_picked_up(store, tmp_path):
+    assert store.get()["provider"] == "ollama"
+    edit(tmp_path / "config.json", provider="gemini")
+    assert store.reload_if_changed() is True
+    assert store.get()["provider"] == "gemini"
+    assert store.get()["ocr_cache"] == hintify.DEFAULT_CONFIG["ocr_cache"]  # still merged with defaults
+
+
+def test_unchanged_file_is_not_reread(store, monkeypatch):
+    store.get()
+    monkeypatch.setattr(store, "_read", lambda path: pytest.fail("re-read an unchanged file"))
+    assert store.reload_if_changed() is False
+
+
+def test_subscribers_fire_once_per_change(store, tmp_path):
+    store.get()
+    cfg = dict(store.get(), provider="gemini")
+    store.save(cfg)
+    store.save(cfg)  # same content again: no change
+    assert store.reload_if_changed() is False  # our own save is not seen as an external edit
+    edit(tmp_path / "config.json", provider="ollama")
+    store.reload_if_changed()
+    edit(tmp_path / "config.json", theme="light")  # any key that changes notifies, once
+    store.reload_if_changed()
+    assert store.changes == [("ollama", "gemini"), ("gemini", "ollama"), ("ollama", "ollama")]
+
+
+def test_save_replaces_the_file_atomically(store, tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    assert store.save(dict(store.get(), provider="gemini"))
+    assert json.loads(path.read_text())["provider"] == "gemini"
+    assert not (tmp_path / "config.json.tmp").exists()
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(hintify.os, "replace", fail)
+    assert store.save(dict(store.get(), provider="ollama")) is False
+    assert json.loads(path.read_text())["provider"] == "gemini"  # the old file is intact
+    assert store.get()["provider"] == "gemini"
+    assert store.changes == [("ollama", "gemini")]
+
+
+class FakeCache:
+    def __init__(self):
+        self.flushed = 0
+
+    def flush(self):
+        self.flushed += 1
+
+
+@pytest.fixture
+def singletons(monkeypatch):
+    caches = {"_ocr_cache": FakeCache(), "_hint_cache": FakeCache(), "_ocr_engine": object()}
+    for name, value in caches.items():
+        monkeypatch.setattr(hintify, name, value)
+    return caches
+
+
+def change(**values):
+    old = dict(hintify.DEFAULT_CONFIG)
+    hintify._on_config_change(dict(old, **values), old)
+
+
+def test_unrelated_change_keeps_caches_and_engine(singletons):
+    change(theme="light", provider="gemini")
+    for name, value in singletons.items():
+        assert getattr(hintify, name) is value
+    assert singletons["_ocr_cache"].flushed == singletons["_hint_cache"].flushed == 0
+
+
+def test_ocr_cache_change_drops_only_the_ocr_cache(singletons):
+    change(ocr_cache_mb=8)
+    assert hintify._ocr_cache is None and singletons["_ocr_cache"].flushed == 1
+    assert hintify._hint_cache is singletons["_hint_cache"]
+    assert hintify._ocr_engine is None  # every ocr_* key also rebuilds the engine
+
+
+def test_hint_cache_change_drops_only_the_hint_cache(singletons):
+    change(hint_cache_size=16)
+    assert hintify._hint_cache is None and singletons["_hint_cache"].flushed == 1
+    assert hintify._ocr_cache is singletons["_ocr_cache"]
+    assert hintify._ocr_engine is singletons["_ocr_engine"]
+
+
+def test_ocr_setting_change_keeps_the_ocr_cache(singletons):
+    change(ocr_psm=6)
+    assert hintify._ocr_engine is None
+    assert hintify._ocr_cache is singletons["_ocr_cache"]
@@ -0,0 +1,59 @@
+import pytest
+import requests
+
+import hintify
+from conftest import RESPONSE, posts
+
+
+def gemini(mock, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    return hintify.GeminiClient(api_base=f"{mock.url}/v1beta", **kwargs)
+
+
+def test_gemini_generate_and_stream_share_one_connection(mock):
+    client = gemini(mock)
+    assert client.generate("q", "gemini-x", "key") == RESPONSE
+    assert "".join(client.generate_stream("q", "gemini-x", "key")) == RESPONSE
+    assert client.requests == 2 and client.retries == 0
+    assert len(mock.connections) == 1
+    assert client.latency.count == 2
+
+
+def test_gemini_retries_429_and_5xx(mock):
+    mock.fail_statuses = [429, 503]
+    client = gemini(mock)
+    assert client.generate("q", "gemini-x", "key") == RESPONSE
+    assert client.retries == 2
+    assert len(posts(mock, ":generateContent")) == 3
+
+
+def test_gemini_gives_up_after_max_retries(mock):
+    mock.fail_statuses = [503] * 5
+    client = gemini(mock, max_retries=2)
+    with pytest.raises(requests.HTTPError, match="503"):
+        client.generate("q", "gemini-x", "key")
+    assert client.retries == 2
+    assert len(posts(mock, ":generateContent")) == 3
+
+
+def test_gemini_remembers_a_working_fallback(mock):
+    mock.missing_models = {"gemini-old"}
+    client = gemini(mock, fallback_model="gemini-new")
+    assert client.generate("q", "gemini-old", "key") == RESPONSE
+    assert client.fallbacks == {"gemini-old": "gemini-new"}
+    assert "".join(client.generate_stream("q", "gemini-old", "key")) == RESPONSE
+    # The second call went straight to the fallback: no new request for the missing model
+    assert [path.split("/models/")[1].split(":")[0] for _, path, _ in mock.requests] == ["gemini-old", "gemini-new", "gemini-new"]
+
+
+def test_gemini_missing_fallback_is_not_remembered(mock):
+    mock.missing_models = {"gemini-old", "gemini-new"}
+    client = gemini(mock, fallback_model="gemini-new")
+    with pytest.raises(requests.HTTPError, match="404"):
+        client.generate("q", "gemini-old", "key")
+    assert client.fallbacks == {}
+
+
+def test_gemini_sends_output_cap(mock):
+    gemini(mock).generate("q", "gemini-x", "key", max_tokens=64)
+    assert posts(mock, ":generateContent")[0]["generationConfig"] == {"maxOutputTokens": 64}
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+import hintify
+from hintify import hint_cache_key, normalize_question_text
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Solve for x: 3x + 5 = 20", "solve for x:3x+5=20"),
+    ("  What is 2 + 2 ?", "What is 2+2"),
+    ("Find f’(x) if f(x)=x^2", "Find f'(x) if f(x)=x^2"),  # smart quote from OCR
+    ("“Solve x+1=3.”", "solve x + 1 = 3"),
+    ("• Find the mean", "Find the mean"),
+])
+def test_ocr_variants_share_a_key(a, b):
+    assert normalize_question_text(a) == normalize_question_text(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Find f'(x) if f(x)=x^2", "Find f(x) if f(x)=x^2"),
+    ("Solve |x-3| = 5", "Solve x-3 = 5"),
+    ("Evaluate 5!", "Evaluate 5"),
+    ("Find 1.5 + 2", "Find 15 + 2"),
+    ("Simplify x_1 + x_2", "Simplify x1 + x2"),
+    ("Find f(x, y)", "Find f(xy)"),
+])
+def test_different_maths_gets_different_keys(a, b):
+    assert normalize_question_text(a) != normalize_question_text(b)
+    assert hint_cache_key(a, "ollama", "m") != hint_cache_key(b, "ollama", "m")
+    assert hintify.question_key(a) != hintify.question_key(b)
+
+
+def test_hint_cache_round_trip(tmp_path):
+    cache = hintify.HintCache(path=str(tmp_path / "hints.json"))
+    key = hint_cache_key("What is 2+2?", "ollama", "m")
+    cache.put(key, "Hint 1: count")
+    assert cache.get(key) == "Hint 1: count"
+    cache.flush()
+    assert hintify.HintCache(path=str(tmp_path / "hints.json")).get(key) == "Hint 1: count"
+    assert cache.get(hint_cache_key("What is 2+2?", "ollama", "other")) is None
+
+
+def test_puts_are_written_once_per_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(hintify.HintCache, "SAVE_DELAY", 0.1)
+    path = tmp_path / "hints.json"
+    cache = hintify.HintCache(path=str(path))
+    writes = []
+    save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda snapshot: (writes.append(len(snapshot)), save(snapshot)))
+    for i in range(20):
+        cache.put(f"k{i}", f"Hint 1: {i}")
+    assert not path.exists()  # nothing written on the hint-generation path
+    deadline = time.time() + 5
+    while not writes and time.time() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.2)
+    assert writes == [20]
+    assert hintify.HintCache(path=str(path)).get("k19") == "Hint 1: 19"
+
+
+def test_concurrent_callers_share_one_hint_cache(monkeypatch):
+    class SlowCache(hintify.HintCache):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(hintify, "HintCache", SlowCache)
+    monkeypatch.setattr(hintify, "_hint_cache", None)
+    start = threading.Barrier(8)
+    found = []
+
+    def lookup():
+        start.wait()
+        found.append(hintify.get_hint_cache({"hint_cache": True}))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in found}) == 1
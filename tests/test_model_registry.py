@@ -0,0 +1,46 @@
+import time
+
+import hintify
+
+
+def registry(monkeypatch, results, **kwargs):
+    reg = hintify.OllamaModelRegistry(**kwargs)
+    monkeypatch.setattr(reg, "_fetch", lambda: results[0])
+    return reg
+
+
+def test_failed_fetch_is_retried_after_the_negative_ttl(monkeypatch):
+    results = [(False, None)]
+    reg = registry(monkeypatch, results, ttl=300, negative_ttl=0.05)
+    assert not reg.available()
+    results[0] = (True, ["llama3.2:3b"])  # the server comes up
+    assert not reg.available()  # still within negative_ttl
+    time.sleep(0.06)
+    assert reg.available()
+    assert reg.has("llama3.2:3b")
+
+
+def test_good_inventory_is_kept_for_the_ttl(monkeypatch):
+    results = [(True, ["llama3.2:3b"])]
+    reg = registry(monkeypatch, results, ttl=300, negative_ttl=0)
+    assert reg.has("llama3.2:3b")
+    results[0] = (False, None)
+    assert reg.available() and reg.refreshes == 1
+
+
+def test_warm_targets_follow_routing(config, monkeypatch):
+    monkeypatch.setattr(hintify.model_registry, "has", lambda model: model == "small:1b")
+    cfg = config()
+    assert hintify.warm_targets("big:7b", cfg) == [("big:7b", hintify.SYSTEM_PROMPT)]
+    cfg = config(prompt_template_easy="short", ollama_model_easy="small:1b", ollama_model_hard="huge:70b")
+    assert hintify.warm_targets("big:7b", cfg) == [("small:1b", hintify.SHORT_SYSTEM_PROMPT), ("big:7b", hintify.SYSTEM_PROMPT)]
+    assert hintify.warm_targets("big:7b", config(routing=False, prompt_template_easy="short")) == [("big:7b", hintify.SYSTEM_PROMPT)]
+
+
+def test_prewarm_sends_the_routed_prefix(config, mock, monkeypatch):
+    monkeypatch.setenv("OLLAMA_HOST", mock.url)
+    monkeypatch.setattr(hintify, "_ollama_client", None)
+    monkeypatch.setattr(hintify, "model_registry", hintify.OllamaModelRegistry())
+    assert hintify.prepare_ollama_model("llama3.2:3b", cfg=config(prompt_template_easy="short"))
+    systems = [body["messages"][0]["content"] for _, path, body in mock.requests if path == "/api/chat"]
+    assert systems == [hintify.SHORT_SYSTEM_PROMPT, hintify.SYSTEM_PROMPT]
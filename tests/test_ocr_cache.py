@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image, ImageDraw
+
+import hintify
+
+
+def page(words, size=(900, 400)):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(range(0, len(words), 8)):
+        draw.text((20, 20 + 24 * i), " ".join(words[line:line + 8]), fill="black")
+    return image
+
+
+WORDS = [f"word{i}x{i * 7 % 13}" for i in range(80)]
+BOXES = [["Find", 20, 20, 40, 12, 0], ["x", 100, 200, 10, 12, 1]]
+
+
+def wait_for_writes():
+    for t in threading.enumerate():
+        if t.name == "hintify-ocr-cache":
+            t.join()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(hintify.OCRCache, "SAVE_DELAY", 0.01)
+    return hintify.OCRCache(path=str(tmp_path / "ocr"))
+
+
+def test_exact_and_crop_hits(cache):
+    image = page(WORDS)
+    cache.put(image, "fp", "s", "Find x", BOXES)
+    wait_for_writes()
+    assert cache.get(image, "fp", "s") == ("Find x", BOXES)
+    text, words = cache.get(image.crop((80, 180, 400, 300)), "crop", "s")
+    assert words == [["x", 20, 20, 10, 12, 1]]
+    assert cache.region_hits == 1
+
+
+def test_uncached_crop_is_rejected_without_decoding(cache, monkeypatch):
+    cache.put(page(WORDS), "fp", "s", "Find x", BOXES)
+    wait_for_writes()
+    cache._images.clear()  # as after a restart: nothing decoded
+    decoded = []
+    monkeypatch.setattr(cache, "_gray", lambda key: decoded.append(key))
+    assert cache.get(page(list(reversed(WORDS))).crop((0, 0, 600, 200)), "other", "s") is None
+    assert decoded == []
+
+
+def test_signature_admits_every_crop():
+    gray = page(WORDS).convert("L")
+    signature = hintify.InkSignature.of(gray)
+    for box in [(0, 0, 300, 60), (13, 7, 517, 211), (101, 33, 899, 399), (250, 150, 420, 190)]:
+        phases = hintify.InkSignature.crop_phases(gray.crop(box), {signature.background})
+        assert signature.may_contain(phases), box
+
+
+def test_text_only_cache_answers_crops_from_memory(tmp_path):
+    cache = hintify.OCRCache(path=str(tmp_path / "ocr"), keep_images=False)
+    image = page(WORDS)
+    cache.put(image, "fp", "s", "Find x", BOXES)
+    cache.flush()
+    assert cache.get(image, "fp", "s") == ("Find x", BOXES)
+    assert cache.get(image.crop((80, 180, 400, 300)), "crop", "s")[1] == [["x", 20, 20, 10, 12, 1]]
+    cache.flush()
+    assert not [f for f in os.listdir(tmp_path / "ocr") if f.endswith(".png")]
+    # After a restart only the text is left: exact repeats hit, crops do not
+    restarted = hintify.OCRCache(path=str(tmp_path / "ocr"), keep_images=False)
+    assert restarted.get(image, "fp", "s") == ("Find x", BOXES)
+    assert restarted.get(image.crop((80, 180, 420, 300)), "crop2", "s") is None
+
+
+def test_memory_store_is_bounded(tmp_path):
+    cache = hintify.OCRCache(path=str(tmp_path / "ocr"), keep_images=False)
+    for i in range(cache.MEMORY_IMAGES + 3):
+        cache.put(page(WORDS[i:]), f"fp{i}", "s", "t", BOXES)
+    assert len(cache._images) == cache.MEMORY_IMAGES
+    assert cache.get(page(WORDS).crop((0, 0, 300, 60)), "oldest", "s") is None
+
+
+def test_index_writes_are_batched(cache, monkeypatch):
+    saves = []
+    save = cache._save
+    monkeypatch.setattr(cache, "SAVE_DELAY", 0.2)
+    monkeypatch.setattr(cache, "_save", lambda snapshot: (saves.append(len(snapshot)), save(snapshot)))
+    for i in range(5):
+        cache.put(page(WORDS[i:]), f"fp{i}", "s", "t", BOXES)
+    wait_for_writes()
+    cache._save_timer.join()
+    assert saves == [5]
+    with open(os.path.join(cache.path, "index.json"), encoding="utf-8") as f:
+        assert len(json.load(f)) == 5
+
+
+def test_concurrent_callers_share_one_cache(tmp_path, monkeypatch):
+    class SlowCache(hintify.OCRCache):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)  # widen the window between the None check and the assignment
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(hintify, "OCRCache", SlowCache)
+    monkeypatch.setattr(hintify, "OCR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(hintify, "_ocr_cache", None)
+    start = threading.Barrier(8)
+    found = []
+
+    def lookup():
+        start.wait()
+        found.append(hintify.get_ocr_cache({"ocr_cache": True}))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in found}) == 1
+
+
+def test_screenshots_are_not_stored_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(hintify, "OCR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(hintify, "_ocr_cache", None)
+    assert hintify.get_ocr_cache(dict(hintify.DEFAULT_CONFIG)).keep_images is False
+
+
+def test_default_cache_answers_crops(tmp_path, monkeypatch, config):
+    class Engine(hintify.OCREngine):
+        name = "boxes"
+        calls = 0
+
+        def _recognize(self, image):
+            raise AssertionError("the cache path reads word boxes")
+
+        def _recognize_words(self, image):
+            Engine.calls += 1
+            return BOXES
+
+    monkeypatch.setattr(hintify, "OCR_CACHE_DIR", str(tmp_path / "ocr"))
+    monkeypatch.setattr(hintify, "_ocr_cache", None)
+    engine, image = Engine(), page(WORDS)
+    assert hintify.recognize_image(image, engine)[1] == BOXES
+    text, words = hintify.recognize_image(image.crop((80, 180, 400, 300)), engine)
+    assert (text, words, Engine.calls) == ("x", [["x", 20, 20, 10, 12, 1]], 1)
+    hintify.get_ocr_cache(hintify.load_config()).flush()
+    assert not [f for f in os.listdir(tmp_path / "ocr") if f.endswith(".png")]
@@ -0,0 +1,166 @@
+import threading
+import types
+
+import pytest
+
+import hintify
+
+
+class FakeAPI:
+    fail = 0
+
+    def __init__(self, **kwargs):
+        if FakeAPI.fail:
+            FakeAPI.fail -= 1
+            raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+        self.kwargs = kwargs
+
+    def SetImage(self, image):
+        self.image = image
+
+    def GetUTF8Text(self):
+        return "text"
+
+    def Clear(self):
+        pass
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setitem(__import__("sys").modules, "tesserocr", types.SimpleNamespace(PyTessBaseAPI=FakeAPI))
+    FakeAPI.fail = 0
+    return hintify.TesserocrEngine(workers=2)
+
+
+def test_failed_construction_does_not_use_up_a_worker_slot(engine):
+    FakeAPI.fail = 5
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            engine._recognize(object())
+    assert engine._created == 0
+
+    done = threading.Event()
+    result = []
+    threading.Thread(target=lambda: (result.append(engine._recognize(object())), done.set()), daemon=True).start()
+    assert done.wait(2), "OCR blocked waiting for an idle API that was never built"
+    assert result == ["text"]
+
+
+def test_apis_are_reused_up_to_workers(engine):
+    for _ in range(4):
+        engine._recognize(object())
+    assert engine._created == 1
+
+
+def test_engine_interface_is_abstract():
+    class TextOnly(hintify.OCREngine):
+        def _recognize(self, image):
+            return ""
+
+    with pytest.raises(TypeError):
+        TextOnly()
+
+
+def test_preprocessing_is_opt_in():
+    assert hintify.ocr_preprocess_options(hintify.DEFAULT_CONFIG) is None
+    options = hintify.ocr_preprocess_options(dict(hintify.DEFAULT_CONFIG, ocr_preprocess=True))
+    assert options["ocr_grayscale"] and options["ocr_autocrop"]
+
+
+class LayoutEngine(hintify.OCREngine):
+    """Plain text and word boxes that disagree, to tell which one a caller used."""
+
+    name = "layout"
+
+    def _recognize(self, image):
+        return "Solve   2x+3=7\n\nfor x."
+
+    def _recognize_words(self, image):
+        return [["word-join", 0, 0, 10, 10, 0]]
+
+
+def test_without_the_cache_text_comes_from_plain_text_ocr(config):
+    from PIL import Image
+
+    config(ocr_cache=False)
+    text, words = hintify.recognize_image(Image.new("L", (40, 20), 255), LayoutEngine())
+    assert (text, words) == ("Solve 2x+3=7\n\nfor x.", None)
+    assert hintify._clean_ocr_text(text) == "Solve 2x+3=7 for x."
+
+
+# image_to_data rows for "1. Solve 2x+3=7" / "for x." (one paragraph) and "2. Find y" (another block)
+TESSERACT_ROWS = [
+    # block, par, line, text, left, top
+    (1, 1, 1, "1.", 10, 10), (1, 1, 1, "Solve", 30, 10), (1, 1, 1, "2x+3=7", 90, 10),
+    (1, 1, 2, "for", 30, 30), (1, 1, 2, "x.", 60, 30),
+    (2, 1, 1, "2.", 10, 90), (2, 1, 1, "Find", 30, 90), (2, 1, 1, "y", 80, 90),
+]
+
+
+@pytest.fixture
+def tesseract(monkeypatch):
+    def image_to_data(image, lang=None, config=None, output_type=None):
+        columns = list(zip(*TESSERACT_ROWS))
+        return {"block_num": columns[0], "par_num": columns[1], "line_num": columns[2], "text": columns[3],
+                "left": columns[4], "top": columns[5], "width": [16] * len(TESSERACT_ROWS), "height": [12] * len(TESSERACT_ROWS)}
+
+    def image_to_string(image, lang=None, config=None):
+        return "1. Solve  2x+3=7\nfor x.\n\n2. Find y\n\x0c"
+
+    monkeypatch.setattr(hintify, "pytesseract", types.SimpleNamespace(
+        image_to_data=image_to_data, image_to_string=image_to_string, Output=types.SimpleNamespace(DICT="dict")))
+    return hintify.TesseractCLIEngine()
+
+
+def test_cached_and_uncached_text_keep_the_same_lines(tesseract, tmp_path, monkeypatch, config):
+    from PIL import Image
+
+    monkeypatch.setattr(hintify, "_ocr_cache", hintify.OCRCache(path=str(tmp_path / "ocr")))
+    image = Image.new("L", (200, 120), 255)
+    config(ocr_cache=False)
+    uncached = hintify.recognize_image(image, tesseract)[0]
+    config(ocr_cache=True)
+    cached, words = hintify.recognize_image(image, tesseract)
+    assert uncached == cached == "1. Solve 2x+3=7\nfor x.\n\n2. Find y"
+    assert hintify.recognize_image(image, tesseract)[0] == cached  # exact hit
+    assert [label for label, _ in hintify.split_questions(cached, words)] == ["1", "2"]
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_extracted_text_is_collapsed_to_one_line(tesseract, tmp_path, monkeypatch, config, use_cache):
+    from io import BytesIO
+
+    from PIL import Image
+
+    monkeypatch.setattr(hintify, "_ocr_cache", hintify.OCRCache(path=str(tmp_path / "ocr")))
+    monkeypatch.setattr(hintify, "_ocr_engine", tesseract)
+    config(ocr_cache=use_cache)
+    buf = BytesIO()
+    Image.new("L", (200, 120), 255).save(buf, format="PNG")
+    text = hintify.extract_text_from_image(buf.getvalue())
+    baseline = "1. Solve 2x+3=7 for x. 2. Find y"  # re.sub(r"\s+", " ", image_to_string(...)).strip()
+    assert text == baseline
+    assert hintify.detect_difficulty(text) == hintify.detect_difficulty(baseline)
+
+
+def test_text_rebuilt_from_words_keeps_lines_and_gaps():
+    words = [["Solve", 0, 0, 30, 10, 0], ["x+1=2", 40, 0, 30, 10, 0], ["for", 0, 14, 20, 10, 1], ["x.", 25, 14, 10, 10, 1],
+             ["Find", 0, 80, 30, 10, 2], ["y", 40, 80, 10, 10, 2]]
+    assert hintify.ocr_text_from_words(words) == "Solve x+1=2\nfor x.\n\nFind y"
+
+
+def test_cli_fallback_is_reported_once(monkeypatch, capsys):
+    monkeypatch.setattr(hintify, "_ocr_fallback_reported", False)
+    monkeypatch.setattr(hintify.importlib.util, "find_spec", lambda name: None)
+    monkeypatch.setitem(__import__("sys").modules, "tesserocr", None)
+    cfg = dict(hintify.DEFAULT_CONFIG)
+    assert isinstance(hintify.create_ocr_engine(cfg), hintify.TesseractCLIEngine)
+    hintify.report_ocr_engine(cfg)
+    assert capsys.readouterr().out.count("hintify[ocr]") == 1
+
+
+def test_no_fallback_notice_when_the_cli_is_chosen(monkeypatch, capsys):
+    monkeypatch.setattr(hintify, "_ocr_fallback_reported", False)
+    monkeypatch.setattr(hintify.importlib.util, "find_spec", lambda name: None)
+    hintify.report_ocr_engine(dict(hintify.DEFAULT_CONFIG, ocr_engine="tesseract"))
+    assert capsys.readouterr().out == ""
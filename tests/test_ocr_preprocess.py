@@ -0,0 +1,93 @@
+import pytest
+from PIL import Image, ImageDraw
+
+import hintify
+
+OPTIONS = hintify.ocr_preprocess_options(dict(hintify.DEFAULT_CONFIG, ocr_preprocess=True))
+# Three "text lines" of 80 px ink, twice the default target line height, in a mostly empty screenshot
+LINES = [(300, 200, 900, 280), (300, 330, 800, 410), (300, 460, 850, 540)]
+
+
+def screenshot(background="white", ink="black", size=(1400, 900), mode="RGB"):
+    image = Image.new(mode, size, background)
+    draw = ImageDraw.Draw(image)
+    for box in LINES:
+        draw.rectangle(box, fill=ink)
+    return image
+
+
+def ink_box(image):
+    """Bounding box of the dark pixels of a preprocessed (dark-on-light) image."""
+    return image.point(lambda v: 255 if v < 128 else 0).getbbox()
+
+
+def to_input(point, transform):
+    left, top, sx, sy = transform
+    return left + point[0] / sx, top + point[1] / sy
+
+
+def test_crops_to_the_text_and_shrinks_oversized_lines():
+    image = screenshot()
+    out, transform = hintify.preprocess_for_ocr(image, OPTIONS, with_transform=True)
+    assert out.mode == "L"
+    assert out.width * out.height < image.width * image.height / 4
+    left, top, sx, sy = transform
+    assert (left, top) == (300 - 12, 200 - 12)
+    assert sx == pytest.approx(0.5, abs=0.02) and sy == pytest.approx(0.5, abs=0.02)
+
+
+def test_transform_maps_output_pixels_back_to_the_input():
+    out, transform = hintify.preprocess_for_ocr(screenshot(), OPTIONS, with_transform=True)
+    x1, y1, x2, y2 = ink_box(out)
+    assert to_input((x1, y1), transform) == pytest.approx((300, 200), abs=3)
+    assert to_input((x2, y2), transform) == pytest.approx((901, 541), abs=3)
+
+
+def test_dark_theme_is_inverted_to_dark_on_light():
+    out = hintify.preprocess_for_ocr(screenshot(background="black", ink="white"), OPTIONS)
+    assert out.getpixel((0, 0)) > 200
+    assert ink_box(out) is not None
+
+
+def test_text_at_the_target_height_is_not_resampled():
+    small = dict(OPTIONS, ocr_target_line_height=80)
+    out, (_, _, sx, sy) = hintify.preprocess_for_ocr(screenshot(), small, with_transform=True)
+    assert (sx, sy) == (1.0, 1.0)
+
+
+def test_pixel_cap_applies_after_cropping():
+    capped = dict(OPTIONS, ocr_downscale=False, ocr_max_pixels=40_000)
+    out = hintify.preprocess_for_ocr(screenshot(), capped)
+    assert out.width * out.height <= 40_000
+
+
+def test_colour_output_keeps_the_mode():
+    out = hintify.preprocess_for_ocr(screenshot(), dict(OPTIONS, ocr_grayscale=False))
+    assert out.mode == "RGB" and out.width < 1400
+
+
+def test_binarized_output_is_two_tone():
+    out = hintify.preprocess_for_ocr(screenshot(), dict(OPTIONS, ocr_binarize=True))
+    assert {v for v, n in enumerate(out.histogram()) if n} <= {0, 255}
+
+
+class InkEngine(hintify.OCREngine):
+    """Reports one word covering the ink of the image it is given."""
+
+    name = "ink"
+
+    def _recognize(self, image):
+        return "word"
+
+    def _recognize_words(self, image):
+        self.seen = image.size
+        x1, y1, x2, y2 = ink_box(image)
+        return [["word", x1, y1, x2 - x1, y2 - y1, 0]]
+
+
+def test_word_boxes_come_back_in_screenshot_coordinates():
+    engine = InkEngine(preprocess=OPTIONS)
+    [[_, x, y, w, h, _]] = engine.recognize_words(screenshot())
+    assert engine.seen[0] < 700
+    assert (x, y, x + w, y + h) == pytest.approx((300, 200, 901, 541), abs=3)
+    assert engine.preprocess_latency.count == 1
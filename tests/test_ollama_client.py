@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+import hintify
+from conftest import RESPONSE, posts
+
+
+def test_ollama_generate_stream_and_chat(mock):
+    client = hintify.OllamaClient(host=mock.url, keep_alive="10m")
+    assert client.is_available()
+    assert client.list_models() == ["llama3.2:3b"]
+    assert client.generate("q", "llama3.2:3b") == RESPONSE
+    assert "".join(client.generate_stream("q", "llama3.2:3b", system="sys")) == RESPONSE
+    generate, chat = posts(mock, "/api/generate")[0], posts(mock, "/api/chat")[0]
+    assert generate["prompt"] == "q" and generate["keep_alive"] == "10m" and generate["stream"] is False
+    assert chat["messages"] == [{"role": "system", "content": "sys"}, {"role": "user", "content": "q"}]
+    assert client.requests == 2 and client.eval_tokens > 0
+    assert len(mock.connections) == 1
+
+
+def test_ollama_pull_and_options(mock):
+    client = hintify.OllamaClient(host=mock.url)
+    client.pull("granite:2b")
+    assert "granite:2b" in client.list_models()
+    # num_predict is passed through; the mock truncates at about 4 characters per token
+    assert client.generate("q", "llama3.2:3b", options={"num_predict": 2}) == RESPONSE[:8].strip()
+
+
+def test_ollama_unreachable_host():
+    client = hintify.OllamaClient(host="127.0.0.1:9", connect_timeout=0.5)
+    assert not client.is_available(timeout=0.5)
+    with pytest.raises(requests.ConnectionError):
+        client.generate("q", "llama3.2:3b")
+
+
+def test_normalize_ollama_host():
+    assert hintify.normalize_ollama_host("127.0.0.1") == "http://127.0.0.1:11434"
+    assert hintify.normalize_ollama_host("https://ollama.example.com") == "https://ollama.example.com"
+
+
+def test_async_stream_uses_the_pooled_session(mock):
+    client = hintify.OllamaClient(host=mock.url)
+
+    async def collect():
+        return "".join([chunk async for chunk in client.agenerate_stream("q", "llama3.2:3b", system="sys")])
+
+    assert hintify.asyncio.run(collect()) == RESPONSE
+    assert hintify.asyncio.run(collect()) == RESPONSE
+    assert len(mock.connections) == 1
+
+
+def test_cancelling_the_async_stream_closes_the_response():
+    import threading
+    import time
+
+    from mock_llm import MockLLMServer
+
+    with MockLLMServer(responses=["Hint 1: a\nHint 2: b\nHint 3: c"], chunk_size=10, chunk_delay=1.0) as slow:
+        client = hintify.OllamaClient(host=slow.url)
+
+        async def first_chunk_then_cancel():
+            stream = client.agenerate_stream("q", "llama3.2:3b")
+            await stream.__anext__()
+            await stream.aclose()
+
+        hintify.asyncio.run(first_chunk_then_cancel())
+        started = time.perf_counter()
+        for t in threading.enumerate():
+            if t.name == "hintify-stream":
+                t.join(2)
+        # The worker was unblocked by closing the response, not by the next chunk a second later
+        assert time.perf_counter() - started < 0.5
@@ -0,0 +1,191 @@
+import asyncio
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import hintify
+
+
+@pytest.fixture
+def pipeline(config, monkeypatch):
+    """A started HintPipeline whose generations answer with the config's ollama_model."""
+    config(hint_cache=False, ollama_prewarm=False, split_questions=False, coalesce_grace=5.0, ollama_model="llama3.2:3b")
+    calls = []
+    gate = threading.Event()
+    gate.set()
+
+    async def fake_generate(text, qtype, difficulty, args, on_line=None):
+        calls.append(text)
+        while not gate.is_set():
+            await asyncio.sleep(0.01)
+        hintify.record_span("llm", 0.5)
+        return f"Hint 1: ask {hintify.load_config()['ollama_model']}"
+
+    monkeypatch.setattr(hintify, "generate_hints_async", fake_generate)
+    args = types.SimpleNamespace(ollama_model="m", provider_strategy=None, stream=False, server=None)
+    p = hintify.HintPipeline(args).start()
+    p.calls, p.gate = calls, gate
+    yield p
+    p.loop.call_soon_threadsafe(p.loop.stop)
+
+
+def next_result(p, timeout=5):
+    return p.results.get(timeout=timeout)
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_recent_answer_is_reused_for_the_same_settings(pipeline):
+    pipeline.submit_text("Solve 2x+3=7 for x.")
+    assert next_result(pipeline) == "Hint 1: ask llama3.2:3b"
+    pipeline.submit_text("Solve 2x+3=7 for x.")
+    assert next_result(pipeline) == "Hint 1: ask llama3.2:3b"
+    assert len(pipeline.calls) == 1
+
+
+class LockedStats(dict):
+    """Pipeline stats that note every update made without the pipeline's lock held."""
+
+    def __init__(self, stats, lock):
+        super().__init__(stats)
+        self.lock = lock
+        self.unlocked = []
+
+    def __setitem__(self, key, value):
+        if not self.lock.locked():
+            self.unlocked.append((key, threading.current_thread().name))
+        super().__setitem__(key, value)
+
+
+def test_stats_are_only_updated_under_the_lock(pipeline):
+    pipeline.stats = LockedStats(pipeline.stats, pipeline._lock)
+    for _ in range(2):
+        pipeline.submit_text("Solve 2x+3=7 for x.")
+        assert next_result(pipeline) == "Hint 1: ask llama3.2:3b"
+    wait_for(lambda: pipeline.stats["completed"] == 2)
+    assert pipeline.stats.unlocked == []
+    assert pipeline.stats["submitted"] == 2 and pipeline.stats["coalesced"] == 1
+    assert "completed=2" in pipeline.summary()
+
+
+def test_recent_answer_is_not_reused_after_switching_model(pipeline, config):
+    pipeline.submit_text("Solve 2x+3=7 for x.")
+    assert next_result(pipeline) == "Hint 1: ask llama3.2:3b"
+    config(hint_cache=False, ollama_prewarm=False, split_questions=False, ollama_model="qwen2.5:7b")
+    pipeline.submit_text("Solve 2x+3=7 for x.")
+    assert next_result(pipeline) == "Hint 1: ask qwen2.5:7b"
+    assert len(pipeline.calls) == 2
+
+
+def test_adopted_generation_traces_into_the_adopting_job(pipeline, monkeypatch):
+    emitted = []
+    original = hintify.tracer.emit
+    monkeypatch.setattr(hintify.tracer, "emit", lambda trace, spans, **kw: (emitted.append((trace.job_id, spans)), original(trace, spans, **kw)))
+    pipeline.gate.clear()
+    first = pipeline.submit_text("Solve 2x+3=7 for x.")
+    wait_for(lambda: pipeline.calls)
+    second = pipeline.submit_text("Solve 2x+3=7 for x.")  # supersedes the first job and adopts its generation
+    wait_for(lambda: first.trace.status == "cancelled")
+    pipeline.gate.set()
+    assert next_result(pipeline).job_id == second.job_id
+    wait_for(lambda: second.trace.status == "ok")
+    llm_jobs = [job_id for job_id, spans in emitted for span in spans if span[0] == "llm"]
+    assert llm_jobs == [second.job_id]
+    assert len(pipeline.calls) == 1
+
+
+def test_callback_registered_after_cancel_runs_once():
+    job = hintify.HintJob(1, text="x")
+    calls = []
+    job.on_cancel(lambda: calls.append("early"))
+    job.cancel()
+    job.on_cancel(lambda: calls.append("late"))
+    job.cancel()
+    assert calls == ["early", "late"]
+
+
+def test_callbacks_racing_cancel_each_run_exactly_once():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible to hit the window
+    try:
+        race_cancel()
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def race_cancel():
+    for attempt in range(200):
+        job = hintify.HintJob(attempt, text="x")
+        calls = []
+        start = threading.Barrier(2)
+
+        def register():
+            start.wait()
+            for i in range(200):
+                job.on_cancel(lambda i=i: calls.append(i))
+
+        thread = threading.Thread(target=register)
+        thread.start()
+        start.wait()
+        job.cancel()
+        thread.join()
+        assert sorted(calls) == list(range(200))
+
+
+@pytest.fixture
+def slow_ollama(config, monkeypatch):
+    """A pipeline generating for real against a stub Ollama that streams one chunk every 0.2 s."""
+    from mock_llm import MockLLMServer
+
+    config(hint_cache=False, ollama_prewarm=False, split_questions=False, coalesce_grace=0, ollama_model="llama3.2:3b")
+    with MockLLMServer(responses=["Hint 1: Move the constant.\nHint 2: Divide by 3.\nHint 3: Check it."],
+                       chunk_size=10, chunk_delay=0.2, models=["llama3.2:3b"]) as server:
+        monkeypatch.setenv("OLLAMA_HOST", server.url)
+        monkeypatch.setattr(hintify, "_ollama_client", None)
+        monkeypatch.setattr(hintify, "model_registry", hintify.OllamaModelRegistry())
+        args = types.SimpleNamespace(ollama_model="llama3.2:3b", provider_strategy=None, stream=False, server=None)
+        p = hintify.HintPipeline(args).start()
+        p.mock = server
+        yield p
+        p.loop.call_soon_threadsafe(p.loop.stop)
+
+
+def test_new_question_cancels_the_generation_in_flight(slow_ollama):
+    def streams():
+        return {t for t in threading.enumerate() if t.name == "hintify-stream"}
+
+    first = slow_ollama.submit_text("Solve 2x+3=7 for x.")
+    wait_for(streams)
+    first_stream = streams()
+    second = slow_ollama.submit_text("Find the area of a circle of radius 3.")
+    # The superseded request lets go of its connection right away, not once its ~1.5 s stream has run out
+    wait_for(lambda: not first_stream & streams(), timeout=0.5)
+    assert first.trace.status == "cancelled"
+    result = next_result(slow_ollama)
+    assert result.job_id == second.job_id and result.startswith("Hint 1: Move the constant.")
+    assert slow_ollama.results.empty()
+    assert len([path for _, path, _ in slow_ollama.mock.requests if path == "/api/chat"]) == 2
+
+
+def test_ocr_layout_only_feeds_the_split(config, monkeypatch):
+    config(split_questions=True)
+    layout = "1. Solve 2x+3=7\nfor x.\n\n2. Find the area of a circle of radius 3."
+    monkeypatch.setattr(hintify, "extract_text_and_words", lambda image_bytes: (layout, None))
+    args = types.SimpleNamespace(ollama_model="m", provider_strategy=None, stream=False, server=None)
+    p = hintify.HintPipeline(args)
+    scheduled = []
+    monkeypatch.setattr(p, "_schedule_llm", scheduled.append)
+    job = p._new_job(image_bytes=b"png")
+    p._ocr_job(job)
+    assert scheduled == [job]
+    assert job.text == "1. Solve 2x+3=7 for x. 2. Find the area of a circle of radius 3."
+    assert [(label, text) for label, text, _, _ in job.parts] == [
+        ("1", "Solve 2x+3=7 for x."), ("2", "Find the area of a circle of radius 3.")]
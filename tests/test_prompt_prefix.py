@@ -0,0 +1,50 @@
+import types
+
+import pytest
+
+import hintify
+from conftest import RESPONSE, posts
+
+QUESTIONS = ["Solve 2x+3=7 for x.", "Find the area of a circle of radius 3."]
+
+
+@pytest.fixture
+def ollama(config, mock, monkeypatch):
+    """generate_hints talking to the stub server, with hint caching off."""
+    config(hint_cache=False, ollama_prewarm=False, ollama_keep_alive="45m", ollama_model="llama3.2:3b")
+    monkeypatch.setenv("OLLAMA_HOST", mock.url)
+    monkeypatch.setattr(hintify, "_ollama_client", None)
+    monkeypatch.setattr(hintify, "model_registry", hintify.OllamaModelRegistry())
+    return types.SimpleNamespace(ollama_model="llama3.2:3b", provider_strategy=None)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_questions_share_the_system_message(ollama, mock, stream):
+    for text in QUESTIONS:
+        on_line = (lambda line: None) if stream else None
+        assert hintify.generate_hints(text, "Descriptive", "Easy", ollama, on_line=on_line).startswith(RESPONSE)
+    chats = posts(mock, "/api/chat")
+    assert not posts(mock, "/api/generate")
+    assert [c["stream"] for c in chats] == [stream, stream]
+    for chat, text in zip(chats, QUESTIONS):
+        system, user = chat["messages"]
+        assert system == {"role": "system", "content": hintify.SYSTEM_PROMPT}
+        assert user["role"] == "user" and user["content"] == hintify.build_user_prompt(text, "Descriptive", "Easy")
+        assert hintify.SYSTEM_PROMPT not in user["content"]
+        assert chat["keep_alive"] == "45m" and chat["model"] == "llama3.2:3b"
+
+
+def test_only_the_question_is_evaluated_after_the_first_request(ollama, mock):
+    for text in QUESTIONS:
+        hintify.generate_hints(text, "Descriptive", "Easy", ollama)
+    client = hintify.get_ollama_client()
+    first_tokens = client.prompt_tokens
+    hintify.generate_hints("Evaluate 7 * 8 - 6.", "Descriptive", "Easy", ollama)
+    # The stub evaluates only what follows the prefix shared with the previous request
+    assert client.prompt_tokens - first_tokens < len(hintify.SYSTEM_PROMPT) // 4 // 2
+
+
+def test_short_template_sends_its_own_prefix(ollama, mock, config):
+    config(hint_cache=False, ollama_prewarm=False, ollama_keep_alive="45m", ollama_model="llama3.2:3b", prompt_template_easy="short")
+    hintify.generate_hints(QUESTIONS[0], "Descriptive", "Easy", ollama)
+    assert posts(mock, "/api/chat")[0]["messages"][0]["content"] == hintify.SHORT_SYSTEM_PROMPT
@@ -0,0 +1,88 @@
+import asyncio
+
+import hintify
+
+
+class FakeRequest:
+    """Stands in for a HintRequest: streams canned chunks with a delay before each."""
+
+    def __init__(self, provider, chunks, delay=0.0):
+        self.provider = provider
+        self.cfg = {"hedge_delay": 0.05}
+        self.runs = 0
+        self.remembered = []
+        self._chunks = chunks
+        self._delay = delay
+
+    async def achunks(self):
+        self.runs += 1
+        for chunk in self._chunks:
+            await asyncio.sleep(self._delay)
+            yield chunk
+
+    def remember(self, response):
+        self.remembered.append(response)
+        return response
+
+    def finish(self, response):
+        return response
+
+
+def race(primary, secondary, hedge=False):
+    lines = []
+    response = asyncio.run(hintify.race_providers(primary, secondary, lines.append, hedge=hedge))
+    return response, lines
+
+
+def test_fastest_provider_wins():
+    fast = FakeRequest("ollama", ["Hint 1: Move the constant.\nHint 2: Divide by 3.\nHint 3: Check it.\n"])
+    slow = FakeRequest("gemini", ["Hint 1: Isolate x.\n"], delay=0.5)
+    response, lines = race(fast, slow)
+    assert response.startswith("Hint 1: Move the constant.")
+    assert lines == response.splitlines()
+    assert fast.remembered == [response] and slow.remembered == []
+
+
+def test_late_failure_falls_back_to_the_other_provider():
+    broken = FakeRequest("ollama", ["Hint 1: Move the constant.\nHint 2: Divide by 3.\n", "\n[LLM Error] connection reset"])
+    other = FakeRequest("gemini", ["Hint 1: Isolate x.\nHint 2: Undo the addition.\nHint 3: Undo the product.\n"], delay=0.2)
+    response, lines = race(broken, other)
+    assert "[Error]" not in response and "[LLM Error]" not in response
+    assert response.startswith("Hint 1: Isolate x.")
+    # The lines already shown stay; the fallback continues after them
+    assert lines[:3] == ["Hint 1: Move the constant.", "Hint 2: Divide by 3.", "Hint 3: Undo the product."]
+    assert other.runs == 2  # cancelled when the first provider won, then asked again
+    # What was shown mixes both providers, so neither answer is cached as if it had been shown
+    assert broken.remembered == [] and other.remembered == []
+
+
+def test_fallback_repeating_the_shown_lines_is_cached():
+    broken = FakeRequest("ollama", ["Hint 1: Isolate x.\n", "\n[LLM Error] connection reset"])
+    other = FakeRequest("gemini", ["Hint 1: Isolate x.\nHint 2: Undo the addition.\nHint 3: Undo the product.\n"], delay=0.2)
+    response, lines = race(broken, other)
+    assert lines == response.splitlines()
+    assert other.remembered == [response]
+
+
+def test_padding_alone_does_not_win():
+    empty = FakeRequest("ollama", [""])
+    real = FakeRequest("gemini", ["Hint 1: Isolate x.\nHint 2: Undo the addition.\nHint 3: Undo the product.\n"], delay=0.2)
+    response, lines = race(empty, real)
+    assert response.startswith("Hint 1: Isolate x.")
+    assert lines[0] == "Hint 1: Isolate x."
+
+
+def test_hedge_falls_back_when_the_primary_fails_late():
+    broken = FakeRequest("ollama", ["Hint 1: Move the constant.\n", "\n[LLM Error] model unloaded"])
+    other = FakeRequest("gemini", ["Hint 1: Isolate x.\nHint 2: Undo the addition.\nHint 3: Undo the product.\n"])
+    response, lines = race(broken, other, hedge=True)
+    assert response.startswith("Hint 1: Isolate x.")
+    assert other.runs == 1  # never hedged; only started as the fallback
+
+
+def test_both_failing_returns_the_primary_error():
+    first = FakeRequest("ollama", ["[LLM Error] Ollama is not running"])
+    second = FakeRequest("gemini", ["[LLM Error] Missing API key"])
+    response, lines = race(first, second)
+    assert "Ollama is not running" in response
+    assert lines == response.splitlines()
@@ -0,0 +1,117 @@
+import pytest
+
+import hintify
+
+
+class FakeText:
+    """Records what a Tk Text widget would show; after() callbacks run only when the test flushes them."""
+
+    def __init__(self):
+        self.text = ""
+        self.inserted = []
+        self.deleted_from = []
+        self.pending = []
+        self.seen = None
+
+    def after(self, ms, callback):
+        self.pending.append((ms, callback))
+        return len(self.pending)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for _, callback in pending:
+            callback()
+        return [ms for ms, _ in pending]
+
+    def winfo_exists(self):
+        return True
+
+    def config(self, **kwargs):
+        pass
+
+    def delete(self, start, end):
+        line = int(start.split(".")[0])
+        self.deleted_from.append(line)
+        self.text = "".join(self.text.splitlines(keepends=True)[:line - 1])
+
+    def insert(self, index, *chunks):
+        pieces = chunks[::2]
+        self.inserted.append("".join(pieces))
+        self.text += "".join(pieces)
+
+    def see(self, index):
+        self.seen = index
+
+    @property
+    def lines(self):
+        return self.text.splitlines()
+
+
+@pytest.fixture
+def renderer():
+    return hintify.HintRenderer(FakeText(), frame_ms=16)
+
+
+def test_a_burst_of_lines_is_one_redraw(renderer):
+    for i in range(1, 4):
+        renderer.append_line(f"Hint {i}: step {i}")
+    assert len(renderer.widget.pending) == 1
+    renderer.widget.run_pending()
+    assert renderer.widget.lines == ["Hint 1: step 1", "Hint 2: step 2", "Hint 3: step 3"]
+    assert renderer.flushes == 1 and renderer.lines_written == 3
+
+
+def test_streamed_lines_only_write_the_new_ones(renderer):
+    renderer.set_lines(["Hint 1: a", "Hint 2: b"])
+    renderer.widget.run_pending()
+    renderer.append_line("Hint 3: c")
+    renderer.widget.run_pending()
+    assert renderer.widget.inserted[-1:] == ["Hint 3: c\n"]
+    assert renderer.widget.deleted_from == []
+    assert renderer.widget.seen == hintify.tk.END
+    assert renderer.lines_written == 3
+
+
+def test_a_changed_line_rewrites_from_the_first_difference(renderer):
+    renderer.set_lines(["Hint 1: a", "Hint 2: b", "Hint 3: c"])
+    renderer.widget.run_pending()
+    renderer.set_lines(["Hint 1: a", "Hint 2: B", "Hint 3: c"])
+    renderer.widget.run_pending()
+    assert renderer.widget.deleted_from == [2]
+    assert renderer.widget.lines == ["Hint 1: a", "Hint 2: B", "Hint 3: c"]
+    assert renderer.lines_written == 5
+
+
+def test_a_new_response_replaces_the_old_one_from_the_top(renderer):
+    renderer.set_lines(["Hint 1: a", "Hint 2: b"])
+    renderer.widget.run_pending()
+    renderer.set_lines(["Hint 1: x"])
+    renderer.widget.run_pending()
+    assert renderer.widget.lines == ["Hint 1: x"]
+    assert renderer.widget.deleted_from == [1] and renderer.widget.seen == "1.0"
+
+
+def test_unchanged_lines_do_not_touch_the_widget(renderer):
+    renderer.set_lines(["Hint 1: a"])
+    renderer.widget.run_pending()
+    renderer.set_lines(["Hint 1: a"])
+    renderer.widget.run_pending()
+    assert renderer.flushes == 1 and len(renderer.widget.inserted) == 1
+
+
+def test_updates_right_after_a_redraw_wait_for_the_next_frame():
+    renderer = hintify.HintRenderer(FakeText(), frame_ms=1000)
+    renderer.append_line("Hint 1: a")
+    assert renderer.widget.run_pending() == [0]  # idle: drawn on the next loop pass
+    renderer.append_line("Hint 2: b")
+    [wait] = renderer.widget.run_pending()
+    assert 500 < wait <= 1000
+
+
+def test_rendered_results_are_traced_after_the_flush(renderer, monkeypatch):
+    traced = []
+    monkeypatch.setattr(hintify, "record_render", traced.append)
+    renderer.set_lines(["Hint 1: a"], rendered="result")
+    assert traced == []
+    renderer.widget.run_pending()
+    assert traced == ["result"]
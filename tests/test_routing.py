@@ -0,0 +1,83 @@
+import pytest
+
+import hintify
+from conftest import RESPONSE
+
+# RESPONSE is three lines; 10 tokens (~40 characters) stop the mock inside the second one
+CUT = 10
+
+
+@pytest.mark.parametrize("text", [
+    "Explain why the sky is blue",
+    "Simplify 2x + 4x",
+    "Determine the slope of y = 3x + 1",
+    "How many apples are left",
+    "Describe the water cycle",
+    "2x+3=7",
+    "x^2 - 5x + 6",
+    "3 * 7",
+    "4x - 1 > 11",
+])
+def test_instructions_and_bare_math_are_sent_to_the_model(text, config):
+    cfg = config()
+    route = hintify.route_question(text, hintify.classify_question(text), "Easy", cfg)
+    assert route.local_response is None
+
+
+@pytest.mark.parametrize("text", ["Chapter 4 Linear Equations", "Page 12 of 48", "Table of contents", "However the chapter",
+                                  "Pages 12-48", "COVID-19 and/or flu"])
+def test_headings_are_answered_locally(text, config):
+    assert hintify.classify_question(text) == "Not a Question"
+    assert not hintify.looks_like_question(text)
+    assert hintify.route_question(text, "Not a Question", "Easy", config()).local_response == hintify.NOT_A_QUESTION
+
+
+@pytest.mark.parametrize("text, qtype", [
+    ("Explain why the sky is blue", "Not a Question"),
+    ("2x+3=7", "Not a Question"),
+    ("Find x if 2x+3=7", "Descriptive"),
+    ("Evaluate: is 7 prime?", "Descriptive"),
+    ("Pick one (A) 2 (B) 3", "MCQ"),
+])
+def test_classification_is_unchanged(text, qtype):
+    assert hintify.classify_question(text) == qtype
+
+
+def test_cache_key_follows_the_route(config):
+    cfg = config()
+    text = "Solve for x: 3x + 5 = 20"
+    route = hintify.route_question(text, "Descriptive", "Easy", cfg)
+    short = hintify.route_question(text, "Descriptive", "Easy", config(prompt_template_easy="short"))
+    capped = hintify.route_question(text, "Descriptive", "Easy", config(num_predict_easy=64))
+    keys = {hintify.hint_cache_key(text, "ollama", "m", r.cache_tag) for r in (route, short, capped)}
+    assert len(keys) == 3
+
+
+def test_non_streamed_truncated_line_is_dropped(mock):
+    client = hintify.OllamaClient(host=mock.url)
+    assert client.generate("q", "llama3.2:3b", options={"num_predict": CUT}) == RESPONSE.splitlines()[0]
+    assert client.generate("q", "llama3.2:3b") == RESPONSE
+
+
+def test_streamed_truncated_line_is_dropped(mock):
+    client = hintify.OllamaClient(host=mock.url)
+    assert "".join(client.generate_stream("q", "llama3.2:3b", options={"num_predict": CUT})) == RESPONSE.splitlines()[0] + "\n"
+    assert "".join(client.generate_stream("q", "llama3.2:3b")) == RESPONSE
+
+
+def test_async_truncated_line_is_dropped(mock):
+    client = hintify.OllamaClient(host=mock.url)
+
+    async def collect(**options):
+        return "".join([chunk async for chunk in client.agenerate_stream("q", "llama3.2:3b", options=options or None)])
+
+    assert hintify.asyncio.run(collect(num_predict=CUT)) == RESPONSE.splitlines()[0] + "\n"
+    assert hintify.asyncio.run(collect()) == RESPONSE
+
+
+def test_line_hold():
+    hold = hintify.LineHold()
+    assert [hold.feed(c) for c in ["Hint 1: a", "\nHint 2", ": b\nHint 3: c"]] == ["", "Hint 1: a\n", "Hint 2: b\n"]
+    assert hold.finish(truncated=True) == ""
+    hold.feed("Hint 1: a\nHint 2: b")
+    assert hold.finish(truncated=False) == "Hint 2: b"
@@ -0,0 +1,36 @@
+"""The hint formatter in all its forms against the golden corpus and the original implementation."""
+
+import json
+import random
+import re
+
+import pytest
+
+import hintify
+from bench_sanitizer import GOLDEN_PATH, fuzz_inputs, generator_form, legacy_sanitize, streamed
+
+with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=[str(i) for i in range(len(GOLDEN))])
+def test_golden(case):
+    raw, expected = case["input"], case["output"]
+    assert hintify.sanitize_and_format_hints(raw) == expected
+    assert generator_form(raw) == expected
+    assert streamed(raw, random.Random(len(raw))) == expected
+
+
+def test_matches_original_implementation_on_fuzzed_input():
+    rng = random.Random(7)
+    for raw in fuzz_inputs(1000, rng):
+        expected = legacy_sanitize(raw)
+        assert hintify.sanitize_and_format_hints(raw) == expected, raw
+        assert streamed(raw, rng) == expected, raw
+
+
+def test_streaming_emits_each_line_once():
+    seen = []
+    out = hintify.stream_and_format_hints(iter(["Hint 1: a b c\nHint", " 2: d e f\n", "Hint 3: g h i"]), seen.append)
+    assert out.splitlines() == seen
+    assert [re.match(r"Hint \d+:", line) is not None for line in seen] == [True, True, True, False]
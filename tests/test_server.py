@@ -0,0 +1,93 @@
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import hintify
+
+
+class FakeService:
+    """HintService stand-in: handle() blocks until `gate` is set and counts concurrent calls."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def handle(self, image_bytes=None, text=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            self.gate.wait(5)
+            return {"hints": f"Hint 1: {text}"}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def metrics(self):
+        return ""
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(service, **kwargs):
+        server = hintify.create_hint_server(service, port=0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def raw_post(port, content_length):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(f"POST /v1/hints HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {content_length}\r\n\r\n".encode())
+        return sock.recv(4096).decode()
+
+
+def post_text(port, text):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("POST", "/v1/hints", json.dumps({"text": text}), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5"])
+def test_malformed_content_length_is_a_bad_request(serve, content_length):
+    port = serve(FakeService())
+    reply = raw_post(port, content_length)
+    assert reply.startswith("HTTP/1.1 400")
+    assert "Content-Length" in reply
+    assert post_text(port, "still serving") == (200, {"hints": "Hint 1: still serving"})
+
+
+def test_connections_beyond_the_cap_wait_for_a_handler(serve):
+    service = FakeService()
+    service.gate.clear()
+    port = serve(service, max_connections=2)
+    results = []
+    clients = [threading.Thread(target=lambda i=i: results.append(post_text(port, f"q{i}"))) for i in range(4)]
+    for client in clients:
+        client.start()
+    time.sleep(0.3)
+    assert service.active == 2
+    service.gate.set()
+    for client in clients:
+        client.join(10)
+    assert len(results) == 4 and all(status == 200 for status, _ in results)
+    assert service.peak == 2
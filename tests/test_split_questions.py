@@ -0,0 +1,167 @@
+import json
+import queue
+import time
+import types
+
+import pytest
+
+import hintify
+from hintify import split_questions
+
+
+def texts(parts):
+    return [t for _, t in parts]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. Solve 2x+3=7 for x.\n2. Find the area of a circle of radius 3.\n3. Evaluate 5!",
+     [("1", "Solve 2x+3=7 for x."), ("2", "Find the area of a circle of radius 3."), ("3", "Evaluate 5!")]),
+    # The same page flattened to one line: "radius 3." ends a sentence, it does not start question 3
+    ("1. Solve 2x+3=7 for x. 2. Find the area of a circle of radius 3. 3. Evaluate 5!",
+     [("1", "Solve 2x+3=7 for x."), ("2", "Find the area of a circle of radius 3."), ("3", "Evaluate 5!")]),
+    ("1) What is 2+2? 2) Solve x+1=3", [("1", "What is 2+2?"), ("2", "Solve x+1=3")]),
+    ("Q1 What is 2+2? Q2 Solve x+1=3", [("1", "What is 2+2?"), ("2", "Solve x+1=3")]),
+    ("Question 1: Find the mean of 2, 4 and 6. Question 2: Find the median of 1, 5 and 9.",
+     [("1", "Find the mean of 2, 4 and 6."), ("2", "Find the median of 1, 5 and 9.")]),
+])
+def test_numbered_questions(text, expected):
+    assert split_questions(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Which is prime? (A) 21 (B) 27 (C) 29 (D) 33",
+    "Which is prime? 1) 21 2) 27 3) 29 4) 33",  # options numbered like questions
+    "Solve for x: 3x + 5 = 20",
+    "Chapter 4 Linear Equations",
+    "",
+])
+def test_single_question_is_not_split(text):
+    assert split_questions(text) == [("", text)]
+
+
+def test_numbers_inside_options_are_not_markers():
+    text = "1. Which is prime? (A) 2. (B) 4 (C) 6\n2. Find x if x+1=3"
+    assert split_questions(text) == [("1", "Which is prime? (A) 2. (B) 4 (C) 6"), ("2", "Find x if x+1=3")]
+
+
+def test_question_like_preamble_is_kept():
+    parts = split_questions("Solve the following equations for x. 1. 2x = 4 solve 2. 3x = 9 solve")
+    assert parts[0] == ("", "Solve the following equations for x.")
+    assert [label for label, _ in parts] == ["", "1", "2"]
+
+
+def test_max_questions_merges_the_rest():
+    text = "\n".join(f"{i}. Find the value of x{i}." for i in range(1, 6))
+    parts = split_questions(text, max_questions=3)
+    assert [label for label, _ in parts] == ["1", "2", "3"]
+    assert parts[2][1] == "Find the value of x3. Find the value of x4. Find the value of x5."
+    assert split_questions(text, max_questions=1) == [("", text)]
+
+
+def words_for(lines, gap_after=()):
+    """OCR word boxes for `lines`, 20 px high, with an extra 60 px gap after the given line indexes."""
+    words, y = [], 0
+    for n, line in enumerate(lines):
+        x = 0
+        for word in line.split():
+            words.append([word, x, y, 10 * len(word), 20, n])
+            x += 10 * len(word) + 10
+        y += 24 + (60 if n in gap_after else 0)
+    return words
+
+
+def test_layout_gaps_split_unnumbered_questions():
+    lines = ["Solve for x: 2x + 3 = 7", "and check your answer.", "Find the area of a circle", "of radius 3 cm."]
+    text = " ".join(lines)
+    assert split_questions(text, words_for(lines)) == [("", text)]
+    assert texts(split_questions(text, words_for(lines, gap_after={1}))) == [
+        "Solve for x: 2x + 3 = 7 and check your answer.", "Find the area of a circle of radius 3 cm."]
+
+
+def test_layout_does_not_split_off_an_options_block():
+    lines = ["Which of these numbers is prime?", "(A) 21 (B) 27 (C) 29 (D) 33"]
+    text = " ".join(lines)
+    assert split_questions(text, words_for(lines, gap_after={0})) == [("", text)]
+
+
+def test_line_start_numbering_uses_word_boxes():
+    lines = ["1. Find the area of a circle of radius", "3. 2. Evaluate 5! and simplify"]
+    parts = split_questions(" ".join(lines), words_for(lines))
+    # Only "1." starts a line, so there is no chain there; the flat text still splits at "2."
+    assert texts(parts) == ["Find the area of a circle of radius 3.", "Evaluate 5! and simplify"]
+
+
+@pytest.fixture
+def pipeline(config, monkeypatch):
+    config(hint_cache=False, ollama_prewarm=False, recent_requests_ttl=0)
+
+    async def fake_generate(text, qtype, difficulty, args, on_line=None):
+        if "fail" in text:
+            raise RuntimeError("model crashed")
+        return f"Hint 1: think about {text}"
+
+    monkeypatch.setattr(hintify, "generate_hints_async", fake_generate)
+    args = types.SimpleNamespace(ollama_model="m", provider_strategy=None, stream=True, server=None)
+    p = hintify.HintPipeline(args).start()
+    yield p
+    p.loop.call_soon_threadsafe(p.loop.stop)
+
+
+def events_until_done(p, timeout=5):
+    events, deadline = [], time.time() + timeout
+    while time.time() < deadline:
+        try:
+            event = p.results.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        events.append(event)
+        if getattr(event, "kind", None) == "done":
+            return events
+    raise AssertionError(f"no done event: {[getattr(e, 'kind', e) for e in events]}")
+
+
+def test_parts_are_hinted_separately(pipeline):
+    job = pipeline.submit_text("1. Solve 2x+3=7 for x.\n2. Find the area of a circle of radius 3.")
+    events = events_until_done(pipeline)
+    assert [e.kind for e in events].count("part") == 2
+    assert sorted(e.index for e in events if e.kind == "part") == [0, 1]
+    assert events[-1].text == ("Question 1: Solve 2x+3=7 for x.\nHint 1: think about Solve 2x+3=7 for x.\n\n"
+                               "Question 2: Find the area of a circle of radius 3.\n"
+                               "Hint 1: think about Find the area of a circle of radius 3.")
+    assert job.trace.status == "ok"
+
+
+def test_failing_question_does_not_lose_the_others(pipeline):
+    pipeline.submit_text("1. Solve 2x+3=7 for x, then fail.\n2. Find the area of a circle of radius 3.")
+    events = events_until_done(pipeline)
+    done = events[-1].text
+    assert "[LLM Error] model crashed" in done
+    assert "Hint 1: think about Find the area" in done
+
+
+WORKSHEET = "1. Solve 2x+3=7 for x.\n2. Find the area of a circle of radius 3."
+
+
+def worksheet_ocr(source, image_bytes):
+    """Stands in for _batch_ocr in the worker processes (module level so it pickles)."""
+    return WORKSHEET, None, 1.0
+
+
+def test_batch_and_server_hint_the_same_questions_as_the_app(pipeline, tmp_path, monkeypatch):
+    pipeline.submit_text(WORKSHEET)
+    shown = events_until_done(pipeline)[-1].text
+
+    monkeypatch.setattr(hintify, "generate_hints", lambda text, qtype, difficulty, args: f"Hint 1: think about {text}")
+    monkeypatch.setattr(hintify, "collect_batch_items", lambda inputs: [hintify.BatchItem(str(tmp_path / "page.png"))])
+    monkeypatch.setattr(hintify, "ensure_tesseract_binary", lambda: True)
+    monkeypatch.setattr(hintify, "_batch_ocr", worksheet_ocr)
+    output = tmp_path / "hints.jsonl"
+    args = types.SimpleNamespace(inputs=[], output=str(output), format=None, resume=False, ocr_processes=1, concurrency=1)
+    assert hintify.run_batch(args) == 0
+    [row] = [json.loads(line) for line in output.read_text().splitlines()]
+    assert row["hints"] == shown
+    assert [(q["label"], q["text"]) for q in row["questions"]] == [
+        ("1", "Solve 2x+3=7 for x."), ("2", "Find the area of a circle of radius 3.")]
+
+    served = hintify.HintService(args).handle(text=WORKSHEET)
+    assert served["hints"] == shown and served["questions"] == row["questions"]
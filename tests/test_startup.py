@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import hintify
+
+HEAVY = ["PIL", "pytesseract", "keyring", "requests", "asyncio", "tkinter", "google.generativeai", "pynput", "tesserocr"]
+
+
+def test_import_loads_no_heavy_modules():
+    code = f"import json, sys, hintify; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(hintify.__file__),
+                         capture_output=True, text=True, timeout=60, check=True).stdout
+    assert json.loads(out.splitlines()[-1]) == []
+
+
+def test_lazy_module_imports_on_first_use(monkeypatch):
+    monkeypatch.setattr(hintify, "startup_timer", hintify.StartupTimer(0.0))
+    lazy = hintify._LazyModule("colorsys", package="")
+    assert lazy.__dict__["_module"] is None
+    assert lazy.rgb_to_hsv(1, 0, 0) == (0.0, 1.0, 1)
+    assert [name for name, _ in hintify.startup_timer.imports] == ["colorsys"]
+    lazy.hsv_to_rgb(0, 0, 0)
+    assert len(hintify.startup_timer.imports) == 1
+
+
+def test_missing_package_points_to_doctor(capsys):
+    lazy = hintify._LazyModule("hintify_no_such_module", package="no-such-package")
+    with pytest.raises(ImportError):
+        lazy.anything
+    out = capsys.readouterr().out
+    assert "'no-such-package' is missing" in out and "hintify --doctor" in out
@@ -0,0 +1,91 @@
+import sys
+import types
+
+import hintify
+from bench_pipeline import latency_stats
+
+
+def run_jobs(tracer):
+    for job_id, (ocr, llm) in enumerate([(0.1, 0.5), (0.3, 0.7)], start=1):
+        trace = tracer.start(job_id)
+        trace.add("ocr", ocr)
+        trace.add("llm", llm, provider="ollama")
+        trace.finish("ok")
+    failed = tracer.start(3)
+    failed.add("ocr", 0.2)
+    failed.finish("no_text")
+
+
+def test_spans_round_trip_through_the_log_into_stats(tmp_path, capsys):
+    log = tmp_path / "trace.jsonl"
+    tracer = hintify.Tracer().configure(log_path=str(log))
+    run_jobs(tracer)
+    tracer.record_job_span(1, "render", 0.05)  # late span after the job finished
+    assert hintify.run_trace_stats(types.SimpleNamespace(log=str(log), last=10)) == 0
+    rows = {line.split()[0]: line.split()[1:] for line in capsys.readouterr().out.splitlines()[2:]}
+    assert rows["ocr"][:3] == ["3", "200.0", "300.0"]
+    assert rows["llm"][:3] == ["2", "500.0", "700.0"]
+    assert rows["render"][0] == "1"
+    assert rows["job:ok"][0] == "2" and rows["job:no_text"][0] == "1"
+
+
+def test_stats_only_counts_the_last_jobs(tmp_path, capsys):
+    log = tmp_path / "trace.jsonl"
+    run_jobs(hintify.Tracer().configure(log_path=str(log)))
+    hintify.run_trace_stats(types.SimpleNamespace(log=str(log), last=1))
+    out = capsys.readouterr().out
+    assert "1 job(s)" in out
+    rows = {line.split()[0]: line.split()[1:] for line in out.splitlines()[2:]}
+    assert set(rows) == {"ocr", "job:no_text"}
+
+
+def test_metrics_file_is_prometheus_text(tmp_path):
+    path = tmp_path / "hintify.prom"
+    run_jobs(hintify.Tracer().configure(metrics_path=str(path)))
+    text = path.read_text()
+    assert "# TYPE hintify_stage_seconds summary" in text
+    assert 'hintify_stage_seconds_count{stage="ocr"} 3' in text
+    assert 'hintify_job_seconds_count{status="ok"} 2' in text
+
+
+def test_otel_export_nests_stage_spans_under_the_job(monkeypatch):
+    started = []
+
+    class Span:
+        def __init__(self, name, context, attributes):
+            self.name, self.parent, self.attributes, self.ended = name, context, attributes, False
+
+        def end(self, end_time=None):
+            self.ended = True
+
+    def start_span(name, context=None, start_time=None, attributes=None):
+        started.append(Span(name, context, attributes))
+        return started[-1]
+
+    otel_trace = types.SimpleNamespace(get_tracer=lambda name: types.SimpleNamespace(start_span=start_span),
+                                       set_span_in_context=lambda span: span)
+    monkeypatch.setitem(sys.modules, "opentelemetry", types.SimpleNamespace(trace=otel_trace))
+    run_jobs(hintify.Tracer().configure(otel=True))
+    jobs = [s for s in started if s.name == "hintify.job"]
+    assert len(jobs) == 3 and all(s.ended for s in started)
+    assert [s.parent for s in started if s.name == "llm"] == jobs[:2]
+    assert next(s for s in started if s.name == "llm").attributes["provider"] == "ollama"
+
+
+def test_percentiles_use_the_nearest_rank():
+    stats = hintify.LatencyStats()
+    for ms in (1, 2):
+        stats.add(ms / 1000)
+    assert stats.percentile(50) == 0.001
+    for ms in range(3, 101):
+        stats.add(ms / 1000)
+    assert stats.percentile(50) == 0.05
+    assert stats.percentile(95) == 0.095
+    assert stats.percentile(99) == 0.099
+    assert stats.percentile(100) == 0.1
+    assert stats.summary() == "n=100 p50=50ms p95=95ms max=100ms"
+
+
+def test_benchmarks_report_the_same_percentiles():
+    stats = latency_stats([ms / 1000 for ms in range(100, 0, -1)])
+    assert [stats.percentile(p) for p in (50, 95, 99, 100)] == [0.05, 0.095, 0.099, 0.1]